@@ -1,27 +1,59 @@
-from typing import Tuple, Optional, Dict, Any
-import io
+from typing import TYPE_CHECKING, Tuple, Optional, Dict, Any, Union, BinaryIO, List
+import asyncio
+import os
+import signal
 import threading
 import time
 import uuid
 import logging
 import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
 import json
-from PIL import Image
-import socket
-from e_ink_screen import EInkScreen
-from processed_message_tracker import ProcessedMessageTracker
-from pijuice import PiJuice
+from concurrent.futures import Future, ThreadPoolExecutor
+from display_session import DEFAULT_IDLE_TIMEOUT
+from mqtt_asyncio import AsyncioMqttAdapter
+from processed_message_tracker import ProcessedMessageTracker, DEFAULT_MAX_ENTRIES, DEFAULT_SAVE_INTERVAL
+from chunked_transfer import ChunkAssembler, Transfer, CHUNKED_SEGMENT, MANIFEST_PART, RESUME_SEGMENT, DEFAULT_SPOOL_DIR, DEFAULT_MAX_AGE
+from image_decoder import ImageDecoder, DEFAULT_MAX_IMAGE_PIXELS, DEFAULT_MAX_PAYLOAD_BYTES
+from render_queue import RenderQueue, RenderJob
+from reconnect_policy import ReconnectPolicy, DEFAULT_INITIAL_DELAY, DEFAULT_MAX_DELAY, DEFAULT_MULTIPLIER, DEFAULT_JITTER
+from telemetry import TelemetrySampler, DEFAULT_BATTERY_INTERVAL, DEFAULT_PUBLISH_INTERVAL, DEFAULT_IP_TTL
+from duty_cycle import (DutyCycle, DEFAULT_WAKE_INTERVAL, DEFAULT_SETTLE_TIME, DEFAULT_MAX_AWAKE,
+                        DEFAULT_SESSION_EXPIRY, DEFAULT_AWAKE_POWER_WATTS, DEFAULT_STATS_PATH)
+from pijuice_handler import DEFAULT_POWER_OFF_DELAY
+from metrics import PipelineMetrics, StartupTimeline, METRICS_SEGMENT, DEFAULT_WINDOW, DEFAULT_METRICS_INTERVAL
+from panels import Panel, SpiBusScheduler, panel_configs
+from playlist import (PlaylistPlayer, PlaylistStore, PlaylistItem, PLAYLIST_SEGMENT, IMAGES_SEGMENT, MISSING_SEGMENT,
+                      PLAYLIST_PROPERTY, DEFAULT_STORE_DIR, DEFAULT_PREFETCH_HORIZON, is_sha256)
+from spi_calibration import (SpiClockStore, CALIBRATION_SEGMENT, RESULT_SEGMENT, SPI_CLOCKS_HZ, FALLBACK_SPI_HZ,
+                             DEFAULT_STORE_PATH as DEFAULT_SPI_CALIBRATION_PATH)
 import atexit
 
+# NumPy, Pillow and the display driver stack are imported when the renderer is
+# set up, which can run in the background while MQTT connects
+if TYPE_CHECKING:
+    from e_ink_screen import EInkScreen
+    from frame_cache import FrameCache
+    from panel_frame import PanelFrame
+    from render_pool import RenderPool
+
 # Constants
-STATUS_ROOT = "data"
-STATUS_POWER = "powerInput"
-RECONNECT_DELAY = 5
+MQTT_KEEPALIVE = 30
+NETWORK_LOOP_TIMEOUT = 1.0
 LED_BLINK_DURATION = 0.5
-DEFAULT_IP = '127.0.0.1'
-IP_CHECK_ADDRESS = ('10.254.254.254', 1)
+STATUS_DELTA_SEGMENT = "delta"
 PIJUICE_ADDRESS = 0x14
 PIJUICE_BUS = 1
+RENDER_DRAIN_TIMEOUT = 15.0  # a frame already on its way to the panel is allowed to finish
+DISCONNECT_POLL_INTERVAL = 0.05
+MESSAGE_ID_PROPERTY = "message_id"
+DEFAULT_MAX_MESSAGE_AGE = 300
+DEFAULT_TRACKER_PATH = "cache/processed_messages.json"
+RENDERER_SETUP_JOIN_TIMEOUT = 10.0
+DUTY_CYCLE_LOOP_TIMEOUT = 0.25
+STATUS_SLEEPING = "sleeping"
+DEFAULT_FILE_EPD_DIR = "output/frames"
+PANEL_PROPERTY = "panel"
 
 # Configure logging
 logging.basicConfig(
@@ -40,22 +72,69 @@ except ImportError:
 
 class EInkFrameClient:
     def __init__(self, config_path: str = "config.json"):
+        self.timeline = StartupTimeline()
         self.config = self._load_config(config_path)
-        self.e_ink_screen_lock = threading.Lock()
-        self.processed_message_tracker = ProcessedMessageTracker()
-        self.e_ink_screen = None
+        self.timeline.mark("config_loaded")
+        self.network_first = self.config.get("startup", {}).get("network_first", False)
+        self.metrics = self._setup_metrics()
+        self.spi_buses = SpiBusScheduler()
+        self.panels = self._setup_panels()
+        self._panels_by_topic = {panel.topic: panel for panel in self.panels}
+        self._panels_by_name = {panel.name: panel for panel in self.panels}
+        self.image_decoder = self.panels[0].image_decoder
+        self.render_pool = None
+        self.frame_cache = None
+        self.frame_buffers = None
+        self.spi_clocks = self._setup_spi_clocks()
+        self._calibration_lock = threading.Lock()
+        self.chunk_assembler = self._setup_chunk_assembler()
+        self._renderer_ready = threading.Event()
+        self._renderer_thread = None
+        self._renderer_error = None
+        self._display_closed = False
         self.client = None
         self.pijuice = None
         self._setup_pijuice()
+        self.duty_cycle = self._setup_duty_cycle()
+        self.telemetry = self._setup_telemetry()
+        self.reconnect_policy = self._setup_reconnect_policy()
+        self.telemetry.register_source("connection", self.reconnect_policy.metrics)
+        self.telemetry.register_source("startup", self.timeline.as_dict)
+        if self.duty_cycle:
+            self.telemetry.register_source("duty_cycle", self.duty_cycle.metrics)
+        if self.spi_clocks:
+            self.telemetry.register_source("spi", self.spi_clocks.metrics)
+        self.playlist_player = self._setup_playlist()
+        if self.playlist_player:
+            self.telemetry.register_source("playlist", self.playlist_player.metrics)
+        # Set from any thread; the event loop's own events are created in _run
+        self._shutdown_event = threading.Event()
+        self._loop = None
+        self._shutdown = None
+        self._connection_lost = None
+        self._executor = None
+        self._chunk_executor = None
+        self._mqtt_adapter = None
+        self._interrupted = False
+        self._led_task = None
+        self._display_subscribed = threading.Event()
+        self._display_subscription_mid = None
+        self._last_message_at = time.monotonic()
         self._setup_mqtt_client()
-        self._setup_hardware()
+        if not self.network_first:
+            self._setup_renderer()
         
         # Add cleanup handler
         atexit.register(self._cleanup)
 
     def _cleanup(self):
-        if self.client:
-            self._on_disconnect_v5(self.client, None, 0, None)
+        self._request_shutdown()
+        self._stop_playlist()
+        self._stop_render_workers()
+        self.telemetry.stop()
+        self.metrics.stop()
+        self._close_display()
+        self._disconnect()
         if not self.config.get("mock_epd", False):
             GPIO.cleanup()
         else:
@@ -67,6 +146,15 @@ class EInkFrameClient:
                 config = json.load(f)
             config["topic_device_status"] = self._get_status_topic(config)
             config["topic_image_display"] = self._get_display_topic(config)
+            config["topic_device_status_delta"] = self._get_status_subtopic(config, STATUS_DELTA_SEGMENT)
+            config["topic_device_metrics"] = self._get_status_subtopic(config, METRICS_SEGMENT)
+            config["topic_image_chunks"] = f'{config["topic_image_display"]}/{CHUNKED_SEGMENT}/'
+            config["topic_image_resume"] = f'{config["topic_image_display"]}/{RESUME_SEGMENT}'
+            config["topic_playlist"] = f'{config["topic_image_display"]}/{PLAYLIST_SEGMENT}'
+            config["topic_playlist_images"] = f'{config["topic_playlist"]}/{IMAGES_SEGMENT}/'
+            config["topic_playlist_missing"] = f'{config["topic_playlist"]}/{MISSING_SEGMENT}'
+            config["topic_spi_calibration"] = f'{config["topic_image_display"]}/{CALIBRATION_SEGMENT}'
+            config["topic_spi_calibration_result"] = f'{config["topic_spi_calibration"]}/{RESULT_SEGMENT}'
             return config
         except Exception as e:
             logger.error(f"Failed to load config: {e}")
@@ -75,22 +163,200 @@ class EInkFrameClient:
     def _get_status_topic(self, config: Dict[str, Any]) -> str:
         return config["topic_device_status"].replace("{device_id}", config["device_id"])
 
+    def _get_status_subtopic(self, config: Dict[str, Any], name: str) -> str:
+        # Sibling of the status topic, e.g. device/<id>/status/online -> device/<id>/status/<name>
+        return f'{config["topic_device_status"].rsplit("/", 1)[0]}/{name}'
+
     def _get_display_topic(self, config: Dict[str, Any]) -> str:
         return config["topic_image_display"].replace("{device_id}", config["device_id"])
 
+    @property
+    def e_ink_screen(self) -> Optional["EInkScreen"]:
+        """Screen of the first panel, the only one unless ``panels`` is configured."""
+        return self.panels[0].screen
+
+    @e_ink_screen.setter
+    def e_ink_screen(self, screen: Optional["EInkScreen"]) -> None:
+        self.panels[0].screen = screen
+
+    def _tracker_settings(self) -> Tuple[int, Optional[str]]:
+        """Message age limit and persist path of the dedup index, adjusted for the duty cycle."""
+        tracker_config = self.config.get("message_tracker", {})
+        max_message_age = tracker_config.get("max_message_age", DEFAULT_MAX_MESSAGE_AGE)
+        persist_path = tracker_config.get("persist_path")
+        duty_config = self.config.get("duty_cycle", {})
+        if duty_config.get("enabled", False):
+            # Every wake redelivers the retained image; forgetting it would render and flash it again
+            wake_interval = duty_config.get("wake_interval", DEFAULT_WAKE_INTERVAL)
+            if max_message_age < wake_interval:
+                logger.warning(f"message_tracker.max_message_age of {max_message_age}s is shorter than the "
+                               f"duty cycle's wake interval, raising it to {wake_interval}s")
+                max_message_age = wake_interval
+            if not persist_path:
+                persist_path = DEFAULT_TRACKER_PATH
+        return max_message_age, persist_path
+
+    def _setup_panels(self) -> List[Panel]:
+        max_message_age, tracker_path = self._tracker_settings()
+        tracker_config = self.config.get("message_tracker", {})
+        decoder_config = self.config.get("decoder", {})
+        panels = []
+        for panel_config in panel_configs(self.config):
+            persist_path = tracker_path
+            if persist_path and panels:
+                # Every further panel keeps its history next to the first panel's
+                root, extension = os.path.splitext(persist_path)
+                persist_path = f'{root}.{panel_config["name"]}{extension}'
+            panel = Panel(
+                panel_config,
+                # Each queue only sees its panel's topic, so it always coalesces down to the newest image
+                RenderQueue(on_drop=self._discard_job),
+                ProcessedMessageTracker(
+                    max_message_age=max_message_age,
+                    max_entries=tracker_config.get("max_entries", DEFAULT_MAX_ENTRIES),
+                    persist_path=persist_path,
+                    save_interval=tracker_config.get("save_interval", DEFAULT_SAVE_INTERVAL)
+                ),
+                ImageDecoder(
+                    panel_config["screen_width"],
+                    panel_config["screen_height"],
+                    max_image_pixels=decoder_config.get("max_image_pixels", DEFAULT_MAX_IMAGE_PIXELS),
+                    max_payload_bytes=decoder_config.get("max_payload_bytes", DEFAULT_MAX_PAYLOAD_BYTES)
+                )
+            )
+            panel.render_queue.on_put = lambda job, panel=panel: self._call_in_loop(self._job_queued, panel, job)
+            panels.append(panel)
+        if len(panels) > 1:
+            logger.info(f"Driving {len(panels)} panels: {panels}")
+        return panels
+
+    def _setup_metrics(self) -> PipelineMetrics:
+        metrics_config = self.config.get("metrics", {})
+        return PipelineMetrics(
+            window=metrics_config.get("window", DEFAULT_WINDOW),
+            publish_interval=metrics_config.get("publish_interval", DEFAULT_METRICS_INTERVAL)
+        )
+
+    def _setup_frame_cache(self) -> Optional["FrameCache"]:
+        cache_config = self.config.get("frame_cache", {})
+        if not cache_config.get("enabled", False):
+            logger.info("Frame cache is disabled in config")
+            return None
+        from frame_cache import FrameCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+        try:
+            return FrameCache(
+                cache_dir=cache_config.get("directory", DEFAULT_CACHE_DIR),
+                max_bytes=cache_config.get("max_bytes", DEFAULT_MAX_BYTES),
+                buffer_pool=self.frame_buffers
+            )
+        except OSError as e:
+            logger.warning(f"Failed to set up frame cache: {e}")
+            return None
+
+    def _setup_chunk_assembler(self) -> Optional[ChunkAssembler]:
+        transfer_config = self.config.get("chunked_transfer", {})
+        if not transfer_config.get("enabled", False):
+            logger.info("Chunked transfer is disabled in config")
+            return None
+        try:
+            return ChunkAssembler(
+                spool_dir=transfer_config.get("spool_dir", DEFAULT_SPOOL_DIR),
+                max_size=self.image_decoder.max_payload_bytes,
+                max_age=transfer_config.get("max_age", DEFAULT_MAX_AGE)
+            )
+        except OSError as e:
+            logger.warning(f"Failed to set up chunked transfer: {e}")
+            return None
+
+    def _setup_playlist(self) -> Optional[PlaylistPlayer]:
+        playlist_config = self.config.get("playlist", {})
+        if not playlist_config.get("enabled", False):
+            logger.info("Playlist mode is disabled in config")
+            return None
+        self._prefetch_on_battery = playlist_config.get("prefetch_on_battery", False)
+        try:
+            store = PlaylistStore(playlist_config.get("store_dir", DEFAULT_STORE_DIR))
+        except OSError as e:
+            logger.warning(f"Failed to set up playlist store: {e}")
+            return None
+        return PlaylistPlayer(
+            store,
+            self.panels[0].name,
+            show=self._show_playlist_item,
+            prefetch=self._prefetch_playlist_item,
+            can_prefetch=self._can_prefetch,
+            prefetch_horizon=playlist_config.get("prefetch_horizon", DEFAULT_PREFETCH_HORIZON)
+        )
+
+    def _stop_playlist(self) -> None:
+        if self.playlist_player:
+            self.playlist_player.stop()
+
+    def _setup_spi_clocks(self) -> Optional[SpiClockStore]:
+        calibration_config = self.config.get("spi_calibration", {})
+        if not calibration_config.get("enabled", True) or self.config.get("mock_epd", False):
+            return None
+        return SpiClockStore(calibration_config.get("store_path", DEFAULT_SPI_CALIBRATION_PATH))
+
+    def _setup_render_pool(self) -> Optional["RenderPool"]:
+        pool_config = self.config.get("render_pool", {})
+        # Decoding in a worker process keeps the GIL free for the MQTT loop and isolates decoder crashes
+        if not pool_config.get("enabled", True):
+            return None
+        from render_pool import RenderPool, DEFAULT_MEMORY_LIMIT, DEFAULT_TIMEOUT
+        try:
+            return RenderPool(
+                # By default one worker per panel, as panels render at the same time, but no more than cores
+                workers=pool_config.get("workers") or min(len(self.panels), os.cpu_count() or 1),
+                memory_limit=pool_config.get("memory_limit", DEFAULT_MEMORY_LIMIT),
+                timeout=pool_config.get("timeout", DEFAULT_TIMEOUT),
+                buffer_pool=self.frame_buffers
+            )
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to start render pool, rendering in the panel workers: {e}")
+            return None
+
+    def _setup_renderer(self) -> None:
+        """Set up the frame cache, the render pool and the displays; signals the render workers when done."""
+        from frame_buffers import FrameBufferPool
+        # Panel-sized buffers are shared by all panels, so panels of one size reuse each other's
+        self.frame_buffers = FrameBufferPool()
+        self.frame_cache = self._setup_frame_cache()
+        self.render_pool = self._setup_render_pool()
+        if self.render_pool:
+            self.telemetry.register_source("render_pool", self.render_pool.metrics)
+        self._setup_hardware()
+        self.timeline.mark("renderer_ready")
+        self._renderer_ready.set()
+        for panel in self.panels:
+            self._call_in_loop(panel.wakeup.set)
+
+    def _start_renderer_setup(self) -> None:
+        # Network-first startup: imports and display init overlap the MQTT handshake
+        self._renderer_thread = threading.Thread(target=self._setup_renderer_in_background,
+                                                 name="renderer-setup", daemon=True)
+        self._renderer_thread.start()
+
+    def _setup_renderer_in_background(self) -> None:
+        try:
+            self._setup_renderer()
+        except Exception as e:
+            # Surfaced by run() so a dead display still stops the client like it does at startup
+            self._renderer_error = e
+            self._request_shutdown()
+            return
+        self._blink_led()
+
+    def _join_renderer_setup(self) -> None:
+        if self._renderer_thread and self._renderer_thread is not threading.current_thread():
+            self._renderer_thread.join(timeout=RENDERER_SETUP_JOIN_TIMEOUT)
+        self._renderer_thread = None
+
     def _setup_hardware(self) -> None:
         try:
-            logger.debug("Initializing E-Ink screen with width: %s, height: %s", 
-                        self.config["screen_width"], 
-                        self.config["screen_height"])
-            
             is_mock = self.config.get("mock_epd", False)
-            self.e_ink_screen = EInkScreen(
-                self.config["screen_width"],
-                self.config["screen_height"],
-                mock_epd=is_mock
-            )
-            self.e_ink_screen.run()
+            for panel in self.panels:
+                panel.screen = self._setup_screen(panel, is_mock)
             
             if not is_mock:
                 GPIO.setup(self.config["led_pin"], GPIO.OUT)
@@ -101,20 +367,150 @@ class EInkFrameClient:
             logger.error(f"Failed to set up hardware: {e}")
             raise
 
+    def _setup_screen(self, panel: Panel, is_mock: bool) -> "EInkScreen":
+        from e_ink_screen import EInkScreen, DEFAULT_PARTIAL_REFRESH_MAX_RATIO
+        from gray16_processor import ToneSettings
+        from geometry import GeometrySettings
+        from waveform import RefreshSettings
+        logger.debug("Initializing E-Ink screen %s with width: %s, height: %s",
+                     panel.name, panel.width, panel.height)
+        partial_config = panel.config.get("partial_refresh", {})
+        driver_options = dict(panel.config.get("driver") or {})
+        spi_key = SpiClockStore.key(panel.name, panel.spi_bus, panel.spi_device)
+        on_spi_fallback = None
+        if self.spi_clocks:
+            if self.spi_clocks.spi_hz(spi_key):
+                driver_options["spi_hz"] = self.spi_clocks.spi_hz(spi_key)
+            on_spi_fallback = lambda spi_hz, error: self.spi_clocks.record_fallback(spi_key, spi_hz, error)
+        partial_max_ratio = 0
+        if partial_config.get("enabled", True):
+            partial_max_ratio = partial_config.get("max_area_ratio", DEFAULT_PARTIAL_REFRESH_MAX_RATIO)
+        screen = EInkScreen(
+            panel.width,
+            panel.height,
+            mock_epd=is_mock,
+            partial_refresh_max_ratio=partial_max_ratio,
+            idle_timeout=panel.config.get("display_session", {}).get("idle_timeout", DEFAULT_IDLE_TIMEOUT),
+            tone_settings=ToneSettings.from_dict(panel.config.get("tone_mapping", {})),
+            geometry_settings=GeometrySettings.from_dict(panel.config.get("geometry", {})),
+            epd=self._setup_file_epd(panel),
+            metrics=self.metrics,
+            driver_options=driver_options,
+            bus_lock=self.spi_buses.lock(panel.spi_bus),
+            buffer_pool=self.frame_buffers,
+            on_spi_fallback=on_spi_fallback,
+            refresh_settings=RefreshSettings.from_dict(panel.config.get("refresh", {}))
+        )
+        screen.run()
+        if self.spi_clocks and screen.reloadable and self.spi_clocks.spi_hz(spi_key) is None:
+            logger.info(f"Panel {panel.name} has no SPI calibration yet, calibrating")
+            self._calibrate_screen(panel, screen)
+        return screen
+
+    def _calibrate_screen(self, panel: Panel, screen: "EInkScreen") -> Optional[Dict[str, Any]]:
+        calibration_config = self.config.get("spi_calibration", {})
+        try:
+            result = screen.calibrate_spi(
+                clocks=calibration_config.get("clocks", SPI_CLOCKS_HZ),
+                fallback_hz=calibration_config.get("fallback_hz", FALLBACK_SPI_HZ)
+            )
+        except Exception as e:
+            logger.error(f"SPI calibration of panel {panel.name} failed: {e}")
+            return {"error": str(e)}
+        if result is None:
+            return None
+        self.spi_clocks.put(SpiClockStore.key(panel.name, panel.spi_bus, panel.spi_device), result)
+        return result.as_dict()
+
+    def _calibrate_panels(self, panels: List[Panel]) -> None:
+        try:
+            results = {}
+            for panel in panels:
+                if panel.screen is None:
+                    continue
+                # The panel lock keeps frames off the screen while its clock changes
+                with panel.lock:
+                    results[panel.name] = self._calibrate_screen(panel, panel.screen)
+            if self.client:
+                self.client.publish(self.config["topic_spi_calibration_result"], payload=json.dumps(results), qos=1)
+        finally:
+            self._calibration_lock.release()
+
+    def _setup_file_epd(self, panel: Panel):
+        file_config = panel.config.get("file_epd", {})
+        if not file_config.get("enabled", False):
+            return None
+        from mocked_epd import FileEPD
+        output_dir = file_config.get("output_dir", DEFAULT_FILE_EPD_DIR)
+        if len(self.panels) > 1:
+            output_dir = os.path.join(output_dir, panel.name)
+        logger.info(f"Writing frames to {output_dir} instead of the panel")
+        return FileEPD(
+            output_dir,
+            panel.width,
+            panel.height,
+            formats=file_config.get("formats", FileEPD.FORMATS)
+        )
+
+    def _close_display(self) -> None:
+        # run() closes the displays on the way out and the atexit cleanup would close them again
+        if self._display_closed:
+            return
+        self._display_closed = True
+        self._join_renderer_setup()
+        if self.render_pool:
+            self.render_pool.close()
+            self.render_pool = None
+        for panel in self.panels:
+            # Runs before a duty-cycle power-off as well, so the image just shown is remembered
+            panel.processed_message_tracker.flush()
+            if not panel.screen:
+                continue
+            try:
+                with panel.lock:
+                    panel.screen.close()
+                logger.info(f"Display session metrics of panel {panel.name}: {panel.screen.session.metrics()}")
+                logger.info(f"Refresh times of panel {panel.name}: {panel.screen.refresh_model.as_dict()}")
+                logger.info(f"Waveforms used by panel {panel.name}: {panel.screen.waveform_selector.metrics()}")
+            except Exception as e:
+                logger.warning(f"Failed to close display of panel {panel.name}: {e}")
+        if self.e_ink_screen:
+            logger.info(f"Frame buffers: {self.frame_buffers.stats()}")
+            logger.info(f"Pipeline metrics: {self.metrics.payload()}")
+
     def _setup_mqtt_client(self) -> None:
         # Update to use MQTT protocol version 5
-        self.client = mqtt.Client(protocol=mqtt.MQTTv5)
-        
-        # Properties needs a packet type for MQTTv5
-        props = mqtt.Properties(mqtt.PacketTypes.CONNECT)
+        if self.duty_cycle:
+            # A stable client id lets the broker keep the session while the frame is powered off
+            self.client = mqtt.Client(client_id=f'e-ink-frame-{self.config["device_id"]}', protocol=mqtt.MQTTv5)
+        else:
+            self.client = mqtt.Client(protocol=mqtt.MQTTv5)
         
         self.client.username_pw_set(username=self.config["username"], password=self.config["password"])
         self.client.on_connect = self._on_connect_v5
         self.client.on_message = self._on_message
         self.client.on_disconnect = self._on_disconnect_v5  # Add disconnect handler
+        self.client.on_subscribe = self._on_subscribe_v5
+        
+        # The broker publishes the offline status if the connection drops unexpectedly
+        self.client.will_set(
+            self.config["topic_device_status"],
+            payload=json.dumps(self.telemetry.status('offline'), separators=(',', ':')),
+            qos=1,
+            retain=True
+        )
         
         # Remove the connection attempt from here as it's done in run()
 
+    def _setup_reconnect_policy(self) -> ReconnectPolicy:
+        reconnect_config = self.config.get("reconnect", {})
+        return ReconnectPolicy(
+            initial_delay=reconnect_config.get("initial_delay", DEFAULT_INITIAL_DELAY),
+            max_delay=reconnect_config.get("max_delay", DEFAULT_MAX_DELAY),
+            multiplier=reconnect_config.get("multiplier", DEFAULT_MULTIPLIER),
+            jitter=reconnect_config.get("jitter", DEFAULT_JITTER)
+        )
+
     def _setup_pijuice(self):
         if not self.config.get('pijuice', {}).get('enabled', False):
             logging.info("PiJuice is disabled in config")
@@ -122,7 +518,7 @@ class EInkFrameClient:
             
         try:
             from pijuice import PiJuice
-            self.pijuice = PiJuice(1, 0x14)
+            self.pijuice = PiJuice(PIJUICE_BUS, PIJUICE_ADDRESS)
             logging.info("PiJuice HAT initialized successfully")
         except Exception as e:
             logging.warning(f"Failed to initialize PiJuice HAT: {e}")
@@ -158,58 +554,102 @@ class EInkFrameClient:
                 'status': 'ERROR'
             }
 
-    def _get_charge_status(self) -> Tuple[Optional[str], Optional[int]]:
-        try:
-            pijuice = PiJuice(PIJUICE_BUS, PIJUICE_ADDRESS)
-            status = pijuice.status.GetStatus()[STATUS_ROOT][STATUS_POWER]
-            charge_level = pijuice.status.GetChargeLevel()['data']
-            logger.info(f'Status: {status}, Level: {charge_level}')
-            return status, charge_level
-        except Exception as e:
-            logger.error(f'Error reading PiJuice status: {e}')
-            return None, None
+    def _setup_duty_cycle(self) -> Optional[DutyCycle]:
+        duty_config = self.config.get("duty_cycle", {})
+        if not duty_config.get("enabled", False):
+            return None
+        return DutyCycle(
+            pijuice=self.pijuice,
+            wake_interval=duty_config.get("wake_interval", DEFAULT_WAKE_INTERVAL),
+            settle_time=duty_config.get("settle_time", DEFAULT_SETTLE_TIME),
+            max_awake=duty_config.get("max_awake", DEFAULT_MAX_AWAKE),
+            session_expiry=duty_config.get("session_expiry", DEFAULT_SESSION_EXPIRY),
+            power_off_delay=duty_config.get("power_off_delay", DEFAULT_POWER_OFF_DELAY),
+            stay_awake_when_wired=duty_config.get("stay_awake_when_wired", True),
+            awake_power_watts=duty_config.get("awake_power_watts", DEFAULT_AWAKE_POWER_WATTS),
+            stats_path=duty_config.get("stats_path", DEFAULT_STATS_PATH)
+        )
+
+    def _setup_telemetry(self) -> TelemetrySampler:
+        telemetry_config = self.config.get("telemetry", {})
+        return TelemetrySampler(
+            self.config["device_id"],
+            pijuice=self.pijuice,
+            battery_interval=telemetry_config.get("battery_interval", DEFAULT_BATTERY_INTERVAL),
+            publish_interval=telemetry_config.get("publish_interval", DEFAULT_PUBLISH_INTERVAL),
+            ip_ttl=telemetry_config.get("ip_ttl", DEFAULT_IP_TTL)
+        )
+
+    def _publish_telemetry(self, topic: str, payload: str, retain: bool) -> None:
+        if self.client and self.client.is_connected():
+            self.client.publish(topic, payload=payload, qos=1, retain=retain)
 
     def _blink_led(self) -> None:
+        """Blink the LED on the event loop without blocking the caller; a blink in progress absorbs the request."""
+        self._call_in_loop(self._start_led_blink)
+
+    def _start_led_blink(self) -> None:
+        if self._led_task is None or self._led_task.done():
+            self._led_task = self._loop.create_task(self._blink_led_async())
+
+    async def _blink_led_async(self) -> None:
         if self.config.get("mock_epd", False):
             logger.info("Mock mode: LED blink simulated")
             return
-            
+
+        pin = self.config["led_pin"]
         try:
-            pin = self.config["led_pin"]
             for _ in range(2):
                 GPIO.output(pin, GPIO.HIGH)
-                time.sleep(LED_BLINK_DURATION)
+                await asyncio.sleep(LED_BLINK_DURATION)
                 GPIO.output(pin, GPIO.LOW)
-                time.sleep(LED_BLINK_DURATION)
+                await asyncio.sleep(LED_BLINK_DURATION)
             logger.info("LED blinked")
+        except asyncio.CancelledError:
+            GPIO.output(pin, GPIO.LOW)
+            raise
         except Exception as e:
             logger.warning(f"Failed to blink LED: {e}")
 
-    def _get_ip(self) -> str:
-        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-            s.settimeout(0)
-            try:
-                s.connect(IP_CHECK_ADDRESS)
-                return s.getsockname()[0]
-            except Exception as e:
-                logger.warning(f"Failed to get IP: {e}")
-                return DEFAULT_IP
+    async def _stop_led_blink(self) -> None:
+        # Must run before GPIO.cleanup releases the pin
+        if self._led_task and not self._led_task.done():
+            self._led_task.cancel()
+            await asyncio.gather(self._led_task, return_exceptions=True)
+        self._led_task = None
 
     def _get_status_payload(self, status: str) -> str:
-        power_status, battery_percentage = self._get_charge_status()
-        return json.dumps({
-            "hostname": socket.gethostname(),
-            "ip_address": self._get_ip(),
-            "mac": self.config["device_id"],
-            'status': status,
-            'wired': power_status == 'PRESENT',
-            'battery': battery_percentage,
-        })
+        return self.telemetry.status_payload(status)
+
+    def _start_telemetry(self) -> None:
+        self.telemetry.start(
+            publish=lambda payload: self._publish_telemetry(self.config["topic_device_status"], payload, True),
+            publish_delta=lambda payload: self._publish_telemetry(
+                self.config["topic_device_status_delta"], payload, False)
+        )
+        if self.config.get("metrics", {}).get("enabled", True):
+            self.metrics.start(
+                publish=lambda payload: self._publish_telemetry(self.config["topic_device_metrics"], payload, False)
+            )
 
     def _on_connect_v5(self, client: mqtt.Client, userdata: Any, flags: Dict, rc: int, properties: mqtt.Properties) -> None:
         logger.info(f"Connected with result code {rc}")
-        client.subscribe(self.config["topic_image_display"])
-        props = mqtt.Properties(mqtt.PacketTypes.PUBLISH)
+        if rc != 0:
+            return
+        self.timeline.mark("mqtt_connected")
+        self.reconnect_policy.record_connected()
+        # Only QoS 1 subscriptions get messages queued by the broker while the frame is off
+        qos = 1 if self.duty_cycle else 0
+        _, self._display_subscription_mid = client.subscribe([(panel.topic, qos) for panel in self.panels])
+        if self.chunk_assembler:
+            client.subscribe(self.config["topic_image_chunks"] + "+/+", qos=1)
+            self._request_missing_chunks(client)
+        if self.playlist_player:
+            client.subscribe([(self.config["topic_playlist"], 1), (self.config["topic_playlist_images"] + "+", 1)])
+            self._request_missing_images(client)
+        if self.spi_clocks:
+            client.subscribe(self.config["topic_spi_calibration"], qos=1)
+        props = mqtt.Properties(PacketTypes.PUBLISH)
         client.publish(
             self.config["topic_device_status"],
             payload=self._get_status_payload('online'),
@@ -218,53 +658,629 @@ class EInkFrameClient:
             properties=props
         )
 
+    def _on_subscribe_v5(self, client: mqtt.Client, userdata: Any, mid: int, reason_codes: Any,
+                         properties: mqtt.Properties) -> None:
+        if mid == self._display_subscription_mid:
+            # Retained and queued images follow the SUBACK
+            self._last_message_at = time.monotonic()
+            self._display_subscribed.set()
+
     def _on_message(self, client: mqtt.Client, userdata: Any, msg: mqtt.MQTTMessage) -> None:
         logger.info(f"Received message on topic {msg.topic}")
-        if msg.topic == self.config["topic_image_display"]:
-            threading.Thread(target=self._process_image_message, args=(msg,)).start()
+        self._last_message_at = time.monotonic()
+        with self.metrics.span("receive"):
+            self._dispatch_message(msg)
+
+    def _dispatch_message(self, msg: mqtt.MQTTMessage) -> None:
+        panel = self._panels_by_topic.get(msg.topic)
+        if panel:
+            self.timeline.mark("first_message")
+            options = self._get_user_properties(msg)
+            job = RenderJob(
+                topic=msg.topic,
+                payload=msg.payload,
+                received_at=int(time.time()),
+                options=options
+            )
+            if options.get(MESSAGE_ID_PROPERTY):
+                job.message_key = ProcessedMessageTracker.message_key(msg.payload, options[MESSAGE_ID_PROPERTY])
+            panel.render_queue.put(job)
+        elif self.chunk_assembler and msg.topic.startswith(self.config["topic_image_chunks"]):
+            self._handle_chunk_message(msg)
+        elif self.playlist_player and msg.topic == self.config["topic_playlist"]:
+            self._handle_playlist_message(msg)
+        elif self.playlist_player and msg.topic.startswith(self.config["topic_playlist_images"]):
+            self._handle_playlist_image(msg)
+        elif self.spi_clocks and msg.topic == self.config["topic_spi_calibration"]:
+            self._handle_spi_calibration(msg)
 
-    def _process_image_message(self, msg: mqtt.MQTTMessage) -> None:
+    def _handle_chunk_message(self, msg: mqtt.MQTTMessage) -> None:
+        # Spool writes, state files and the checksum of a completed transfer would stall MQTT on the loop
+        self._loop.run_in_executor(self._chunk_executor, self._store_chunk, msg.topic, msg.payload)
+
+    def _store_chunk(self, topic: str, payload: bytes) -> None:
+        transfer_id, _, part = topic[len(self.config["topic_image_chunks"]):].partition("/")
         try:
-            if self.processed_message_tracker.should_process_message(msg.mid, msg.timestamp):
-                img = Image.open(io.BytesIO(msg.payload))
-                with self.e_ink_screen_lock:
-                    self.e_ink_screen.display_image_on_epd(img)
-                    self._blink_led()
-                    time.sleep(5)
-                    self.processed_message_tracker.mark_message_as_processed(msg.mid, msg.timestamp)
+            if part == MANIFEST_PART:
+                self.chunk_assembler.start(transfer_id, json.loads(payload))
+                return
+            transfer = self.chunk_assembler.add_chunk(transfer_id, int(part), payload)
+        except (ValueError, KeyError, OSError) as e:
+            logger.error(f"Error handling chunk message on {topic}: {e}")
+            return
+        if transfer and self.playlist_player and transfer.options.get(PLAYLIST_PROPERTY):
+            # Large playlist images arrive chunked; the verified spool file moves into the store
+            if self.playlist_player.store.adopt_image(transfer.sha256, transfer.path):
+                self.playlist_player.image_added()
+        elif transfer:
+            self._call_in_loop(self._queue_transfer, transfer)
+
+    def _queue_transfer(self, transfer: Transfer) -> None:
+        # Chunked transfers share one topic; the manifest options name the target panel
+        panel = self._panels_by_name.get(transfer.options.get(PANEL_PROPERTY), self.panels[0])
+        job = RenderJob(
+            topic=panel.topic,
+            payload=b"",
+            received_at=int(time.time()),
+            options=transfer.options,
+            payload_path=transfer.path,
+            message_key=ProcessedMessageTracker.message_key(
+                b"", transfer.options.get(MESSAGE_ID_PROPERTY) or f"sha256:{transfer.sha256}")
+        )
+        panel.render_queue.put(job)
+
+    def _request_missing_chunks(self, client: mqtt.Client) -> None:
+        for transfer in self.chunk_assembler.pending_transfers():
+            logger.info(f"Requesting missing chunks of transfer {transfer.transfer_id}")
+            client.publish(
+                self.config["topic_image_resume"],
+                payload=ChunkAssembler.resume_request(transfer),
+                qos=1
+            )
+
+    def _handle_playlist_message(self, msg: mqtt.MQTTMessage) -> None:
+        if not msg.payload:
+            return
+        try:
+            self.playlist_player.update(json.loads(msg.payload))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Error handling playlist: {e}")
+            return
+        self._request_missing_images(self.client)
+
+    def _handle_playlist_image(self, msg: mqtt.MQTTMessage) -> None:
+        image = msg.topic[len(self.config["topic_playlist_images"]):].lower()
+        if not is_sha256(image):
+            logger.warning(f"Ignoring playlist image with invalid hash on {msg.topic}")
+            return
+        # Hashing and writing a full image would stall MQTT, so both run off the loop
+        self._loop.run_in_executor(None, self._store_playlist_image, image, msg.payload)
+
+    def _store_playlist_image(self, image: str, payload: bytes) -> None:
+        if self.playlist_player.store.put_image(image, payload):
+            self.playlist_player.image_added()
+
+    def _handle_spi_calibration(self, msg: mqtt.MQTTMessage) -> None:
+        if msg.retain:
+            # A retained request would recalibrate on every reconnect
+            logger.warning("Ignoring retained SPI calibration request")
+            return
+        try:
+            names = json.loads(msg.payload).get("panels") if msg.payload else None
+        except (ValueError, AttributeError) as e:
+            logger.error(f"Error handling SPI calibration request: {e}")
+            return
+        panels = [panel for panel in self.panels if not names or panel.name in names]
+        if not self._renderer_ready.is_set() or not panels:
+            logger.warning("No display ready for SPI calibration")
+            return
+        if not self._calibration_lock.acquire(blocking=False):
+            logger.warning("SPI calibration already running")
+            return
+        logger.info(f"Calibrating the SPI clock of panel(s) {[panel.name for panel in panels]}")
+        threading.Thread(target=self._calibrate_panels, args=(panels,), name="spi-calibration", daemon=True).start()
+
+    def _request_missing_images(self, client: mqtt.Client) -> None:
+        missing = self.playlist_player.missing_images()
+        if not missing or not client:
+            return
+        logger.info(f"Requesting {len(missing)} missing playlist image(s)")
+        client.publish(
+            self.config["topic_playlist_missing"],
+            payload=json.dumps({"playlist_id": self.playlist_player.playlist.playlist_id, "missing": missing}),
+            qos=1
+        )
+
+    def _show_playlist_item(self, item: PlaylistItem, started: float) -> bool:
+        panel = self._panels_by_name.get(item.panel)
+        if panel is None:
+            logger.warning(f"Playlist item for unknown panel {item.panel}")
+            return False
+        logger.info(f"Playlist flips panel {panel.name} to {item.image}")
+        job = RenderJob(
+            topic=panel.topic,
+            payload=b"",
+            received_at=int(time.time()),
+            options=item.option_dict,
+            payload_path=self.playlist_player.store.image_path(item.image),
+            message_key=ProcessedMessageTracker.message_key(b"", f"{PLAYLIST_SEGMENT}:{item.image}@{started:.0f}"),
+            content_id=item.image
+        )
+        return panel.render_queue.put(job)
+
+    def _prefetch_playlist_item(self, item: PlaylistItem) -> bool:
+        panel = self._panels_by_name.get(item.panel)
+        if panel is None or panel.screen is None:
+            return False
+        store = self.playlist_player.store
+        signature = panel.screen.render_signature(item.option_dict)
+        if store.has_frame(item.image, signature):
+            return False
+        with open(store.image_path(item.image), "rb") as payload:
+            if self._is_wire_frame(payload):
+                # Server-rendered frames need no rendering ahead
+                return False
+            frame = self._render_uncached(panel, payload, item.option_dict)
+        store.put_frame(item.image, signature, frame)
+        logger.info(f"Prefetched playlist image {item.image} for panel {panel.name}")
+        return True
+
+    def _can_prefetch(self) -> bool:
+        # Rendering ahead costs power, so on battery it waits for external power unless configured otherwise
+        if not self._renderer_ready.is_set() or not self._render_idle():
+            return False
+        return self._prefetch_on_battery or self.telemetry.is_wired() is not False
+
+    def _playlist_frame(self, panel: Panel, image: str, payload: BinaryIO, options: Dict[str, str]) -> "PanelFrame":
+        store = self.playlist_player.store
+        signature = panel.screen.render_signature(options)
+        frame = store.get_frame(image, signature, self.frame_buffers)
+        if frame is not None:
+            logger.info("Using pre-rendered playlist frame")
+            return frame
+        frame = self._render_uncached(panel, payload, options)
+        store.put_frame(image, signature, frame)
+        return frame
+
+    @staticmethod
+    def _discard_job(job: RenderJob) -> None:
+        if job.payload_path and not job.content_id:
+            try:
+                os.remove(job.payload_path)
+            except OSError as e:
+                logger.warning(f"Failed to remove spooled payload {job.payload_path}: {e}")
+
+    @staticmethod
+    def _get_user_properties(msg: mqtt.MQTTMessage) -> Dict[str, str]:
+        properties = getattr(msg, "properties", None)
+        return dict(getattr(properties, "UserProperty", None) or [])
+
+    def _call_in_loop(self, callback, *args: Any) -> None:
+        """Run a callback on the event loop thread; does nothing while no loop runs."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            callback(*args)
+            return
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # The loop closed in the meantime
+            pass
+
+    def _request_shutdown(self) -> None:
+        self._shutdown_event.set()
+        if self._shutdown:
+            self._call_in_loop(self._shutdown.set)
+
+    async def _wait_shutdown(self, timeout: Optional[float] = None, event: Optional[asyncio.Event] = None) -> bool:
+        """
+        Wait for a shutdown request, the timeout or ``event``, whichever comes first.
+
+        Returns:
+            bool: Whether shutdown was requested
+        """
+        waiters = [asyncio.ensure_future(self._shutdown.wait())]
+        if event is not None:
+            waiters.append(asyncio.ensure_future(event.wait()))
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        return self._shutdown.is_set()
+
+    def _start_render_workers(self) -> None:
+        for panel in self.panels:
+            if panel.worker and not panel.worker.done():
+                continue
+            panel.worker = asyncio.create_task(self._render_loop(panel), name=f"render-{panel.name}")
+
+    def _stop_render_workers(self) -> None:
+        for panel in self.panels:
+            panel.render_queue.close()
+
+    async def _stop_render_tasks(self) -> None:
+        self._stop_render_workers()
+        tasks = []
+        for panel in self.panels:
+            if panel.current_task and not panel.displaying:
+                panel.current_task.cancel()
+            tasks.extend(task for task in (panel.worker, panel.current_task) if task)
+            if panel.worker:
+                panel.worker.cancel()
+            panel.worker = None
+        if tasks:
+            # Frames already being pushed to a panel finish before the displays are closed
+            await asyncio.wait(tasks, timeout=RENDER_DRAIN_TIMEOUT)
+
+    def _render_idle(self) -> bool:
+        return all(panel.render_queue.wait_idle(0) for panel in self.panels)
+
+    def _job_queued(self, panel: Panel, job: RenderJob) -> None:
+        # Runs on the event loop for every accepted job; a newer image makes the one still rendering obsolete
+        panel.wakeup.set()
+        current = panel.current_job
+        if current is not None and current.topic == job.topic and panel.current_task and not panel.displaying:
+            logger.info(f"Newer image for panel {panel.name}, cancelling the render in flight")
+            panel.current_task.cancel()
+
+    async def _render_loop(self, panel: Panel) -> None:
+        while not self._shutdown.is_set():
+            panel.wakeup.clear()
+            # Jobs stay queued (and coalesced) until the displays are set up
+            job = panel.render_queue.get(timeout=0) if self._renderer_ready.is_set() else None
+            if job is None:
+                await panel.wakeup.wait()
+                continue
+            self.metrics.record("queue_wait", time.monotonic() - job.enqueued_at)
+            panel.current_job = job
+            panel.current_task = asyncio.create_task(self._process_job(panel, job))
+            try:
+                await asyncio.wait([panel.current_task])
+            finally:
+                panel.current_job = panel.current_task = None
+                panel.displaying = False
+                panel.render_queue.task_done()
+
+    async def _process_job(self, panel: Panel, job: RenderJob) -> None:
+        """Prepare a job's frame on the executor and show it; cancellable until the frame goes to the panel."""
+        try:
+            future = self._executor.submit(self._prepare_frame, panel, job)
+            try:
+                prepared = await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                # A render that already started still finishes; its buffers go back to the pool
+                future.add_done_callback(self._release_prepared)
+                logger.info(f"Cancelled the render of a superseded image for panel {panel.name}")
+                raise
+            if prepared is None:
+                return
+            panel.displaying = True
+            await self._loop.run_in_executor(self._executor, self._show_frame, panel, job, *prepared)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Error processing image: {e}")
+        finally:
+            self._discard_job(job)
+
+    @staticmethod
+    def _release_prepared(future: Future) -> None:
+        if not future.cancelled() and future.exception() is None and future.result() is not None:
+            future.result()[0].release()
+
+    def _process_image_message(self, job: RenderJob, panel: Optional[Panel] = None) -> None:
+        """Render and show a job on the calling thread."""
+        panel = panel or self._panels_by_topic.get(job.topic, self.panels[0])
+        try:
+            prepared = self._prepare_frame(panel, job)
+            if prepared is not None:
+                self._show_frame(panel, job, *prepared)
+        except Exception as e:
+            logger.error(f"Error processing image: {e}")
+        finally:
+            self._discard_job(job)
+
+    def _prepare_frame(self, panel: Panel, job: RenderJob) -> Optional[Tuple["PanelFrame", str]]:
+        """
+        Turn a job's payload into a frame.
+
+        Returns:
+            tuple: The frame and the message key to mark once it is shown, or None for an
+            image that was already shown
+        """
+        if job.payload_path:
+            with open(job.payload_path, "rb") as payload:
+                return self._prepare_payload(panel, job, payload)
+        return self._prepare_payload(panel, job, job.payload)
+
+    def _prepare_payload(self, panel: Panel, job: RenderJob,
+                         payload: Union[bytes, BinaryIO]) -> Optional[Tuple["PanelFrame", str]]:
+        message_key = job.message_key or ProcessedMessageTracker.message_key(payload)
+        if panel.processed_message_tracker.is_message_processed(message_key):
+            return None
+        if self._is_wire_frame(payload):
+            frame = self._wire_frame(panel, payload)
+        elif job.content_id and self.playlist_player:
+            frame = self._playlist_frame(panel, job.content_id, payload, job.options)
+        else:
+            frame = self._render_payload(panel, payload, job.options)
+        return frame, message_key
+
+    def _show_frame(self, panel: Panel, job: RenderJob, frame: "PanelFrame", message_key: str) -> None:
+        with panel.lock:
+            panel.screen.display_frame(frame, job.options)
+            self.metrics.record("frame", time.monotonic() - job.enqueued_at)
+            if self.timeline.mark("first_frame"):
+                logger.info(f"Startup timeline: {self.timeline.as_dict()}")
+            if self.duty_cycle:
+                self.duty_cycle.record_frame()
+            panel.processed_message_tracker.mark_message_as_processed(message_key, int(time.time()))
+        self._blink_led()
+
+    @staticmethod
+    def _is_wire_frame(payload: Union[bytes, BinaryIO]) -> bool:
+        from wire_frame import is_wire_frame
+        return is_wire_frame(payload)
+
+    def _wire_frame(self, panel: Panel, payload: Union[bytes, BinaryIO]) -> "PanelFrame":
+        # Server-rendered frames skip the decoder, the renderer and the frame cache
+        from wire_frame import decode
+        with self.metrics.span("decode"):
+            return decode(payload, panel.width, panel.height, panel.screen.last_frame, self.frame_buffers)
+
+    def _render_payload(self, panel: Panel, payload: Union[bytes, BinaryIO], options: Dict[str, str]) -> "PanelFrame":
+        screen = panel.screen
+        cache_key = None
+        if self.frame_cache:
+            cache_key = self.frame_cache.make_key(payload, screen.render_signature(options))
+            frame = self.frame_cache.get(cache_key)
+            if frame is not None:
+                logger.info("Using cached frame")
+                return frame
+        frame = self._render_uncached(panel, payload, options)
+        if cache_key:
+            self.frame_cache.put(cache_key, frame)
+        return frame
+
+    def _render_uncached(self, panel: Panel, payload: Union[bytes, BinaryIO], options: Dict[str, str]) -> "PanelFrame":
+        if self.render_pool:
+            return self._render_on_pool(panel, payload, options)
+        with self.metrics.span("decode"):
+            img = panel.image_decoder.decode(payload, panel.screen.geometry_settings(options))
+        return panel.screen.render_frame(img, options)
+
+    def _render_on_pool(self, panel: Panel, payload: Union[bytes, BinaryIO], options: Dict[str, str]) -> "PanelFrame":
+        from render_pool import RenderRequest
+        request = RenderRequest(
+            width=panel.width,
+            height=panel.height,
+            max_image_pixels=panel.image_decoder.max_image_pixels,
+            max_payload_bytes=panel.image_decoder.max_payload_bytes,
+            geometry=panel.screen.geometry_settings(options),
+            tone=panel.screen.tone_settings(options)
+        )
+        # Spooled payloads are read by the worker itself instead of being pickled across
+        source = payload if isinstance(payload, (bytes, bytearray)) else payload.name
+        frame, timings = self.render_pool.render(source, request)
+        for stage, (seconds, cpu_seconds) in timings.items():
+            self.metrics.record(stage, seconds, cpu_seconds)
+        return frame
 
     def _on_disconnect_v5(self, client: mqtt.Client, userdata: Any, rc: int, properties: mqtt.Properties) -> None:
+        # Runs on the event loop: only record the event, reconnects are scheduled by _maintain_connection
         logger.info(f"Disconnected with result code {rc}")
-        props = mqtt.Properties(mqtt.PacketTypes.PUBLISH)
-        client.publish(
+        self.reconnect_policy.record_disconnected(rc)
+        if self._connection_lost:
+            self._call_in_loop(self._connection_lost.set)
+
+    def _publish_status(self, status: str) -> mqtt.MQTTMessageInfo:
+        props = mqtt.Properties(PacketTypes.PUBLISH)
+        return self.client.publish(
             self.config["topic_device_status"],
-            payload=self._get_status_payload('offline'),
+            payload=self._get_status_payload(status),
             qos=1,
             retain=True,
             properties=props
         )
-        if rc != 0:
-            time.sleep(RECONNECT_DELAY)
-            client.reconnect()
 
-    def run(self) -> None:
+    def _disconnect(self, status: str = 'offline') -> None:
+        # A clean disconnect suppresses the Last Will, so publish the offline status ourselves
+        if not self.client or not self.client.is_connected():
+            return
+        info = self._publish_status(status)
+        try:
+            self.client.loop(timeout=NETWORK_LOOP_TIMEOUT)
+            info.wait_for_publish(timeout=NETWORK_LOOP_TIMEOUT)
+        except (RuntimeError, ValueError) as e:
+            logger.warning(f"Failed to publish offline status: {e}")
+        self.client.disconnect()
+
+    async def _disconnect_async(self, status: str = 'offline') -> None:
+        """Like _disconnect, with the PUBACK of the status read by the event loop."""
+        if not self.client or not self.client.is_connected():
+            return
+        info = self._publish_status(status)
+        deadline = time.monotonic() + NETWORK_LOOP_TIMEOUT
+        try:
+            while not info.is_published() and time.monotonic() < deadline:
+                await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+            if not info.is_published():
+                logger.warning(f"Failed to publish {status} status")
+        except (RuntimeError, ValueError) as e:
+            logger.warning(f"Failed to publish {status} status: {e}")
+        self.client.disconnect()
+
+    def _connect(self) -> bool:
+        session = {}
+        if self.duty_cycle:
+            # Resume the broker-side session so images published while powered off are delivered
+            props = mqtt.Properties(PacketTypes.CONNECT)
+            props.SessionExpiryInterval = self.duty_cycle.session_expiry
+            session = {"clean_start": False, "properties": props}
         try:
             self.client.connect(
                 host=self.config["broker_address"],
                 port=self.config["broker_port"],
-                keepalive=30
+                keepalive=MQTT_KEEPALIVE,
+                **session
             )
-            self._blink_led()
+            return True
+        except OSError as e:
+            self.reconnect_policy.record_failure(e)
+            return False
+
+    async def _start_connection(self) -> None:
+        # DNS lookup and TCP connect block, so they run off the loop; the socket is handed to the loop
+        if not await self._loop.run_in_executor(None, self._connect):
+            self._connection_lost.set()
+        self.timeline.mark("mqtt_connect_sent")
+
+    async def _maintain_connection(self) -> None:
+        """Reconnect with the reconnect policy's backoff whenever the connection is lost, until shutdown."""
+        while not await self._wait_shutdown(event=self._connection_lost):
+            self._connection_lost.clear()
+            delay = self.reconnect_policy.next_delay()
+            logger.info(f"Not connected, reconnecting in {delay:.1f}s")
+            if await self._wait_shutdown(delay):
+                return
+            try:
+                await self._loop.run_in_executor(None, self.client.reconnect)
+            except OSError as e:
+                self.reconnect_policy.record_failure(e)
+                self._connection_lost.set()
+
+    def _stay_awake(self) -> bool:
+        self.telemetry.sample_battery()
+        if self.duty_cycle.stay_awake_when_wired and self.telemetry.is_wired():
+            logger.info("External power present, running continuously instead of duty cycling")
+            return True
+        return False
+
+    async def _run_duty_cycle(self) -> None:
+        """Wake, render pending images, publish status, schedule the next wake and power off."""
+        try:
+            self.duty_cycle.begin()
+            await self._start_connection()
+            if self.network_first:
+                self._start_renderer_setup()
+            self._start_render_workers()
+            if self.playlist_player:
+                self.playlist_player.start()
+            connection = asyncio.create_task(self._maintain_connection())
+            try:
+                await self._run_duty_cycle_loop()
+            finally:
+                connection.cancel()
+            if self._renderer_error:
+                logger.error(f"Renderer setup failed: {self._renderer_error}")
+        finally:
+            self._request_shutdown()
+            self._stop_playlist()
+            await self._stop_render_tasks()
+            self.metrics.stop()
+            await self._loop.run_in_executor(None, self._close_display)
+            self.duty_cycle.finish()
+            await self._disconnect_async(STATUS_SLEEPING)
+            await self._stop_led_blink()
+            GPIO.cleanup()
+        if not self._interrupted:
+            # Returns instead of exiting, so the loop and the atexit cleanup finish while the OS halts
+            if await self._loop.run_in_executor(None, self.duty_cycle.power_off):
+                logger.info("Shutdown started, exiting")
+
+    async def _run_duty_cycle_loop(self) -> None:
+        # Ends once subscribed, no message arrived for settle_time and every queued image is shown
+        deadline = time.monotonic() + self.duty_cycle.max_awake
+        while not await self._wait_shutdown(DUTY_CYCLE_LOOP_TIMEOUT):
+            now = time.monotonic()
+            if now >= deadline:
+                logger.warning(f"Still busy after {self.duty_cycle.max_awake}s, ending duty cycle")
+                return
+            if (self._display_subscribed.is_set()
+                    and now - self._last_message_at >= self.duty_cycle.settle_time
+                    and self._render_idle()):
+                return
+
+    async def _run_continuously(self) -> None:
+        try:
+            await self._start_connection()
+            if self.network_first:
+                self._start_renderer_setup()
+            self._start_render_workers()
+            if self.playlist_player:
+                self.playlist_player.start()
+            self._start_telemetry()
+            if not self.network_first:
+                self._blink_led()
             logger.info("E-Ink Frame Client started")
-            self.client.loop_forever()
-        except KeyboardInterrupt:
-            logger.info("Shutting down...")
+            await self._maintain_connection()
+            if self._renderer_error:
+                logger.error(f"Renderer setup failed: {self._renderer_error}")
+                raise self._renderer_error
         finally:
-            self._on_disconnect_v5(self.client, None, 0, None)
+            self._request_shutdown()
+            self._stop_playlist()
+            await self._stop_render_tasks()
+            self.telemetry.stop()
+            self.metrics.stop()
+            await self._loop.run_in_executor(None, self._close_display)
+            await self._disconnect_async()
+            await self._stop_led_blink()
             GPIO.cleanup()
 
+    def _on_signal(self) -> None:
+        logger.info("Shutting down...")
+        self._interrupted = True
+        self._request_shutdown()
+
+    async def _run(self) -> None:
+        """
+        Run the client on an asyncio event loop.
+
+        MQTT is served by the loop through the client's socket; decoding,
+        rendering and SPI transfers run on a thread executor so the loop
+        stays responsive. SIGINT and SIGTERM shut down in order: inputs,
+        render tasks, displays and finally the MQTT session.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._shutdown = asyncio.Event()
+        self._connection_lost = asyncio.Event()
+        if self._shutdown_event.is_set():
+            self._shutdown.set()
+        # One thread per panel renders while another pushes the previous frame
+        self._executor = ThreadPoolExecutor(max_workers=2 * len(self.panels), thread_name_prefix="render")
+        # A single thread stores chunks in the order they arrive, after their manifest
+        self._chunk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chunks")
+        self._mqtt_adapter = AsyncioMqttAdapter(self._loop, self.client)
+        signals = (signal.SIGINT, signal.SIGTERM)
+        for signum in signals:
+            self._loop.add_signal_handler(signum, self._on_signal)
+        try:
+            if self.duty_cycle and not self._stay_awake():
+                await self._run_duty_cycle()
+            else:
+                await self._run_continuously()
+        finally:
+            for signum in signals:
+                self._loop.remove_signal_handler(signum)
+            self._mqtt_adapter.detach()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            # Chunks not stored yet are missing from the persisted state and requested again
+            self._chunk_executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self) -> None:
+        try:
+            asyncio.run(self._run())
+        except KeyboardInterrupt:
+            logger.info("Shutting down...")
+
 def main():
     client = EInkFrameClient()
     client.run()
@@ -0,0 +1,353 @@
+"""
+Render pipeline benchmark.
+
+Replays a corpus of image payloads through EInkFrameClient._process_image_message
+against a timing-accurate mock EPD (mocked_epd.TimedEPD) and reports per-stage
+latency, peak RSS and throughput. Both render modes are measured by default:
+on the render pool's worker processes, as shipped, and in the client process.
+
+Usage:
+    python3 benchmark.py [--corpus DIR] [--repeat N] [--no-realtime] [--mode pool|inline|both] [--json FILE]
+
+Without --corpus a synthetic corpus of JPEG, PNG, WebP and GIF payloads in
+several sizes and aspect ratios is generated in memory.
+"""
+import argparse
+import importlib.util
+import io
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+import types
+from typing import Any, Dict, List, Tuple
+
+from PIL import Image
+
+DRIVER_PACKAGE = "omni_epd"
+
+
+class DriverPlaceholder(types.ModuleType):
+    """Stands in for a name of the IT8951 driver stack when it is not installed; fails once used."""
+
+    def __getattr__(self, name: str) -> "DriverPlaceholder":
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return DriverPlaceholder(f"{self.__name__}.{name}")
+
+    def __call__(self, *args: Any, **kwargs: Any) -> None:
+        raise ImportError(f"{self.__name__} is unavailable, {DRIVER_PACKAGE} is not installed")
+
+
+def guard_display_driver() -> None:
+    """
+    Let the client modules import without the display driver stack.
+
+    The benchmark only drives mock EPDs, so where omni_epd is not installed
+    its names resolve to placeholders instead of failing an eager import.
+    """
+    if DRIVER_PACKAGE in sys.modules:
+        if sys.modules[DRIVER_PACKAGE] is not None:
+            return
+    elif importlib.util.find_spec(DRIVER_PACKAGE) is not None:
+        return
+    sys.modules[DRIVER_PACKAGE] = DriverPlaceholder(DRIVER_PACKAGE)
+
+
+# The client modules are imported once the driver guard is in place
+guard_display_driver()
+
+from app import EInkFrameClient
+from e_ink_screen import EInkScreen
+from mocked_epd import TimedEPD
+from processed_message_tracker import ProcessedMessageTracker
+from render_queue import RenderJob
+
+# Constants
+SYNTHETIC_CORPUS = [
+    ("JPEG", (800, 600)),
+    ("JPEG", (1600, 1200)),
+    ("JPEG", (4000, 3000)),
+    ("JPEG", (6000, 4000)),
+    ("JPEG", (1200, 1600)),
+    ("JPEG", (4000, 1000)),
+    ("PNG", (1600, 1200)),
+    ("PNG", (3000, 2000)),
+    ("WEBP", (2000, 1500)),
+    ("GIF", (1024, 768)),
+]
+PIPELINE_STAGES = ("decode", "render", "ipc", "display")
+EPD_STAGES = ("wake", "spi_transfer", "refresh", "sleep")
+MODES = ("pool", "inline")
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimer:
+    """Collects wall-clock durations of wrapped instance methods per stage."""
+
+    def __init__(self):
+        self.current = {}
+
+    def wrap(self, obj: Any, method_name: str, stage: str) -> None:
+        method = getattr(obj, method_name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.current[stage] = self.current.get(stage, 0.0) + time.perf_counter() - start
+
+        setattr(obj, method_name, timed)
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.current[stage] = self.current.get(stage, 0.0) + seconds
+
+    def reset(self) -> Dict[str, float]:
+        timings, self.current = self.current, {}
+        return timings
+
+
+def synthetic_corpus() -> List[Tuple[str, bytes]]:
+    corpus = []
+    for image_format, size in SYNTHETIC_CORPUS:
+        # Gradient plus noise compresses like a photo rather than a flat fill
+        gradient = Image.linear_gradient("L").resize(size)
+        noise = Image.effect_noise(size, 40)
+        image = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+        buffer = io.BytesIO()
+        image.save(buffer, image_format)
+        corpus.append((f"{image_format.lower()}_{size[0]}x{size[1]}", buffer.getvalue()))
+    return corpus
+
+
+def load_corpus(directory: str) -> List[Tuple[str, bytes]]:
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                corpus.append((name, f.read()))
+    return corpus
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def offline_client(config_path: str, render_pool: bool = False, **overrides: Any) -> EInkFrameClient:
+    """
+    Build a client from ``config_path`` for offline use: a single mock
+    display, no cache, no chunked transfer, no PiJuice, display set up
+    synchronously. Frames are rendered in-process unless ``render_pool``
+    is set, which uses the config's render pool settings.
+    Further top-level config sections can be replaced via ``overrides``.
+    """
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    pool_config = {**config.get("render_pool", {}), "enabled": render_pool}
+    config.update({
+        "mock_epd": True,
+        "frame_cache": {"enabled": False},
+        "chunked_transfer": {"enabled": False},
+        "message_tracker": {"max_message_age": 3600},
+        "pijuice": {"enabled": False},
+        "duty_cycle": {"enabled": False},
+        "file_epd": {"enabled": False},
+        "startup": {"network_first": False},
+        "panels": [],
+        "render_pool": pool_config,
+        **overrides
+    })
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(config, f)
+        offline_config = f.name
+    try:
+        return EInkFrameClient(offline_config)
+    finally:
+        os.remove(offline_config)
+
+
+def build_client(config_path: str, realtime: bool, render_pool: bool) -> EInkFrameClient:
+    client = offline_client(config_path, render_pool=render_pool)
+    screen = client.e_ink_screen
+    screen.close()
+    epd = TimedEPD(screen.width, screen.height,
+                   spi_hz=screen.config_dict['waveshare_epd.it8951']['spi_hz'],
+                   realtime=realtime)
+    client.e_ink_screen = EInkScreen(
+        screen.width,
+        screen.height,
+        partial_refresh_max_ratio=screen.partial_refresh_max_ratio,
+        idle_timeout=screen.session.idle_timeout,
+        tone_settings=screen.gray16_processor.settings,
+        epd=epd,
+        metrics=client.metrics,
+        buffer_pool=client.frame_buffers,
+        refresh_settings=screen.waveform_selector.settings
+    )
+    return client
+
+
+def time_render_pool(client: EInkFrameClient, timer: StageTimer) -> None:
+    """
+    Split the time of a render on the pool into the decode and render time
+    reported by the worker and ``ipc``: submitting the payload, waiting for
+    a worker and copying the frame out of shared memory.
+    """
+    render = client.render_pool.render
+
+    def timed(payload, request):
+        start = time.perf_counter()
+        frame, timings = render(payload, request)
+        worker_seconds = 0.0
+        for stage, (seconds, _) in timings.items():
+            timer.add(stage, seconds)
+            worker_seconds += seconds
+        timer.add("ipc", time.perf_counter() - start - worker_seconds)
+        return frame, timings
+
+    client.render_pool.render = timed
+
+
+def worker_peak_rss_mb(client: EInkFrameClient) -> float:
+    # Peak of one worker; with a single panel the pool runs a single worker
+    usage = client.render_pool._executor.submit(resource.getrusage, resource.RUSAGE_SELF).result()
+    return usage.ru_maxrss / 1024
+
+
+def run_benchmark(corpus: List[Tuple[str, bytes]], repeat: int, realtime: bool,
+                  config_path: str, render_pool: bool = True) -> Dict[str, Any]:
+    client = build_client(config_path, realtime, render_pool)
+    if render_pool and not client.render_pool:
+        raise RuntimeError("Render pool failed to start")
+    epd = client.e_ink_screen.epd
+    timer = StageTimer()
+    if client.render_pool:
+        time_render_pool(client, timer)
+    else:
+        timer.wrap(client.image_decoder, "decode", "decode")
+        timer.wrap(client.e_ink_screen, "render_frame", "render")
+    timer.wrap(client.e_ink_screen, "display_frame", "display")
+
+    results = []
+    started = time.perf_counter()
+    for iteration in range(repeat):
+        for index, (name, payload) in enumerate(corpus):
+            job = RenderJob(
+                topic=client.config["topic_image_display"],
+                payload=payload,
+                received_at=int(time.time()),
+                message_key=ProcessedMessageTracker.message_key(b"", f"benchmark-{iteration}-{index}")
+            )
+            epd_before = len(epd.timings)
+            start = time.perf_counter()
+            client._process_image_message(job)
+            total = time.perf_counter() - start
+            stages = timer.reset()
+            for stage, seconds in epd.timings[epd_before:]:
+                stages[stage] = stages.get(stage, 0.0) + seconds
+            stages["total"] = total
+            results.append({"name": name, "bytes": len(payload), "stages": stages, "peak_rss_mb": peak_rss_mb()})
+            logger.info(f"{name}: {total * 1000:.0f} ms")
+    elapsed = time.perf_counter() - started
+    worker_rss = None
+    if client.render_pool:
+        worker_rss = round(worker_peak_rss_mb(client), 1)
+        client.render_pool.close()
+    client.e_ink_screen.close()
+
+    summary = {}
+    for stage in PIPELINE_STAGES + EPD_STAGES + ("total",):
+        values = [result["stages"].get(stage, 0.0) for result in results]
+        summary[stage] = {
+            "p50_ms": round(percentile(values, 0.5) * 1000, 1),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+            "max_ms": round(max(values, default=0.0) * 1000, 1)
+        }
+    return {
+        "mode": "pool" if render_pool else "inline",
+        "frames": len(results),
+        "realtime": realtime,
+        "elapsed_s": round(elapsed, 2),
+        "frames_per_minute": round(len(results) / elapsed * 60, 2) if elapsed else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "worker_peak_rss_mb": worker_rss,
+        "stages": summary,
+        "pipeline_metrics": client.metrics.snapshot(),
+        "frame_buffers": client.frame_buffers.stats(),
+        "results": results
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    columns = PIPELINE_STAGES + EPD_STAGES + ("total",)
+    print(f"Rendering {'on the render pool' if report['mode'] == 'pool' else 'in the client process'}")
+    print(f"{'payload':<22}{'KiB':>8}" + "".join(f"{stage:>14}" for stage in columns))
+    for result in report["results"]:
+        stages = result["stages"]
+        print(f"{result['name']:<22}{result['bytes'] / 1024:>8.0f}" +
+              "".join(f"{stages.get(stage, 0.0) * 1000:>11.1f} ms" for stage in columns))
+    print()
+    for stage, values in report["stages"].items():
+        print(f"{stage:<14} p50 {values['p50_ms']:>9.1f} ms   p95 {values['p95_ms']:>9.1f} ms   "
+              f"max {values['max_ms']:>9.1f} ms")
+    print()
+    print(f"{report['frames']} frames in {report['elapsed_s']} s "
+          f"({report['frames_per_minute']} frames/min), peak RSS {report['peak_rss_mb']} MiB"
+          + (f", worker {report['worker_peak_rss_mb']} MiB" if report["worker_peak_rss_mb"] is not None else "")
+          + ("" if report["realtime"] else " (EPD time accounted, not slept)"))
+
+
+def print_comparison(reports: List[Dict[str, Any]]) -> None:
+    print(f"{'mode':<10}{'total p50':>14}{'total p95':>14}{'frames/min':>14}{'peak RSS':>14}")
+    for report in reports:
+        total = report["stages"]["total"]
+        print(f"{report['mode']:<10}{total['p50_ms']:>11.1f} ms{total['p95_ms']:>11.1f} ms"
+              f"{report['frames_per_minute']:>14}{report['peak_rss_mb']:>10.1f} MiB")
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the render pipeline against a timed mock EPD")
+    parser.add_argument("--corpus", help="Directory of image payloads (default: synthetic corpus)")
+    parser.add_argument("--config", default="config.json", help="Client config to benchmark")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of passes over the corpus")
+    parser.add_argument("--no-realtime", action="store_true", help="Account EPD time without sleeping")
+    parser.add_argument("--mode", choices=MODES + ("both",), default="both",
+                        help="Render on the render pool, in the client process or both (default)")
+    parser.add_argument("--json", help="Write the full report to this file")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not corpus:
+        sys.exit("Corpus is empty")
+    reports = []
+    # Peak RSS is a high-water mark, so the pool runs first while this process has not decoded anything yet
+    for mode in (MODES if args.mode == "both" else (args.mode,)):
+        reports.append(run_benchmark(corpus, args.repeat, not args.no_realtime, args.config, mode == "pool"))
+        print_report(reports[-1])
+        print()
+    if len(reports) > 1:
+        print_comparison(reports)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports if len(reports) > 1 else reports[0], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
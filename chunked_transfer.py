@@ -0,0 +1,242 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Constants
+CHUNKED_SEGMENT = "chunked"
+MANIFEST_PART = "manifest"
+RESUME_SEGMENT = "resume"
+DEFAULT_SPOOL_DIR = "cache/transfers"
+DEFAULT_MAX_AGE = 3600
+HASH_READ_SIZE = 256 * 1024
+PART_SUFFIX = ".part"
+STATE_SUFFIX = ".json"
+
+logger = logging.getLogger(__name__)
+
+
+class Transfer:
+    """State of one chunked image transfer, backed by a spool file."""
+
+    def __init__(self, transfer_id: str, manifest: Dict[str, Any], path: str,
+                 received: Optional[set] = None, started_at: Optional[float] = None):
+        self.transfer_id = transfer_id
+        self.size = int(manifest["size"])
+        self.chunk_size = int(manifest["chunk_size"])
+        self.chunks = int(manifest["chunks"])
+        self.sha256 = manifest["sha256"].lower()
+        self.options = dict(manifest.get("options", {}))
+        self.path = path
+        self.received = received if received is not None else set()
+        self.started_at = started_at if started_at is not None else time.time()
+        if self.chunks != -(-self.size // self.chunk_size):
+            raise ValueError(f"Manifest of transfer {transfer_id} has inconsistent size and chunk count")
+
+    @property
+    def complete(self) -> bool:
+        return len(self.received) == self.chunks
+
+    def missing_ranges(self) -> List[Tuple[int, int]]:
+        """Missing chunk indices as inclusive (first, last) ranges."""
+        ranges = []
+        start = None
+        for index in range(self.chunks + 1):
+            missing = index < self.chunks and index not in self.received
+            if missing and start is None:
+                start = index
+            elif not missing and start is not None:
+                ranges.append((start, index - 1))
+                start = None
+        return ranges
+
+    def manifest(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "chunk_size": self.chunk_size,
+            "chunks": self.chunks,
+            "sha256": self.sha256,
+            "options": self.options
+        }
+
+
+class ChunkAssembler:
+    """
+    Reassembles chunked image transfers into spool files.
+
+    A publisher sends a JSON manifest (size, chunk_size, chunks, sha256 and
+    optional render options) to ``<display topic>/chunked/<id>/manifest``
+    followed by raw chunks on ``<display topic>/chunked/<id>/<index>``. Each
+    chunk is written straight to its offset in the spool file and progress
+    is persisted, so a transfer survives reconnects and restarts and only
+    the missing chunks need to be resent.
+    """
+
+    def __init__(self, spool_dir: str = DEFAULT_SPOOL_DIR, max_size: Optional[int] = None,
+                 max_age: float = DEFAULT_MAX_AGE):
+        """
+        Args:
+            spool_dir (str): Directory for partial transfers
+            max_size (int): Largest accepted transfer in bytes
+            max_age (float): Seconds after which an incomplete transfer is discarded
+        """
+        self.spool_dir = spool_dir
+        self.max_size = max_size
+        self.max_age = max_age
+        self._transfers = {}
+        self._lock = threading.Lock()
+        os.makedirs(spool_dir, exist_ok=True)
+        self._load_transfers()
+
+    def start(self, transfer_id: str, manifest: Dict[str, Any]) -> None:
+        """
+        Begin (or keep resuming) a transfer described by a manifest.
+
+        Raises:
+            ValueError: If the manifest is invalid or the transfer is too large
+        """
+        self._validate_id(transfer_id)
+        with self._lock:
+            self._expire_transfers()
+            existing = self._transfers.get(transfer_id)
+            if existing and existing.manifest() == Transfer(transfer_id, manifest, existing.path).manifest():
+                logger.info(f"Resuming transfer {transfer_id}, {len(existing.received)}/{existing.chunks} chunks")
+                return
+            if existing:
+                self._discard(transfer_id)
+            transfer = Transfer(transfer_id, manifest, self._path(transfer_id, PART_SUFFIX))
+            if self.max_size is not None and transfer.size > self.max_size:
+                raise ValueError(f"Transfer of {transfer.size} bytes exceeds limit of {self.max_size} bytes")
+            with open(transfer.path, "wb") as f:
+                f.truncate(transfer.size)
+            self._transfers[transfer_id] = transfer
+            self._save_state(transfer)
+            logger.info(f"Started transfer {transfer_id}: {transfer.size} bytes in {transfer.chunks} chunks")
+
+    def add_chunk(self, transfer_id: str, index: int, data: bytes) -> Optional[Transfer]:
+        """
+        Store one chunk.
+
+        Writes the spool and state files and hashes a completed transfer, so
+        it is called off the event loop.
+
+        Returns:
+            Optional[Transfer]: The transfer once all chunks arrived and the checksum
+                matched; ownership of its spool file passes to the caller
+        """
+        with self._lock:
+            transfer = self._transfers.get(transfer_id)
+            if transfer is None:
+                logger.debug(f"Ignoring chunk {index} of unknown transfer {transfer_id}")
+                return None
+            if not 0 <= index < transfer.chunks:
+                logger.warning(f"Ignoring out of range chunk {index} of transfer {transfer_id}")
+                return None
+            expected = min(transfer.chunk_size, transfer.size - index * transfer.chunk_size)
+            if len(data) != expected:
+                logger.warning(f"Ignoring chunk {index} of transfer {transfer_id}: "
+                               f"{len(data)} bytes, expected {expected}")
+                return None
+            if index not in transfer.received:
+                with open(transfer.path, "r+b") as f:
+                    f.seek(index * transfer.chunk_size)
+                    f.write(data)
+                transfer.received.add(index)
+                self._save_state(transfer)
+            if not transfer.complete:
+                return None
+
+            del self._transfers[transfer_id]
+            self._remove_file(self._path(transfer_id, STATE_SUFFIX))
+        # The transfer is no longer tracked, so hashing it does not hold up other transfers
+        if self._file_sha256(transfer.path) != transfer.sha256:
+            logger.error(f"Checksum mismatch for transfer {transfer_id}, discarding")
+            self._remove_file(transfer.path)
+            return None
+        logger.info(f"Completed transfer {transfer_id}")
+        return transfer
+
+    def pending_transfers(self) -> List[Transfer]:
+        """Incomplete transfers that can be resumed."""
+        with self._lock:
+            self._expire_transfers()
+            return list(self._transfers.values())
+
+    @staticmethod
+    def resume_request(transfer: Transfer) -> str:
+        """JSON payload asking the publisher to resend the missing chunks."""
+        return json.dumps({
+            "transfer_id": transfer.transfer_id,
+            "missing": transfer.missing_ranges()
+        })
+
+    def _load_transfers(self) -> None:
+        for name in os.listdir(self.spool_dir):
+            path = os.path.join(self.spool_dir, name)
+            if name.endswith(STATE_SUFFIX):
+                transfer_id = name[:-len(STATE_SUFFIX)]
+                try:
+                    with open(path, "r") as f:
+                        state = json.load(f)
+                    transfer = Transfer(transfer_id, state["manifest"], self._path(transfer_id, PART_SUFFIX),
+                                        set(state["received"]), state["started_at"])
+                    if not os.path.exists(transfer.path):
+                        raise ValueError("spool file is missing")
+                    self._transfers[transfer_id] = transfer
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"Discarding unreadable transfer state {name}: {e}")
+                    self._remove_file(path)
+        for name in os.listdir(self.spool_dir):
+            if name.endswith(PART_SUFFIX) and name[:-len(PART_SUFFIX)] not in self._transfers:
+                self._remove_file(os.path.join(self.spool_dir, name))
+        self._expire_transfers()
+        if self._transfers:
+            logger.info(f"Found {len(self._transfers)} resumable transfer(s)")
+
+    def _expire_transfers(self) -> None:
+        now = time.time()
+        for transfer_id, transfer in list(self._transfers.items()):
+            if now - transfer.started_at > self.max_age:
+                logger.info(f"Discarding stale transfer {transfer_id}")
+                self._discard(transfer_id)
+
+    def _discard(self, transfer_id: str) -> None:
+        transfer = self._transfers.pop(transfer_id)
+        self._remove_file(transfer.path)
+        self._remove_file(self._path(transfer_id, STATE_SUFFIX))
+
+    def _save_state(self, transfer: Transfer) -> None:
+        path = self._path(transfer.transfer_id, STATE_SUFFIX)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump({
+                "manifest": transfer.manifest(),
+                "received": sorted(transfer.received),
+                "started_at": transfer.started_at
+            }, f)
+        os.replace(f"{path}.tmp", path)
+
+    @staticmethod
+    def _file_sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_READ_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _validate_id(transfer_id: str) -> None:
+        if not transfer_id or not all(c.isalnum() or c in "-_" for c in transfer_id):
+            raise ValueError(f"Invalid transfer id '{transfer_id}'")
+
+    def _path(self, transfer_id: str, suffix: str) -> str:
+        return os.path.join(self.spool_dir, transfer_id + suffix)
@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from metrics import PipelineMetrics
+
+# Constants
+DEFAULT_IDLE_TIMEOUT = 60
+
+logger = logging.getLogger(__name__)
+
+
+class DisplaySession:
+    """
+    Keeps the display controller awake between back-to-back frames.
+
+    The controller is prepared on first use and only put to sleep and closed
+    after ``idle_timeout`` seconds without activity, so consecutive frames
+    skip the SPI/GPIO setup, VCOM programming and wake-up cost.
+    """
+
+    def __init__(self, epd, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 metrics: Optional[PipelineMetrics] = None,
+                 bus_lock: Optional[threading.Lock] = None):
+        """
+        Args:
+            epd: Display driver exposing prepare(), sleep() and close()
+            idle_timeout (float): Seconds of inactivity before the controller is put to sleep;
+                0 sleeps right after every frame
+            metrics (PipelineMetrics): Receives the wake and sleep spans
+            bus_lock (threading.Lock): Held while waking and sleeping the controller, shared by
+                panels on the same SPI bus
+        """
+        self.epd = epd
+        self.idle_timeout = idle_timeout
+        self.pipeline_metrics = metrics if metrics is not None else PipelineMetrics()
+        self.bus_lock = bus_lock or threading.Lock()
+        self.is_open = False
+        self.wakeups = 0
+        self.reuses = 0
+        self.wake_seconds = 0.0
+        self._active = 0
+        self._generation = 0
+        self._timer = None
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def active(self):
+        """Hold the controller awake for the duration of the block."""
+        self.acquire()
+        try:
+            yield self.epd
+        except Exception:
+            try:
+                self.close()
+            except Exception:
+                pass
+            raise
+        finally:
+            self.release()
+
+    def acquire(self) -> None:
+        """Wake the controller unless a warm session is still open."""
+        with self._lock:
+            self._cancel_timer()
+            self._active += 1
+            if self.is_open:
+                self.reuses += 1
+                logger.info(f"Reusing warm display session, saved ~{self._average_wake_seconds():.2f}s")
+                return
+            start = time.monotonic()
+            try:
+                with self.bus_lock, self.pipeline_metrics.span('wake'):
+                    self.epd.prepare()
+            except Exception:
+                self._active -= 1
+                raise
+            self.wake_seconds += time.monotonic() - start
+            self.wakeups += 1
+            self.is_open = True
+
+    def release(self) -> None:
+        """Schedule the controller to sleep once the idle timeout expires."""
+        with self._lock:
+            self._active = max(0, self._active - 1)
+            if self._active or not self.is_open:
+                return
+            if self.idle_timeout <= 0:
+                self.close()
+                return
+            self._generation += 1
+            self._timer = threading.Timer(self.idle_timeout, self._on_idle, args=(self._generation,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def close(self) -> None:
+        """Put the controller to sleep and close the connection now."""
+        with self._lock:
+            self._cancel_timer()
+            if not self.is_open:
+                return
+            self.is_open = False
+            try:
+                logger.info("Putting E-Ink screen to sleep")
+                with self.bus_lock, self.pipeline_metrics.span('sleep'):
+                    self.epd.sleep()
+                    self.epd.close()
+            except Exception as e:
+                logger.error(f"Failed to sleep display: {e}")
+                raise
+
+    def metrics(self) -> Dict[str, Any]:
+        """Wake-up counters and the estimated time saved by reusing the session."""
+        with self._lock:
+            average = self._average_wake_seconds()
+            return {
+                'wakeups': self.wakeups,
+                'reuses': self.reuses,
+                'avg_wake_seconds': round(average, 3),
+                'wake_seconds_saved': round(average * self.reuses, 3)
+            }
+
+    def _on_idle(self, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation or self._active:
+                return
+            logger.debug(f"Display idle for {self.idle_timeout}s")
+            try:
+                self.close()
+            except Exception:
+                pass
+
+    def _cancel_timer(self) -> None:
+        self._generation += 1
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def _average_wake_seconds(self) -> float:
+        return self.wake_seconds / self.wakeups if self.wakeups else 0.0
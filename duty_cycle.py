@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from metrics import process_age, system_uptime
+from pijuice_handler import PiJuiceHandler, DEFAULT_POWER_OFF_DELAY
+
+# Constants
+DEFAULT_WAKE_INTERVAL = 1800
+DEFAULT_SETTLE_TIME = 2.0
+DEFAULT_MAX_AWAKE = 60.0
+DEFAULT_SESSION_EXPIRY = 7 * 24 * 3600
+DEFAULT_AWAKE_POWER_WATTS = 1.5
+DEFAULT_STATS_PATH = "cache/duty_cycle.json"
+MAX_BOOT_SECONDS = 120
+
+logger = logging.getLogger(__name__)
+
+
+class DutyCycle:
+    """
+    Wake-render-sleep cycle for battery-powered frames.
+
+    Each cycle the frame wakes on the PiJuice RTC alarm, picks up pending
+    images from a persistent MQTT session, renders, programs the next
+    alarm and powers off. Awake time is measured from system boot, energy
+    is integrated from PiJuice IO power samples (or a configured estimate),
+    and the totals are persisted across power cycles to report energy per
+    frame.
+    """
+
+    def __init__(self, pijuice=None,
+                 wake_interval: float = DEFAULT_WAKE_INTERVAL,
+                 settle_time: float = DEFAULT_SETTLE_TIME,
+                 max_awake: float = DEFAULT_MAX_AWAKE,
+                 session_expiry: int = DEFAULT_SESSION_EXPIRY,
+                 power_off_delay: int = DEFAULT_POWER_OFF_DELAY,
+                 stay_awake_when_wired: bool = True,
+                 awake_power_watts: float = DEFAULT_AWAKE_POWER_WATTS,
+                 stats_path: Optional[str] = DEFAULT_STATS_PATH):
+        """
+        Args:
+            pijuice: Initialized PiJuice handle, or None to run the cycle without powering off
+            wake_interval (float): Seconds between wakeups, aligned to the wall clock
+            settle_time (float): Seconds without new messages after which the cycle may end
+            max_awake (float): Upper bound of the awake time per cycle
+            session_expiry (int): Seconds the broker keeps the session while the frame is off
+            power_off_delay (int): Seconds PiJuice waits for the OS to halt before cutting power
+            stay_awake_when_wired (bool): Keep running continuously while external power is present
+            awake_power_watts (float): Power estimate used when PiJuice cannot measure it
+            stats_path (str): JSON file keeping the totals across power cycles
+        """
+        self.pijuice = pijuice
+        self.wake_interval = wake_interval
+        self.settle_time = settle_time
+        self.max_awake = max_awake
+        self.session_expiry = session_expiry
+        self.power_off_delay = power_off_delay
+        self.stay_awake_when_wired = stay_awake_when_wired
+        self.awake_power_watts = awake_power_watts
+        self.stats_path = stats_path
+        self.frames = 0
+        self.next_wake = None
+        self._power_samples = []
+        self._totals = {'cycles': 0, 'frames': 0, 'awake_seconds': 0.0, 'energy_joules': 0.0}
+        self._last_cycle = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def begin(self) -> None:
+        """Start a cycle: acknowledge the alarm that woke us and take a first power sample."""
+        if self.pijuice:
+            PiJuiceHandler.clear_wakeup_alarm(self.pijuice)
+        self.sample_power()
+
+    def sample_power(self) -> None:
+        if not self.pijuice:
+            return
+        watts = PiJuiceHandler.read_power(self.pijuice)
+        if watts is not None:
+            with self._lock:
+                self._power_samples.append(watts)
+
+    def record_frame(self) -> None:
+        with self._lock:
+            self.frames += 1
+
+    def awake_seconds(self) -> float:
+        """
+        Seconds since the system booted for this cycle.
+
+        Falls back to the process age when the system was already running
+        when the client started, e.g. during development.
+        """
+        uptime = system_uptime()
+        age = process_age()
+        if uptime is not None and age is not None and uptime - age <= MAX_BOOT_SECONDS:
+            return uptime
+        return age or 0.0
+
+    def next_wake_time(self, now: Optional[datetime] = None) -> datetime:
+        """Next wakeup on the ``wake_interval`` grid, at least ``power_off_delay`` from now."""
+        now = now or datetime.now(timezone.utc)
+        earliest = now.timestamp() + self.power_off_delay
+        slot = (earliest // self.wake_interval + 1) * self.wake_interval
+        return datetime.fromtimestamp(slot, timezone.utc)
+
+    def finish(self) -> Dict[str, Any]:
+        """Close the cycle, persist the totals and return the cycle's stats."""
+        self.sample_power()
+        self.next_wake = self.next_wake_time()
+        awake = self.awake_seconds()
+        with self._lock:
+            if self._power_samples:
+                watts = sum(self._power_samples) / len(self._power_samples)
+                measured = True
+            else:
+                watts = self.awake_power_watts
+                measured = False
+            energy = watts * awake
+            self._last_cycle = {
+                'awake_seconds': round(awake, 2),
+                'frames': self.frames,
+                'avg_power_watts': round(watts, 3),
+                'power_measured': measured,
+                'energy_joules': round(energy, 1),
+                'next_wake': self.next_wake.isoformat()
+            }
+            self._totals['cycles'] += 1
+            self._totals['frames'] += self.frames
+            self._totals['awake_seconds'] += awake
+            self._totals['energy_joules'] += energy
+            self._save()
+            logger.info(f"Duty cycle finished: {self._last_cycle}")
+            return dict(self._last_cycle)
+
+    def power_off(self) -> bool:
+        """
+        Program the next RTC wakeup and start the shutdown; only logs without a PiJuice.
+
+        Returns:
+            bool: Whether the shutdown was started; the caller then exits normally
+        """
+        if self.next_wake is None:
+            self.next_wake = self.next_wake_time()
+        if not self.pijuice:
+            logger.info(f"No PiJuice available, not powering off (next wake {self.next_wake.isoformat()})")
+            return False
+        if not PiJuiceHandler.schedule_wakeup(self.pijuice, self.next_wake):
+            # Without an alarm the frame would never wake again, so keep it running
+            logger.error("RTC wakeup could not be scheduled, staying powered on")
+            return False
+        logger.info(f"Powering off, PiJuice cuts power in {self.power_off_delay}s")
+        return PiJuiceHandler.safe_pijuice_shutdown(self.pijuice, self.power_off_delay)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Per-cycle and lifetime awake time and energy for status reporting."""
+        with self._lock:
+            totals = self._totals
+            return {
+                'cycles': totals['cycles'],
+                'frames': totals['frames'],
+                'avg_awake_seconds': round(totals['awake_seconds'] / totals['cycles'], 2) if totals['cycles'] else 0.0,
+                'energy_per_frame_joules': round(totals['energy_joules'] / totals['frames'], 1) if totals['frames'] else None,
+                'total_energy_joules': round(totals['energy_joules'], 1),
+                'last_cycle': self._last_cycle
+            }
+
+    def _load(self) -> None:
+        if not self.stats_path or not os.path.exists(self.stats_path):
+            return
+        try:
+            with open(self.stats_path, "r") as f:
+                stats = json.load(f)
+            self._totals.update({key: stats['totals'][key] for key in self._totals})
+            self._last_cycle = stats.get('last_cycle')
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Failed to load duty cycle stats: {e}")
+
+    def _save(self) -> None:
+        if not self.stats_path:
+            return
+        tmp_path = f"{self.stats_path}.tmp"
+        try:
+            directory = os.path.dirname(self.stats_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump({'totals': self._totals, 'last_cycle': self._last_cycle}, f)
+            os.replace(tmp_path, self.stats_path)
+        except OSError as e:
+            logger.warning(f"Failed to persist duty cycle stats: {e}")
@@ -1,23 +1,48 @@
-from typing import Tuple, Optional
+from typing import Optional, Dict, Any, Callable, Sequence
+import json
 import logging
+import threading
 import time
-from omni_epd import displayfactory, EPDNotFoundError
+from display_session import DisplaySession, DEFAULT_IDLE_TIMEOUT
+from gray16_processor import Gray16Processor, ToneSettings
+from geometry import GeometryProcessor, GeometrySettings
+from frame_diff import dirty_regions, region_area
+from panel_frame import PanelFrame
+from frame_buffers import FrameBufferPool
+from metrics import PipelineMetrics
+from refresh_timing import RefreshTimeModel
+from waveform import DISPLAY_MODES, RefreshSettings, WaveformSelector
+from spi_calibration import (CalibrationResult, SPI_CLOCKS_HZ, FALLBACK_SPI_HZ, calibrate, is_communication_error,
+                             probe_controller, slower_clock)
 
 # Constants
 DISPLAY_TYPE = "waveshare_epd.it8951"
 DEFAULT_WIDTH = 1600
 DEFAULT_HEIGHT = 1200
-ROTATION_FACTOR = 90
 MAX_RETRIES = 3
 RETRY_DELAY = 2
 VCOM = -2.27  # Specific VCOM value for your hardware
+DRIVER_MODE = "GC16"  # waveform of the driver's own display() call
+DEFAULT_PARTIAL_REFRESH_MAX_RATIO = 0.35
 
 logger = logging.getLogger(__name__)
 
 class EInkScreen:
     """Manages the E-Ink display operations."""
     
-    def __init__(self, width: int, height: int, mock_epd: bool = False):
+    def __init__(self, width: int, height: int, mock_epd: bool = False,
+                 partial_refresh_max_ratio: float = DEFAULT_PARTIAL_REFRESH_MAX_RATIO,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 tone_settings: Optional[ToneSettings] = None,
+                 geometry_settings: Optional[GeometrySettings] = None,
+                 epd=None,
+                 metrics: Optional[PipelineMetrics] = None,
+                 driver_options: Optional[Dict[str, Any]] = None,
+                 bus_lock: Optional[threading.Lock] = None,
+                 buffer_pool: Optional[FrameBufferPool] = None,
+                 on_spi_fallback: Optional[Callable[[int, str], None]] = None,
+                 refresh_model: Optional[RefreshTimeModel] = None,
+                 refresh_settings: Optional[RefreshSettings] = None):
         """
         Initialize the E-Ink screen with specified dimensions.
         
@@ -25,11 +50,39 @@ class EInkScreen:
             width (int): Width of the screen in pixels
             height (int): Height of the screen in pixels
             mock_epd (bool): Flag to use mock EPD for testing
+            partial_refresh_max_ratio (float): Largest changed fraction of the panel that is
+                refreshed partially; 0 disables partial refreshes
+            idle_timeout (float): Seconds the controller stays awake after the last frame
+            tone_settings (ToneSettings): Default tone curve and dithering for rendered frames
+            geometry_settings (GeometrySettings): Default rotation, fit mode and focal point
+            epd: Pre-built display driver to use instead of loading one, e.g. a benchmark mock
+            metrics (PipelineMetrics): Receives the render, wake, transfer, refresh and sleep spans
+            driver_options (dict): Overrides of the IT8951 driver settings, e.g. spi_bus, spi_device,
+                reset_pin, busy_pin and vcom of one panel of a multi-panel frame
+            bus_lock (threading.Lock): Held for every SPI access, shared by panels on the same bus
+            buffer_pool (FrameBufferPool): Source of the level, image and change mask buffers
+            on_spi_fallback (Callable): Called with the new clock and the error after a communication
+                failure lowered the SPI clock
+            refresh_model (RefreshTimeModel): Refresh time per waveform mode, calibrated from the busy
+                pin and waited out by drivers without one
+            refresh_settings (RefreshSettings): Default waveform selection and full refresh interval
         """
         self.width = width
         self.height = height
         self.mock_epd = mock_epd
+        self.partial_refresh_max_ratio = partial_refresh_max_ratio
         self.epd = None
+        self.last_frame = None
+        self.metrics = metrics if metrics is not None else PipelineMetrics()
+        self.bus_lock = bus_lock or threading.Lock()
+        self.buffer_pool = buffer_pool or FrameBufferPool()
+        self._display_buffer = None
+        self._change_mask = None
+        self.on_spi_fallback = on_spi_fallback
+        self.refresh_model = refresh_model or RefreshTimeModel()
+        self.waveform_selector = WaveformSelector(refresh_settings)
+        # Only a driver loaded here can be reloaded at another SPI clock
+        self.reloadable = epd is None and not mock_epd
         
         # Update configuration dictionary structure
         self.config_dict = {
@@ -51,8 +104,15 @@ class EInkScreen:
                 'contrast': 1
             }
         }
+        if driver_options:
+            self.config_dict[DISPLAY_TYPE].update(driver_options)
+            if 'vcom' in driver_options:
+                self.config_dict['EPD']['vcom'] = driver_options['vcom']
         
-        if mock_epd:
+        if epd is not None:
+            self.epd = epd
+            logger.info(f"Using provided EPD driver {type(epd).__name__}")
+        elif mock_epd:
             try:
                 from mocked_epd import EPD
                 self.epd = EPD()
@@ -61,42 +121,178 @@ class EInkScreen:
                 logger.error("Mock EPD requested but mocked_epd.py not found")
                 raise
         else:
-            try:
-                # Try to initialize the display with retries
-                for attempt in range(MAX_RETRIES):
-                    try:
-                        logger.debug(f"Attempting to initialize display (attempt {attempt + 1}/{MAX_RETRIES})")
-                        self.epd = displayfactory.load_display_driver(DISPLAY_TYPE, self.config_dict)
-                        self.epd.width = self.width
-                        self.epd.height = self.height
-                        logger.info("Display initialized successfully")
-                        break
-                    except RuntimeError as e:
-                        if "communication with device failed" in str(e):
-                            if attempt < MAX_RETRIES - 1:
-                                logger.warning(f"Communication failed, retrying in {RETRY_DELAY} seconds...")
-                                time.sleep(RETRY_DELAY)
-                            else:
-                                logger.error("Failed to communicate with display after all retries")
-                                raise RuntimeError("Could not establish communication with display")
-                        else:
-                            raise
-            except Exception as e:
-                logger.error(f"Failed to initialize display driver: {e}")
-                raise
+            self.epd = self._load_driver()
 
         logger.info(f"Initialized E-Ink screen with mock_epd={mock_epd}")
         self.image_display = None
+        self.session = DisplaySession(self.epd, idle_timeout, self.metrics, self.bus_lock)
+        self.gray16_processor = Gray16Processor(tone_settings, self.buffer_pool)
+        self.geometry_processor = GeometryProcessor(width, height, geometry_settings)
+
+    def _load_driver(self):
+        """Load the IT8951 driver with the current settings, retrying failed communication."""
+        try:
+            # The driver stack is only imported when real hardware is used
+            from omni_epd import displayfactory
+            # Try to initialize the display with retries
+            for attempt in range(MAX_RETRIES):
+                try:
+                    logger.debug(f"Attempting to initialize display (attempt {attempt + 1}/{MAX_RETRIES})")
+                    epd = displayfactory.load_display_driver(DISPLAY_TYPE, self.config_dict)
+                    epd.width = self.width
+                    epd.height = self.height
+                    logger.info(f"Display initialized successfully at {self.spi_hz} Hz SPI clock")
+                    return epd
+                except RuntimeError as e:
+                    if "communication with device failed" in str(e):
+                        if attempt < MAX_RETRIES - 1:
+                            logger.warning(f"Communication failed, retrying in {RETRY_DELAY} seconds...")
+                            time.sleep(RETRY_DELAY)
+                        else:
+                            logger.error("Failed to communicate with display after all retries")
+                            raise RuntimeError("Could not establish communication with display")
+                    else:
+                        raise
+        except Exception as e:
+            logger.error(f"Failed to initialize display driver: {e}")
+            raise
+
+    @property
+    def spi_hz(self) -> int:
+        return self.config_dict[DISPLAY_TYPE]['spi_hz']
+
+    def set_spi_hz(self, spi_hz: int) -> None:
+        """
+        Reload the driver at another SPI clock.
+
+        The current session is closed; the controller is woken again with
+        the next frame.
+        """
+        if not self.reloadable:
+            raise RuntimeError("Only a driver loaded by the screen can change its SPI clock")
+        try:
+            self.session.close()
+        except Exception:
+            # A controller that lost sync may not take the sleep command; loading the driver resets it
+            pass
+        self.config_dict[DISPLAY_TYPE]['spi_hz'] = spi_hz
+        self.epd = self._load_driver()
+        self.session.epd = self.epd
+
+    def calibrate_spi(self, clocks: Sequence[int] = SPI_CLOCKS_HZ,
+                      fallback_hz: int = FALLBACK_SPI_HZ) -> Optional[CalibrationResult]:
+        """
+        Find and switch to the fastest SPI clock that passes a register readback probe.
+
+        Callers must keep frames away from the screen while it runs.
+
+        Returns:
+            CalibrationResult: The chosen clock, or None for mock and file drivers
+        """
+        if not self.reloadable:
+            return None
+        original_hz = self.spi_hz
+
+        def probe_at(spi_hz: int) -> Optional[float]:
+            self.set_spi_hz(spi_hz)
+            with self.session.active():
+                with self.bus_lock:
+                    return probe_controller(self.epd)
+
+        result = calibrate(probe_at, clocks, fallback_hz)
+        if not result.verified and "unverified" in result.clocks.values():
+            # A driver without register readback keeps its configured clock
+            result.spi_hz = original_hz
+        if result.spi_hz != self.spi_hz:
+            self.set_spi_hz(result.spi_hz)
+        logger.info(f"SPI calibration chose {result.spi_hz} Hz: {result.clocks}")
+        return result
 
     def run(self) -> None:
         """Initialize and configure the E-Ink display."""
         logger.info("Initializing E-Ink display")
         try:
-            self.epd.prepare()
+            self.session.acquire()
             logger.info("Display prepared successfully")
         except Exception as e:
             logger.error(f"Failed to prepare display: {e}")
             raise
+        self.session.release()
+
+    def tone_settings(self, options: Optional[Dict[str, Any]] = None) -> ToneSettings:
+        """
+        Resolve the tone settings for a frame.
+        
+        Args:
+            options (dict): Per-message overrides, e.g. from MQTT user properties
+            
+        Returns:
+            ToneSettings: Default settings with the overrides applied
+        """
+        if not options:
+            return self.gray16_processor.settings
+        return self.gray16_processor.settings.merged(options)
+
+    def geometry_settings(self, options: Optional[Dict[str, Any]] = None) -> GeometrySettings:
+        """
+        Resolve the geometry settings for a frame.
+        
+        Args:
+            options (dict): Per-message overrides, e.g. from MQTT user properties
+            
+        Returns:
+            GeometrySettings: Default settings with the overrides applied
+        """
+        if not options:
+            return self.geometry_processor.settings
+        return self.geometry_processor.settings.merged(options)
+
+    def refresh_settings(self, options: Optional[Dict[str, Any]] = None) -> RefreshSettings:
+        """
+        Resolve the waveform settings for an update.
+
+        Args:
+            options (dict): Per-message overrides, e.g. from MQTT user properties
+
+        Returns:
+            RefreshSettings: Default settings with the overrides applied
+        """
+        if not options:
+            return self.waveform_selector.settings
+        return self.waveform_selector.settings.merged(options)
+
+    def render_signature(self, options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Describe every setting that influences how an image is rendered.
+        
+        Args:
+            options (dict): Per-message overrides
+            
+        Returns:
+            str: Stable string used to key cached frames
+        """
+        return json.dumps({
+            'size': [self.width, self.height],
+            'mode': self.config_dict['EPD']['mode'],
+            'enhancements': self.config_dict['Image Enhancements'],
+            'tone': self.tone_settings(options).as_dict(),
+            'geometry': self.geometry_settings(options).as_dict()
+        }, sort_keys=True)
+
+    def render_frame(self, display_image, options: Optional[Dict[str, Any]] = None) -> PanelFrame:
+        """
+        Convert an image into a panel-native gray16 frame.
+        
+        Args:
+            display_image: PIL Image to render
+            options (dict): Per-message overrides of the geometry and tone settings
+            
+        Returns:
+            PanelFrame: Frame at panel resolution, oriented, fitted, tone-mapped and dithered to 16 levels
+        """
+        with self.metrics.span('render'):
+            resized_image = self.geometry_processor.process(display_image, self.geometry_settings(options))
+            return self.gray16_processor.process(resized_image, self.tone_settings(options))
 
     def display_image_on_epd(self, display_image) -> None:
         """
@@ -105,42 +301,198 @@ class EInkScreen:
         Args:
             display_image: PIL Image to display
         """
+        self.display_frame(self.render_frame(display_image))
+
+    def display_frame(self, frame: PanelFrame, options: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Display a pre-rendered frame on the E-Ink screen.
+        
+        The frame is compared with the one currently on the panel: identical
+        frames are skipped and small changes are pushed as partial updates.
+        The waveform is chosen per update by the waveform selector. The
+        screen takes ownership of the frame and returns pooled buffers of
+        frames it no longer needs. Returns once the refresh has completed
+        and the panel is idle again.
+        
+        Args:
+            frame (PanelFrame): Frame at panel resolution
+            options (dict): Per-message overrides of the refresh settings
+
+        Raises:
+            ValueError: If the overrides are invalid
+        """
+        try:
+            settings = self.refresh_settings(options)
+        except ValueError:
+            self._retire(frame)
+            raise
+        regions = None
+        if self.last_frame is not None and self.last_frame.levels.shape == frame.levels.shape:
+            if self._change_mask is None or self._change_mask.shape != frame.levels.shape:
+                self._change_mask = self.buffer_pool.acquire(frame.levels.shape, bool)
+            regions = dirty_regions(self.last_frame.levels, frame.levels, out=self._change_mask)
+            if not regions:
+                logger.info("Frame unchanged, skipping refresh")
+                self._retire(frame)
+                return
+            changed_ratio = region_area(regions) / (frame.width * frame.height)
+            if changed_ratio > self.partial_refresh_max_ratio:
+                regions = None
+            else:
+                logger.info(f"Partial refresh of {len(regions)} region(s), {changed_ratio:.1%} of the panel")
+        mode, regions = self.waveform_selector.select(self.last_frame, frame, regions, settings)
+
         try:
-            logger.info("Preparing to display image")
-            self.epd.prepare()
-            resized_image = display_image.resize((self.width, self.height))
-            logger.info("Displaying image")
-            self.epd.display(resized_image)
+            while True:
+                try:
+                    mode = self._push_frame(frame, regions, mode)
+                    break
+                except Exception as e:
+                    if not self._lower_spi_clock(e):
+                        raise
+                    # The failed transfer may have left the controller's image half written
+                    mode, regions = 'GC16', None
+            self.waveform_selector.record(mode, regions)
+            previous, self.last_frame = self.last_frame, frame
+            self._retire(previous)
             logger.info("Image displayed successfully")
         except Exception as e:
+            previous, self.last_frame = self.last_frame, None
+            self._retire(previous)
             logger.error(f"Failed to display image: {e}")
             raise
-        finally:
-            self._sleep_display()
 
-    def _sleep_display(self) -> None:
-        """Put the display to sleep and close connection."""
+    def _push_frame(self, frame: PanelFrame, regions, mode: str) -> str:
+        """Transfer a frame and wait for its refresh; returns the waveform the driver used."""
+        logger.info("Preparing to display image")
+        with self.session.active():
+            logger.info(f"Displaying image with the {mode} waveform")
+            # Only the transfer holds the bus; the refresh runs while other panels transfer
+            with self.bus_lock, self.metrics.span('spi_transfer'):
+                if regions:
+                    mode = self._display_regions(frame, regions, mode)
+                else:
+                    mode = self._display_full(frame, mode)
+            self._wait_display_ready(mode, time.monotonic())
+        return mode
+
+    def _lower_spi_clock(self, error: Exception) -> bool:
+        """
+        Step down to the next slower SPI clock after a communication failure.
+
+        Returns:
+            bool: Whether the clock was lowered and the transfer should be retried
+        """
+        if not self.reloadable or not is_communication_error(error):
+            return False
+        spi_hz = slower_clock(self.spi_hz)
+        if spi_hz is None:
+            return False
+        logger.warning(f"Communication failed at {self.spi_hz} Hz SPI clock, falling back to {spi_hz} Hz: {error}")
         try:
-            logger.info("Putting E-Ink screen to sleep")
-            self.epd.sleep()
-            self.epd.close()
+            self.set_spi_hz(spi_hz)
         except Exception as e:
-            logger.error(f"Failed to sleep display: {e}")
-            raise
+            logger.error(f"Failed to reload the display driver at {spi_hz} Hz: {e}")
+            return False
+        if self.on_spi_fallback:
+            self.on_spi_fallback(spi_hz, str(error))
+        return True
 
-    @staticmethod
-    def _set_rotate(width: int, height: int, rotate: int = 0) -> Tuple[int, int]:
+    def _frame_image(self, frame: PanelFrame):
         """
-        Calculate dimensions after rotation.
+        8-bit image of a frame, expanded into the screen's reusable display buffer.
+
+        Drivers copy the image into their own frame buffer while displaying,
+        so the buffer can be overwritten by the next frame.
+        """
+        if self._display_buffer is None or self._display_buffer.shape != frame.levels.shape:
+            self._display_buffer = self.buffer_pool.acquire(frame.levels.shape)
+        return frame.to_image(out=self._display_buffer)
+
+    def _retire(self, frame: Optional[PanelFrame]) -> None:
+        # The frame on the panel stays in use as the base of the next comparison
+        if frame is not None and frame is not self.last_frame:
+            frame.release()
+
+    def _display_full(self, frame: PanelFrame, mode: str) -> str:
+        """
+        Push a whole frame to the panel with the given waveform.
+
+        Uses the IT8951 device of the driver or a mock that takes the mode;
+        other drivers refresh with their own waveform.
+
+        Returns:
+            str: Waveform the refresh was started with
+        """
+        image = self._frame_image(frame)
+        device = getattr(self.epd, '_device', None)
+        if mode in getattr(self.epd, 'WAVEFORM_MODES', ()):
+            self.epd.display(image, mode=mode)
+        elif device is not None and hasattr(device, 'draw_full'):
+            device.frame_buf.paste(image, (0, 0))
+            device.draw_full(DISPLAY_MODES[mode])
+        else:
+            self.epd.display(image)
+            mode = DRIVER_MODE
+        return mode
+
+    def _display_regions(self, frame: PanelFrame, regions, mode: str) -> str:
+        """
+        Push only the given regions of a frame to the panel.
+        
+        Uses the mock's ``display_partial`` or the IT8951 partial-update path
+        of the driver's device; falls back to a full refresh otherwise.
         
         Args:
-            width (int): Original width
-            height (int): Original height
-            rotate (int): Rotation angle in degrees
-            
+            frame (PanelFrame): Frame at panel resolution
+            regions: (left, top, right, bottom) boxes to update
+            mode (str): Waveform of the update
+
         Returns:
-            Tuple[int, int]: New width and height
+            str: Waveform the refresh was started with
+        """
+        image = self._frame_image(frame)
+        device = getattr(self.epd, '_device', None)
+        if hasattr(self.epd, 'display_partial'):
+            for region in regions:
+                if mode in getattr(self.epd, 'WAVEFORM_MODES', ()):
+                    self.epd.display_partial(image.crop(region), region, mode=mode)
+                else:
+                    self.epd.display_partial(image.crop(region), region)
+        elif device is not None and hasattr(device, 'draw_partial') and device.prev_frame is not None:
+            for region in regions:
+                device.frame_buf.paste(image.crop(region), region[:2])
+                device.draw_partial(DISPLAY_MODES[mode])
+        else:
+            logger.debug("Driver has no partial update path, using full refresh")
+            return self._display_full(frame, mode)
+        return mode
+
+    def _wait_display_ready(self, mode: str, started_at: float) -> None:
         """
-        if (rotate / ROTATION_FACTOR) % 2 == 1:
-            return height, width
-        return width, height
+        Wait until the refresh triggered at ``started_at`` has completed.
+
+        The IT8951 returns from a display call once the image is loaded and
+        the refresh is started; waiting here separates the refresh from the
+        SPI transfer in the metrics. The busy pin is used where the driver
+        exposes it and calibrates the refresh time model; otherwise the
+        model's estimate for the mode is waited out.
+
+        Args:
+            mode (str): Waveform mode of the refresh
+            started_at (float): time.monotonic() when the refresh was started
+        """
+        device = getattr(self.epd, '_device', None)
+        controller = getattr(device, 'epd', None)
+        wait = getattr(self.epd, 'wait_display_ready', None) or getattr(controller, 'wait_display_ready', None)
+        with self.metrics.span('refresh'):
+            if wait is not None:
+                wait()
+                self.refresh_model.record(mode, time.monotonic() - started_at)
+            else:
+                time.sleep(max(0.0, started_at + self.refresh_model.expected(mode) - time.monotonic()))
+        logger.debug(f"{mode} refresh completed after {time.monotonic() - started_at:.2f}s")
+
+    def close(self) -> None:
+        """Put the display to sleep and close connection."""
+        self.session.close()
@@ -0,0 +1,63 @@
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Tuple
+import numpy as np
+
+# Constants
+DEFAULT_MAX_FREE = 4  # free buffers kept per shape and type
+
+logger = logging.getLogger(__name__)
+
+
+class FrameBufferPool:
+    """
+    Reusable panel-sized NumPy buffers.
+
+    Rendering a frame needs several arrays of the panel's size (gray
+    levels, the 8-bit image handed to the driver, the change mask of the
+    partial refresh). Taking them from a pool instead of allocating them
+    per frame keeps steady-state rendering free of large allocations, which
+    avoids heap fragmentation and swapping on long-running Pi Zeros.
+    Buffers are handed out uninitialized.
+    """
+
+    def __init__(self, max_free: int = DEFAULT_MAX_FREE):
+        """
+        Args:
+            max_free (int): Free buffers kept per shape and type; further releases are dropped
+        """
+        self.max_free = max_free
+        self.allocations = 0
+        self.reuses = 0
+        self._free = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def acquire(self, shape: Tuple[int, ...], dtype: Any = np.uint8) -> np.ndarray:
+        """Return a C-contiguous buffer of the given shape and type, reusing a released one if possible."""
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                self.reuses += 1
+                return free.pop()
+            self.allocations += 1
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, buffer: np.ndarray) -> None:
+        """Give a buffer from ``acquire`` back; it must not be used afterwards."""
+        key = (buffer.shape, buffer.dtype.str)
+        with self._lock:
+            free = self._free[key]
+            if len(free) < self.max_free and not any(buffer is held for held in free):
+                free.append(buffer)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffers = [buffer for free in self._free.values() for buffer in free]
+            return {
+                'allocations': self.allocations,
+                'reuses': self.reuses,
+                'free_buffers': len(buffers),
+                'free_bytes': sum(buffer.nbytes for buffer in buffers)
+            }
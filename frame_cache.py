@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, BinaryIO, Optional, Union
+from panel_frame import PanelFrame, FRAME_SUFFIX
+
+if TYPE_CHECKING:
+    from frame_buffers import FrameBufferPool
+
+# Constants
+DEFAULT_CACHE_DIR = "cache/frames"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+HASH_READ_SIZE = 256 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class FrameCache:
+    """
+    On-disk LRU cache of rendered, panel-native gray16 frames.
+
+    Frames are stored packed at 4bpp and keyed by a hash of the source
+    payload plus the display settings that influenced rendering, so a
+    republished image can go straight to the driver.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 buffer_pool: Optional["FrameBufferPool"] = None):
+        """
+        Args:
+            cache_dir (str): Directory holding the cached frames
+            max_bytes (int): Total size above which least recently used frames are evicted
+            buffer_pool (FrameBufferPool): Source of the level buffers of frames read from the cache
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.buffer_pool = buffer_pool
+        self._read_buffer = bytearray()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(payload: Union[bytes, BinaryIO], signature: str) -> str:
+        """
+        Build a cache key from the payload contents and the render signature.
+        
+        File payloads are hashed in blocks and rewound afterwards.
+        """
+        digest = hashlib.blake2b(signature.encode(), digest_size=20)
+        if isinstance(payload, (bytes, bytearray)):
+            digest.update(payload)
+        else:
+            for block in iter(lambda: payload.read(HASH_READ_SIZE), b""):
+                digest.update(block)
+            payload.seek(0)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[PanelFrame]:
+        """Return the cached frame for ``key`` or None."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                frame = PanelFrame.from_bytes(self._read(path), self.buffer_pool)
+                os.utime(path)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"Dropping unreadable cached frame {key}: {e}")
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return frame
+
+    def put(self, key: str, frame: PanelFrame) -> None:
+        """Store a frame and evict least recently used entries beyond ``max_bytes``."""
+        data = frame.to_bytes()
+        with self._lock:
+            path = self._path(key)
+            tmp_path = f"{path}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Failed to cache frame {key}: {e}")
+                return
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _read(self, path: str) -> memoryview:
+        # Frames are unpacked into their own buffer, so one read buffer serves every lookup
+        size = os.path.getsize(path)
+        if len(self._read_buffer) < size:
+            self._read_buffer = bytearray(size)
+        view = memoryview(self._read_buffer)[:size]
+        with open(path, "rb") as f:
+            if f.readinto(view) != size:
+                raise ValueError("truncated frame file")
+        return view
+
+    def _load_index(self) -> None:
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(FRAME_SUFFIX):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            files.append((stat.st_mtime, name[:-len(FRAME_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+        logger.info(f"Frame cache holds {len(self._entries)} frames ({self._total_bytes} bytes)")
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            logger.debug(f"Evicting cached frame {key}")
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + FRAME_SUFFIX)
@@ -0,0 +1,57 @@
+from typing import List, Optional, Tuple
+import numpy as np
+
+# Constants
+REGION_ALIGNMENT = 4  # IT8951 packed transfers need 4-pixel aligned x and width
+DEFAULT_MERGE_GAP = 32
+DEFAULT_MAX_REGIONS = 4
+
+Region = Tuple[int, int, int, int]
+
+
+def dirty_regions(previous: np.ndarray, current: np.ndarray,
+                  merge_gap: int = DEFAULT_MERGE_GAP,
+                  max_regions: int = DEFAULT_MAX_REGIONS,
+                  out: Optional[np.ndarray] = None) -> List[Region]:
+    """
+    Find the rectangles that differ between two frames of equal shape.
+
+    Changed rows are grouped into horizontal bands; bands closer than
+    ``merge_gap`` rows are merged, and each band is narrowed to the columns
+    that actually changed. If more than ``max_regions`` bands remain, a
+    single bounding box is returned instead.
+
+    Args:
+        previous (np.ndarray): Gray levels currently on the panel
+        current (np.ndarray): Gray levels about to be displayed
+        merge_gap (int): Smallest number of unchanged rows that separates two bands
+        max_regions (int): Maximum number of rectangles to return
+        out (np.ndarray): Reusable bool buffer of the frames' shape for the change mask
+
+    Returns:
+        List[Region]: (left, top, right, bottom) boxes, empty if the frames are identical
+    """
+    changed = np.not_equal(previous, current, out=out)
+    changed_rows = np.flatnonzero(changed.any(axis=1))
+    if not changed_rows.size:
+        return []
+
+    breaks = np.flatnonzero(np.diff(changed_rows) > merge_gap)
+    starts = np.concatenate(([changed_rows[0]], changed_rows[breaks + 1]))
+    ends = np.concatenate((changed_rows[breaks], [changed_rows[-1]])) + 1
+    if len(starts) > max_regions:
+        starts, ends = starts[:1], ends[-1:]
+
+    width = current.shape[1]
+    regions = []
+    for top, bottom in zip(starts, ends):
+        changed_cols = np.flatnonzero(changed[top:bottom].any(axis=0))
+        left = changed_cols[0] - changed_cols[0] % REGION_ALIGNMENT
+        right = min(width, -(-(changed_cols[-1] + 1) // REGION_ALIGNMENT) * REGION_ALIGNMENT)
+        regions.append((int(left), int(top), int(right), int(bottom)))
+    return regions
+
+
+def region_area(regions: List[Region]) -> int:
+    """Total number of pixels covered by the given regions."""
+    return sum((right - left) * (bottom - top) for left, top, right, bottom in regions)
@@ -0,0 +1,265 @@
+import logging
+from dataclasses import dataclass, asdict, replace
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from PIL import Image
+
+# Constants
+ROTATION_STEP = 90
+FIT_FIT = "fit"
+FIT_FILL = "fill"
+FIT_STRETCH = "stretch"
+FIT_MODES = (FIT_FIT, FIT_FILL, FIT_STRETCH)
+FIT_ALIASES = {"crop": FIT_FILL, "contain": FIT_FIT, "cover": FIT_FILL}
+RESAMPLE_FILTERS = {
+    "nearest": Image.Resampling.NEAREST,
+    "bilinear": Image.Resampling.BILINEAR,
+    "bicubic": Image.Resampling.BICUBIC,
+    "lanczos": Image.Resampling.LANCZOS,
+    "box": Image.Resampling.BOX
+}
+EXIF_ORIENTATION_TAG = 0x0112
+ORIENTATION_INFO_KEY = "orientation"
+PLAN_CACHE_SIZE = 64
+
+# Linear part of each of the eight axis-aligned orientations, mapping source to
+# destination coordinates, keyed by the Pillow transpose method that produces it
+IDENTITY = (1, 0, 0, 1)
+TRANSPOSE_MATRICES = {
+    Image.Transpose.FLIP_LEFT_RIGHT: (-1, 0, 0, 1),
+    Image.Transpose.FLIP_TOP_BOTTOM: (1, 0, 0, -1),
+    Image.Transpose.ROTATE_90: (0, 1, -1, 0),
+    Image.Transpose.ROTATE_180: (-1, 0, 0, -1),
+    Image.Transpose.ROTATE_270: (0, -1, 1, 0),
+    Image.Transpose.TRANSPOSE: (0, 1, 1, 0),
+    Image.Transpose.TRANSVERSE: (0, -1, -1, 0)
+}
+MATRIX_TRANSPOSES = {matrix: method for method, matrix in TRANSPOSE_MATRICES.items()}
+EXIF_TRANSPOSES = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90
+}
+ROTATION_TRANSPOSES = {
+    90: Image.Transpose.ROTATE_90,
+    180: Image.Transpose.ROTATE_180,
+    270: Image.Transpose.ROTATE_270
+}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class GeometrySettings:
+    """How a decoded image is oriented, scaled and cropped onto the panel."""
+    rotate: int = 0
+    fit: str = FIT_FILL
+    focus_x: float = 0.5
+    focus_y: float = 0.5
+    exif: bool = True
+    background: int = 255
+    resample: str = "bicubic"
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "GeometrySettings":
+        """Build settings from a config section, ignoring unknown keys."""
+        return cls().merged(values)
+
+    def merged(self, overrides: Dict[str, Any]) -> "GeometrySettings":
+        """
+        Return a copy with the given overrides applied.
+
+        Values may be strings (e.g. MQTT user properties) and are coerced to
+        the field types.
+
+        Raises:
+            ValueError: If a value cannot be converted or is out of range
+        """
+        changes = {}
+        for key, value in overrides.items():
+            if key not in self.__dataclass_fields__:
+                continue
+            current = getattr(self, key)
+            if isinstance(current, bool):
+                value = value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes", "on")
+            elif isinstance(current, int):
+                value = int(float(value))
+            else:
+                value = type(current)(value)
+            changes[key] = value
+        settings = replace(self, **changes)
+        settings = replace(settings, rotate=settings.rotate % 360, fit=FIT_ALIASES.get(settings.fit, settings.fit))
+        if settings.rotate % ROTATION_STEP:
+            raise ValueError(f"Rotation must be a multiple of {ROTATION_STEP} degrees, got {settings.rotate}")
+        if settings.fit not in FIT_MODES:
+            raise ValueError(f"Unknown fit mode '{settings.fit}', expected one of {FIT_MODES}")
+        if settings.resample not in RESAMPLE_FILTERS:
+            raise ValueError(f"Unknown resample filter '{settings.resample}', expected one of {tuple(RESAMPLE_FILTERS)}")
+        if not (0 <= settings.focus_x <= 1 and 0 <= settings.focus_y <= 1):
+            raise ValueError(f"Focal point must lie within 0-1, got ({settings.focus_x}, {settings.focus_y})")
+        return settings
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def orientation_matrix(self, orientation: int = 1) -> Tuple[int, int, int, int]:
+        """Combined EXIF orientation and rotation as a source-to-panel linear map."""
+        matrix = IDENTITY
+        if self.exif and orientation in EXIF_TRANSPOSES:
+            matrix = TRANSPOSE_MATRICES[EXIF_TRANSPOSES[orientation]]
+        if self.rotate:
+            matrix = _multiply(TRANSPOSE_MATRICES[ROTATION_TRANSPOSES[self.rotate]], matrix)
+        return matrix
+
+    def swaps_axes(self, orientation: int = 1) -> bool:
+        """Whether the source's width ends up along the panel's height."""
+        return self.orientation_matrix(orientation)[0] == 0
+
+
+@dataclass(frozen=True)
+class GeometryPlan:
+    """
+    Precomputed transform from a source size to the panel.
+
+    The crop box and scale are applied by one resampling pass in the source
+    orientation; rotation and EXIF orientation are an exact pixel
+    permutation applied afterwards on the already panel-sized image.
+    """
+    box: Tuple[float, float, float, float]
+    size: Tuple[int, int]
+    transpose: Optional[Image.Transpose]
+    offset: Tuple[int, int]
+    panel_size: Tuple[int, int]
+
+    @property
+    def fills_panel(self) -> bool:
+        return self.offset == (0, 0) and self._oriented_size() == self.panel_size
+
+    def _oriented_size(self) -> Tuple[int, int]:
+        if self.transpose is not None and TRANSPOSE_MATRICES[self.transpose][0] == 0:
+            return self.size[1], self.size[0]
+        return self.size
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def plan_geometry(source_size: Tuple[int, int], orientation: int, settings: GeometrySettings,
+                  panel_size: Tuple[int, int]) -> GeometryPlan:
+    """
+    Compute the transform for one source size, cached per (size, orientation, settings, panel).
+
+    Args:
+        source_size (tuple): Width and height of the decoded image
+        orientation (int): EXIF orientation tag value, 1 if none
+        settings (GeometrySettings): Rotation, fit mode and focal point
+        panel_size (tuple): Width and height of the panel
+
+    Returns:
+        GeometryPlan: Crop box and output size in the source orientation plus the final transpose
+    """
+    matrix = settings.orientation_matrix(orientation)
+    swap = matrix[0] == 0
+    source_width, source_height = source_size
+    width, height = (source_height, source_width) if swap else source_size
+    panel_width, panel_height = panel_size
+
+    # Work in panel orientation: box is the visible part of the oriented source
+    box = (0.0, 0.0, float(width), float(height))
+    offset = (0, 0)
+    if settings.fit == FIT_STRETCH:
+        target = panel_size
+    elif settings.fit == FIT_FIT:
+        scale = min(panel_width / width, panel_height / height)
+        target = (max(1, round(width * scale)), max(1, round(height * scale)))
+        offset = ((panel_width - target[0]) // 2, (panel_height - target[1]) // 2)
+    else:
+        scale = max(panel_width / width, panel_height / height)
+        crop_width, crop_height = panel_width / scale, panel_height / scale
+        # The focal point is given in the oriented image, as seen on the panel
+        left = min(max(settings.focus_x * width - crop_width / 2, 0.0), width - crop_width)
+        top = min(max(settings.focus_y * height - crop_height / 2, 0.0), height - crop_height)
+        box = (left, top, left + crop_width, top + crop_height)
+        target = panel_size
+
+    # Map the box back into the source orientation through the inverse (transposed) matrix
+    inverse = (matrix[0], matrix[2], matrix[1], matrix[3])
+    corners = [_apply(inverse, (x - width / 2, y - height / 2)) for x, y in ((box[0], box[1]), (box[2], box[3]))]
+    xs = sorted(x + source_width / 2 for x, _ in corners)
+    ys = sorted(y + source_height / 2 for _, y in corners)
+    source_box = (xs[0], ys[0], xs[1], ys[1])
+    size = (target[1], target[0]) if swap else target
+    return GeometryPlan(
+        box=tuple(round(value, 6) for value in source_box),
+        size=size,
+        transpose=MATRIX_TRANSPOSES.get(matrix),
+        offset=offset,
+        panel_size=panel_size
+    )
+
+
+class GeometryProcessor:
+    """
+    Orients, scales and crops decoded images onto the panel.
+
+    Replaces chained rotate/resize/crop copies with a single resampling
+    pass of only the visible part of the source, using a plan computed
+    once per source size and settings.
+    """
+
+    def __init__(self, width: int, height: int, settings: Optional[GeometrySettings] = None):
+        """
+        Args:
+            width (int): Width of the panel in pixels
+            height (int): Height of the panel in pixels
+            settings (GeometrySettings): Defaults used when a frame has no overrides
+        """
+        self.panel_size = (width, height)
+        self.settings = settings or GeometrySettings()
+
+    def process(self, image: Image.Image, settings: Optional[GeometrySettings] = None) -> Image.Image:
+        """
+        Transform an image onto the panel.
+
+        Args:
+            image (Image.Image): Decoded image; its EXIF orientation is read from
+                ``image.info['orientation']`` (set by ImageDecoder) or its EXIF data
+            settings (GeometrySettings): Per-frame settings, defaults to the processor settings
+
+        Returns:
+            Image.Image: Image at panel resolution
+        """
+        settings = settings or self.settings
+        plan = plan_geometry(image.size, image_orientation(image), settings, self.panel_size)
+        full_box = (0.0, 0.0, float(image.size[0]), float(image.size[1]))
+        if plan.box != full_box or plan.size != image.size:
+            image = image.resize(plan.size, RESAMPLE_FILTERS[settings.resample], box=plan.box)
+        if plan.transpose is not None:
+            image = image.transpose(plan.transpose)
+        if plan.fills_panel:
+            return image
+        canvas = Image.new(image.mode, self.panel_size, settings.background)
+        canvas.paste(image, plan.offset)
+        return canvas
+
+
+def image_orientation(image: Image.Image) -> int:
+    """EXIF orientation of an image, 1 (upright) if unknown."""
+    orientation = image.info.get(ORIENTATION_INFO_KEY)
+    if orientation is None:
+        try:
+            orientation = image.getexif().get(EXIF_ORIENTATION_TAG, 1)
+        except Exception:
+            orientation = 1
+    return orientation if orientation in EXIF_TRANSPOSES else 1
+
+
+def _multiply(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
+    return (a[0] * b[0] + a[1] * b[2], a[0] * b[1] + a[1] * b[3],
+            a[2] * b[0] + a[3] * b[2], a[2] * b[1] + a[3] * b[3])
+
+
+def _apply(matrix: Tuple[int, int, int, int], point: Tuple[float, float]) -> Tuple[float, float]:
+    return matrix[0] * point[0] + matrix[1] * point[1], matrix[2] * point[0] + matrix[3] * point[1]
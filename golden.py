@@ -0,0 +1,259 @@
+"""
+Golden-image regression tool for the render pipeline.
+
+Renders a corpus of image payloads exactly like the client does
+(ImageDecoder.decode followed by EInkScreen.render_frame, geometry included)
+into panel-native gray16 frames and records or checks them against golden
+frames.
+
+Usage:
+    python3 golden.py record  --corpus DIR --golden DIR [--option key=value ...]
+    python3 golden.py compare --corpus DIR --golden DIR [--max-changed-ratio R]
+                              [--max-level-diff N] [--diff-dir DIR] [--json FILE]
+    python3 golden.py compare --golden DIR --actual DIR
+
+Golden frames are stored as ``<payload name>.g16`` (PanelFrame.to_bytes) with
+a PNG preview and a manifest holding the render signature and render times.
+With --actual, ``.g16`` frames written by the file EPD backend while the
+corpus was shown in order are compared without rendering: FileEPD numbers its
+updates, so they are matched to the golden frames in recording order.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from benchmark import load_corpus, offline_client
+from mocked_epd import FileEPD
+from panel_frame import PanelFrame, FRAME_SUFFIX, LEVEL_SCALE
+
+# Constants
+MANIFEST_NAME = "manifest.json"
+PREVIEW_SUFFIX = ".png"
+DIFF_SUFFIX = ".diff.png"
+
+logger = logging.getLogger(__name__)
+
+
+def frame_name(payload_name: str) -> str:
+    return os.path.splitext(payload_name)[0]
+
+
+def read_frame(path: str) -> PanelFrame:
+    with open(path, "rb") as f:
+        return PanelFrame.from_bytes(f.read())
+
+
+def write_frame(path: str, frame: PanelFrame) -> None:
+    with open(path, "wb") as f:
+        f.write(frame.to_bytes())
+
+
+def compare_frames(expected: PanelFrame, actual: PanelFrame) -> Dict[str, Any]:
+    """
+    Compare two frames level by level.
+
+    Returns:
+        dict: Identical flag, changed pixel count and ratio, max and mean level
+        difference and PSNR over the 16 levels; frames of different size only
+        report the size mismatch
+    """
+    if expected.levels.shape != actual.levels.shape:
+        return {
+            "identical": False,
+            "size_mismatch": [list(expected.levels.shape[::-1]), list(actual.levels.shape[::-1])]
+        }
+    diff = np.abs(expected.levels.astype(np.int16) - actual.levels.astype(np.int16))
+    changed = int(np.count_nonzero(diff))
+    mse = float(np.mean(diff.astype(np.float64) ** 2))
+    return {
+        "identical": changed == 0,
+        "changed_pixels": changed,
+        "changed_ratio": round(changed / diff.size, 6),
+        "max_level_diff": int(diff.max()),
+        "mean_level_diff": round(float(diff.mean()), 4),
+        "psnr_db": None if mse == 0 else round(10 * np.log10(15 ** 2 / mse), 2)
+    }
+
+
+def diff_image(expected: PanelFrame, actual: PanelFrame) -> Image.Image:
+    """Visualize the per-pixel level difference, white where frames match."""
+    diff = np.abs(expected.levels.astype(np.int16) - actual.levels.astype(np.int16)).astype(np.uint8)
+    return Image.fromarray(255 - diff * np.uint8(LEVEL_SCALE), mode="L")
+
+
+def render_corpus(config_path: str, corpus: List[Tuple[str, bytes]],
+                  options: Dict[str, str]) -> Tuple[str, Dict[str, Tuple[PanelFrame, float]]]:
+    """Render every payload through the client's decoder and screen; returns the render signature too."""
+    client = offline_client(config_path)
+    screen = client.e_ink_screen
+    frames = {}
+    try:
+        for name, payload in corpus:
+            start = time.perf_counter()
+            image = client.image_decoder.decode(payload, screen.geometry_settings(options))
+            frame = screen.render_frame(image, options)
+            frames[frame_name(name)] = (frame, time.perf_counter() - start)
+            logger.info(f"Rendered {name} in {frames[frame_name(name)][1] * 1000:.0f} ms")
+        return screen.render_signature(options), frames
+    finally:
+        client._close_display()
+
+
+def record(args: argparse.Namespace) -> int:
+    corpus = load_corpus(args.corpus)
+    signature, frames = render_corpus(args.config, corpus, args.options)
+    os.makedirs(args.golden, exist_ok=True)
+    manifest = {"signature": json.loads(signature), "options": args.options, "frames": {}}
+    for name, (frame, seconds) in frames.items():
+        write_frame(os.path.join(args.golden, name + FRAME_SUFFIX), frame)
+        frame.to_image().save(os.path.join(args.golden, name + PREVIEW_SUFFIX))
+        manifest["frames"][name] = {"render_ms": round(seconds * 1000, 1)}
+    with open(os.path.join(args.golden, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Recorded {len(frames)} golden frame(s) in {args.golden}")
+    return 0
+
+
+def load_golden(golden_dir: str) -> Dict[str, Any]:
+    path = os.path.join(golden_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"options": {}, "frames": {}}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def update_files(actual_dir: str) -> List[str]:
+    """``.g16`` files of a FileEPD output directory in update order."""
+    try:
+        with open(os.path.join(actual_dir, FileEPD.UPDATE_LOG), "r") as f:
+            updates = [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return sorted(name for name in os.listdir(actual_dir) if name.endswith(FRAME_SUFFIX))
+    return [name for update in updates for name in update["files"] if name.endswith(FRAME_SUFFIX)]
+
+
+def file_epd_frames(actual_dir: str, names: List[str]) -> Dict[str, Tuple[PanelFrame, Optional[float]]]:
+    """
+    Read the frames of a FileEPD output directory under the golden frame names.
+
+    Frames already named after the golden frames are used as they are.
+    Otherwise the updates are matched to the golden frames in recording
+    order; of a directory that holds earlier runs too, the most recent
+    updates are used.
+    """
+    files = update_files(actual_dir)
+    stems = [name[:-len(FRAME_SUFFIX)] for name in files]
+    if not names or set(names) <= set(stems):
+        matched = list(zip(stems, files))
+    else:
+        if len(files) > len(names):
+            logger.warning(f"{len(files)} updates for {len(names)} golden frame(s), comparing the last ones")
+            files = files[-len(names):]
+        matched = list(zip(names, files))
+        if len(files) < len(names):
+            logger.warning(f"Only {len(files)} update(s) for {len(names)} golden frame(s)")
+    return {name: (read_frame(os.path.join(actual_dir, file)), None) for name, file in matched}
+
+
+def actual_frames(args: argparse.Namespace, manifest: Dict[str, Any]) -> Dict[str, Tuple[PanelFrame, Optional[float]]]:
+    if args.actual:
+        return file_epd_frames(args.actual, list(manifest.get("frames", {})))
+    options = {**manifest.get("options", {}), **args.options}
+    signature, frames = render_corpus(args.config, load_corpus(args.corpus), options)
+    if manifest.get("signature") and json.loads(signature) != manifest["signature"]:
+        logger.warning("Render settings differ from the ones the golden frames were recorded with")
+    return frames
+
+
+def compare(args: argparse.Namespace) -> int:
+    manifest = load_golden(args.golden)
+    frames = actual_frames(args, manifest)
+    if args.diff_dir:
+        os.makedirs(args.diff_dir, exist_ok=True)
+
+    results = {}
+    for name, (frame, seconds) in frames.items():
+        golden_path = os.path.join(args.golden, name + FRAME_SUFFIX)
+        if not os.path.exists(golden_path):
+            results[name] = {"passed": False, "missing_golden": True}
+            continue
+        expected = read_frame(golden_path)
+        result = compare_frames(expected, frame)
+        result["passed"] = "size_mismatch" not in result and (
+            result["changed_ratio"] <= args.max_changed_ratio and result["max_level_diff"] <= args.max_level_diff)
+        golden_ms = manifest.get("frames", {}).get(name, {}).get("render_ms")
+        if seconds is not None:
+            result["render_ms"] = round(seconds * 1000, 1)
+            if golden_ms:
+                result["speedup"] = round(golden_ms / max(result["render_ms"], 0.1), 2)
+        if args.diff_dir and not result["identical"] and "size_mismatch" not in result:
+            diff_image(expected, frame).save(os.path.join(args.diff_dir, name + DIFF_SUFFIX))
+        results[name] = result
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0 if results and all(result["passed"] for result in results.values()) else 1
+
+
+def print_report(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"{'frame':<28}{'result':>8}{'changed':>11}{'max diff':>10}{'psnr dB':>10}{'ms':>9}{'speedup':>9}")
+    for name, result in results.items():
+        if result.get("missing_golden"):
+            print(f"{name:<28}{'MISSING':>8}")
+            continue
+        if "size_mismatch" in result:
+            print(f"{name:<28}{'SIZE':>8}  {result['size_mismatch'][0]} != {result['size_mismatch'][1]}")
+            continue
+        print(f"{name:<28}{'ok' if result['passed'] else 'FAIL':>8}{result['changed_ratio']:>10.3%}"
+              f"{result['max_level_diff']:>10}{str(result['psnr_db'] or '-'):>10}"
+              f"{str(result.get('render_ms', '-')):>9}{str(result.get('speedup', '-')):>9}")
+    passed = sum(1 for result in results.values() if result["passed"])
+    print(f"\n{passed}/{len(results)} frame(s) match the golden frames")
+
+
+def parse_option(value: str) -> Tuple[str, str]:
+    key, separator, option = value.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError(f"expected key=value, got '{value}'")
+    return key, option
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Record or check golden panel frames")
+    parser.add_argument("mode", choices=("record", "compare"))
+    parser.add_argument("--corpus", help="Directory of image payloads to render")
+    parser.add_argument("--golden", required=True, help="Directory of golden frames")
+    parser.add_argument("--actual", help="Compare this directory of .g16 frames instead of rendering")
+    parser.add_argument("--config", default="config.json", help="Client config to render with")
+    parser.add_argument("--option", dest="options", action="append", type=parse_option, default=[],
+                        help="Per-message render option, like an MQTT user property (key=value)")
+    parser.add_argument("--max-changed-ratio", type=float, default=0.0,
+                        help="Largest fraction of pixels allowed to differ (default: exact match)")
+    parser.add_argument("--max-level-diff", type=int, default=0,
+                        help="Largest gray level difference allowed per pixel")
+    parser.add_argument("--diff-dir", help="Write difference images of mismatching frames here")
+    parser.add_argument("--json", help="Write the comparison results to this file")
+    args = parser.parse_args(argv)
+    args.options = dict(args.options)
+    if not args.corpus and not (args.mode == "compare" and args.actual):
+        parser.error("--corpus is required unless comparing against --actual")
+    if args.max_level_diff and not args.max_changed_ratio:
+        # A level tolerance only makes sense if pixels may differ at all
+        args.max_changed_ratio = 1.0
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+    sys.exit(record(args) if args.mode == "record" else compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import logging
+import threading
+from dataclasses import dataclass, asdict, replace
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+import numpy as np
+from PIL import Image
+from panel_frame import PanelFrame, GRAY_LEVELS, LEVEL_SCALE
+
+if TYPE_CHECKING:
+    from frame_buffers import FrameBufferPool
+
+# Constants
+DITHER_NONE = "none"
+DITHER_FLOYD_STEINBERG = "floyd_steinberg"
+DITHER_ORDERED = "ordered"
+DITHER_BLUE_NOISE = "blue_noise"
+DITHER_METHODS = (DITHER_NONE, DITHER_FLOYD_STEINBERG, DITHER_ORDERED, DITHER_BLUE_NOISE)
+FRACTION_STEPS = 16  # threshold resolution between two gray levels
+BAYER_4X4 = np.array([[0, 8, 2, 10],
+                      [12, 4, 14, 6],
+                      [3, 11, 1, 9],
+                      [15, 7, 13, 5]], dtype=np.uint8)
+BLUE_NOISE_SIZE = 64
+BLUE_NOISE_SIGMA = 1.5
+BLUE_NOISE_SEED = 1951
+PALETTE_SIZE = 256
+# Pillow palettes always hold 256 entries; the unused ones repeat white and map back to level 15
+PALETTE_LEVELS = np.minimum(np.arange(PALETTE_SIZE), GRAY_LEVELS - 1).astype(np.uint8)
+GRAY16_PALETTE = [int(level) * LEVEL_SCALE for level in PALETTE_LEVELS for _ in range(3)]
+TILED_THRESHOLD_CACHE_SIZE = 4
+FREE_CANVASES = 2  # free RGB quantizer inputs kept per frame size
+
+_free_canvases = {}
+_canvas_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ToneSettings:
+    """Tone curve and dithering options applied before quantizing to 16 gray levels."""
+    gamma: float = 1.0
+    auto_levels: bool = False
+    black_percentile: float = 0.5
+    white_percentile: float = 99.5
+    dither: str = DITHER_FLOYD_STEINBERG
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "ToneSettings":
+        """Build settings from a config section, ignoring unknown keys."""
+        return cls().merged(values)
+
+    def merged(self, overrides: Dict[str, Any]) -> "ToneSettings":
+        """
+        Return a copy with the given overrides applied.
+
+        Values may be strings (e.g. MQTT user properties) and are coerced to
+        the field types.
+
+        Raises:
+            ValueError: If a value cannot be converted or the dither method is unknown
+        """
+        changes = {}
+        for key, value in overrides.items():
+            if key not in self.__dataclass_fields__:
+                continue
+            current = getattr(self, key)
+            if isinstance(current, bool):
+                value = value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes", "on")
+            else:
+                value = type(current)(value)
+            changes[key] = value
+        settings = replace(self, **changes)
+        if settings.dither not in DITHER_METHODS:
+            raise ValueError(f"Unknown dither method '{settings.dither}', expected one of {DITHER_METHODS}")
+        if settings.gamma <= 0:
+            raise ValueError(f"Gamma must be positive, got {settings.gamma}")
+        return settings
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class Gray16Processor:
+    """
+    Vectorized tone mapping and dithering to the panel's 16 gray levels.
+
+    The tone curve (auto-levels and gamma) is folded into a single 256-entry
+    lookup table. Quantization then uses Pillow's C Floyd-Steinberg
+    quantizer or a tiled ordered/blue-noise threshold in 8-bit fixed point,
+    so no per-pixel float arrays are allocated. The output levels and the
+    toned intermediate are written into buffers from the pool when one is
+    given, and the quantizer's RGB input is reused across frames.
+    """
+
+    def __init__(self, settings: Optional[ToneSettings] = None,
+                 buffer_pool: Optional["FrameBufferPool"] = None):
+        """
+        Args:
+            settings (ToneSettings): Defaults used when a frame has no overrides
+            buffer_pool (FrameBufferPool): Source of the frames' level buffers
+        """
+        self.settings = settings or ToneSettings()
+        self.buffer_pool = buffer_pool
+
+    def process(self, image: Image.Image, settings: Optional[ToneSettings] = None) -> PanelFrame:
+        """
+        Tone-map and quantize a panel-sized grayscale image.
+
+        Args:
+            image (Image.Image): Grayscale image at panel resolution
+            settings (ToneSettings): Per-frame settings, defaults to the processor settings
+
+        Returns:
+            PanelFrame: Quantized frame
+        """
+        settings = settings or self.settings
+        if image.mode != "L":
+            image = image.convert("L")
+        curve = self._tone_curve(image, settings)
+        shape = (image.size[1], image.size[0])
+        if self.buffer_pool:
+            levels = self.buffer_pool.acquire(shape)
+        else:
+            levels = np.empty(shape, dtype=np.uint8)
+
+        if settings.dither == DITHER_NONE:
+            levels_lut = np.rint(curve * (GRAY_LEVELS - 1)).astype(np.uint8)
+            np.copyto(levels, np.asarray(image.point(levels_lut.tolist())))
+        elif settings.dither == DITHER_FLOYD_STEINBERG:
+            quantized = self._floyd_steinberg(image, curve)
+            # Same mapping as PALETTE_LEVELS, without widening the indices for a lookup
+            np.minimum(np.asarray(quantized), GRAY_LEVELS - 1, out=levels)
+        else:
+            # Fixed point with 4 fractional bits: 15 levels * 16 steps + 15 never overflows uint8
+            fixed_lut = np.rint(curve * (GRAY_LEVELS - 1) * FRACTION_STEPS).astype(np.uint8)
+            np.copyto(levels, np.asarray(image.point(fixed_lut.tolist())))
+            levels += tiled_thresholds(settings.dither, shape)
+            levels >>= 4
+        return PanelFrame(levels, self.buffer_pool)
+
+    def _floyd_steinberg(self, image: Image.Image, curve: np.ndarray) -> Image.Image:
+        """Quantize with Pillow's Floyd-Steinberg ditherer onto the 16-level palette."""
+        shape = (image.size[1], image.size[0])
+        toned = self.buffer_pool.acquire(shape) if self.buffer_pool else np.empty(shape, dtype=np.uint8)
+        # Pillow ignores a fixed palette for L images, so the toned gray is copied into
+        # each band of a reused RGB image rather than converted into a new one per frame
+        canvas = _acquire_canvas(image.size)
+        try:
+            np.take(np.rint(curve * 255).astype(np.uint8), np.asarray(image), out=toned)
+            for band in "RGB":
+                canvas.frombytes(toned, "raw", band)
+            palette = Image.new("P", (1, 1))
+            palette.putpalette(GRAY16_PALETTE)
+            return canvas.quantize(palette=palette, dither=Image.Dither.FLOYDSTEINBERG)
+        finally:
+            _release_canvas(canvas)
+            if self.buffer_pool:
+                self.buffer_pool.release(toned)
+
+    @staticmethod
+    def _tone_curve(image: Image.Image, settings: ToneSettings) -> np.ndarray:
+        """Map each 8-bit input value to an output intensity in [0, 1]."""
+        black, white = 0.0, 255.0
+        if settings.auto_levels:
+            cumulative = np.cumsum(image.histogram())
+            total = cumulative[-1]
+            black = float(np.searchsorted(cumulative, total * settings.black_percentile / 100))
+            white = float(np.searchsorted(cumulative, total * settings.white_percentile / 100))
+            if white <= black:
+                black, white = 0.0, 255.0
+        curve = np.clip((np.arange(256, dtype=np.float64) - black) / (white - black), 0.0, 1.0)
+        if settings.gamma != 1.0:
+            curve **= settings.gamma
+        return curve
+
+
+def _acquire_canvas(size: Tuple[int, int]) -> Image.Image:
+    with _canvas_lock:
+        free = _free_canvases.get(size)
+        if free:
+            return free.pop()
+    return Image.new("RGB", size)
+
+
+def _release_canvas(canvas: Image.Image) -> None:
+    with _canvas_lock:
+        free = _free_canvases.setdefault(canvas.size, [])
+        if len(free) < FREE_CANVASES:
+            free.append(canvas)
+
+
+@lru_cache(maxsize=TILED_THRESHOLD_CACHE_SIZE)
+def tiled_thresholds(dither: str, shape: Tuple[int, int]) -> np.ndarray:
+    """Threshold matrix of an ordered or blue-noise dither tiled over a whole frame, built once per size."""
+    threshold = BAYER_4X4 if dither == DITHER_ORDERED else blue_noise_thresholds()
+    height, width = shape
+    tile_h, tile_w = threshold.shape
+    tiled = np.ascontiguousarray(np.tile(threshold, (-(-height // tile_h), -(-width // tile_w)))[:height, :width])
+    tiled.setflags(write=False)
+    return tiled
+
+
+@lru_cache(maxsize=1)
+def blue_noise_thresholds(size: int = BLUE_NOISE_SIZE) -> np.ndarray:
+    """
+    Generate a tileable blue-noise threshold matrix with void-and-cluster.
+
+    The matrix is built once per process with a fixed seed, so frames stay
+    reproducible (and cacheable) across runs.
+
+    Returns:
+        np.ndarray: (size, size) uint8 thresholds in the range 0-15
+    """
+    offsets = np.minimum(np.arange(size), size - np.arange(size))
+    kernel = np.exp(-(offsets[:, None] ** 2 + offsets[None, :] ** 2) / (2 * BLUE_NOISE_SIGMA ** 2))
+
+    def splat(energy, index, sign):
+        row, col = divmod(index, size)
+        energy += sign * np.roll(kernel, (row, col), axis=(0, 1))
+
+    total = size * size
+    rng = np.random.default_rng(BLUE_NOISE_SEED)
+    pattern = np.zeros(total, dtype=bool)
+    pattern[rng.choice(total, total // 10, replace=False)] = True
+    energy = np.zeros((size, size))
+    for index in np.flatnonzero(pattern):
+        splat(energy, index, 1)
+    flat_energy = energy.reshape(-1)
+
+    # Relax the initial pattern: move the tightest cluster into the largest void
+    for _ in range(total):
+        cluster = int(np.argmax(np.where(pattern, flat_energy, -np.inf)))
+        pattern[cluster] = False
+        splat(energy, cluster, -1)
+        void = int(np.argmin(np.where(pattern, np.inf, flat_energy)))
+        pattern[void] = True
+        splat(energy, void, 1)
+        if void == cluster:
+            break
+
+    ranks = np.zeros(total, dtype=np.int64)
+    initial_pattern, initial_energy = pattern.copy(), energy.copy()
+    count = int(pattern.sum())
+    for rank in range(count - 1, -1, -1):
+        cluster = int(np.argmax(np.where(pattern, flat_energy, -np.inf)))
+        pattern[cluster] = False
+        splat(energy, cluster, -1)
+        ranks[cluster] = rank
+
+    pattern, energy = initial_pattern, initial_energy
+    flat_energy = energy.reshape(-1)
+    for rank in range(count, total):
+        void = int(np.argmin(np.where(pattern, np.inf, flat_energy)))
+        pattern[void] = True
+        splat(energy, void, 1)
+        ranks[void] = rank
+
+    return (ranks * FRACTION_STEPS // total).astype(np.uint8).reshape(size, size)
@@ -0,0 +1,95 @@
+import io
+import logging
+import os
+from typing import TYPE_CHECKING, BinaryIO, Optional, Union
+
+if TYPE_CHECKING:
+    from PIL import Image
+    from geometry import GeometrySettings
+
+# Constants
+DEFAULT_MAX_IMAGE_PIXELS = 50_000_000
+DEFAULT_MAX_PAYLOAD_BYTES = 20 * 1024 * 1024
+DECODE_MODE = "L"
+MIN_REDUCE_FACTOR = 2
+
+logger = logging.getLogger(__name__)
+
+
+class ImageDecoder:
+    """Decodes image payloads into grayscale images bounded by the panel resolution."""
+
+    def __init__(self, width: int, height: int,
+                 max_image_pixels: int = DEFAULT_MAX_IMAGE_PIXELS,
+                 max_payload_bytes: int = DEFAULT_MAX_PAYLOAD_BYTES):
+        """
+        Initialize the decoder for a given panel resolution.
+
+        Args:
+            width (int): Width of the panel in pixels
+            height (int): Height of the panel in pixels
+            max_image_pixels (int): Largest accepted source image (width * height)
+            max_payload_bytes (int): Largest accepted encoded payload
+        """
+        self.width = width
+        self.height = height
+        self.max_image_pixels = max_image_pixels
+        self.max_payload_bytes = max_payload_bytes
+
+    def decode(self, payload: Union[bytes, BinaryIO],
+               geometry: Optional["GeometrySettings"] = None) -> "Image.Image":
+        """
+        Decode a payload without materializing the full-resolution source.
+
+        JPEGs are decoded with DCT scaling and grayscale conversion inside the
+        decoder (draft mode); other formats are reduced by an integer factor
+        right after loading. The result is never smaller than the panel in
+        the orientation it will be shown in.
+
+        Args:
+            payload (bytes | BinaryIO): Encoded image data or a seekable binary file
+            geometry (GeometrySettings): Orientation the image will be shown in; a quarter turn
+                (from rotation or EXIF orientation) swaps the panel bounds
+
+        Returns:
+            Image.Image: Grayscale ('L') image with its EXIF orientation in ``info['orientation']``
+
+        Raises:
+            ValueError: If the payload or the image it describes is too large
+        """
+        if isinstance(payload, (bytes, bytearray)):
+            size = len(payload)
+            payload = io.BytesIO(payload)
+        else:
+            size = os.fstat(payload.fileno()).st_size
+        if size > self.max_payload_bytes:
+            raise ValueError(f"Payload of {size} bytes exceeds limit of {self.max_payload_bytes} bytes")
+
+        # Pillow is imported on first use to keep it off the cold start path
+        from PIL import Image
+        from geometry import EXIF_ORIENTATION_TAG, ORIENTATION_INFO_KEY
+        image = Image.open(payload)
+        source_width, source_height = image.size
+        if source_width * source_height > self.max_image_pixels:
+            raise ValueError(f"Image of {source_width}x{source_height} pixels exceeds limit of "
+                             f"{self.max_image_pixels} pixels")
+
+        orientation = image.getexif().get(EXIF_ORIENTATION_TAG, 1)
+        bounds = (self.width, self.height)
+        if geometry is not None and geometry.swaps_axes(orientation):
+            bounds = (self.height, self.width)
+
+        if image.format == "JPEG":
+            image.draft(DECODE_MODE, bounds)
+        image.load()
+        logger.debug(f"Decoded {image.format} image from {source_width}x{source_height} "
+                     f"to {image.size[0]}x{image.size[1]}")
+
+        if image.mode != DECODE_MODE:
+            image = image.convert(DECODE_MODE)
+
+        factor = min(image.size[0] // bounds[0], image.size[1] // bounds[1])
+        if factor >= MIN_REDUCE_FACTOR:
+            image = image.reduce(factor)
+        image.info[ORIENTATION_INFO_KEY] = orientation
+        return image
@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+# Constants
+DEFAULT_METRICS_INTERVAL = 300
+DEFAULT_WINDOW = 256
+METRICS_SEGMENT = "metrics"
+PROC_STAT_PATH = "/proc/self/stat"
+PROC_STAT_START_TIME_FIELD = 19  # starttime, counted from the field after the command name
+PIPELINE_STAGES = ("receive", "queue_wait", "decode", "render", "wake", "spi_transfer", "refresh", "sleep", "frame")
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """
+    Latency distribution of one pipeline stage.
+
+    Keeps the most recent ``window`` samples for percentiles plus lifetime
+    count, total and maximum, and the CPU time spent by the measured thread.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    def add(self, seconds: float, cpu_seconds: float = 0.0) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.cpu_seconds += cpu_seconds
+
+    def percentile(self, fraction: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'p50_ms': round(self.percentile(0.5) * 1000, 1),
+            'p95_ms': round(self.percentile(0.95) * 1000, 1),
+            'max_ms': round(self.max_seconds * 1000, 1),
+            'avg_ms': round(self.total_seconds / self.count * 1000, 1) if self.count else 0.0,
+            'cpu_ms': round(self.cpu_seconds * 1000, 1)
+        }
+
+
+def system_uptime() -> Optional[float]:
+    """Seconds since the system booted, including suspend, or None if unknown."""
+    clock = getattr(time, "CLOCK_BOOTTIME", None)
+    if clock is None:
+        return None
+    return time.clock_gettime(clock)
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process was started, or None if unknown."""
+    uptime = system_uptime()
+    if uptime is None:
+        return None
+    try:
+        with open(PROC_STAT_PATH, "r") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return max(0.0, uptime - int(fields[PROC_STAT_START_TIME_FIELD]) / os.sysconf("SC_CLK_TCK"))
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class StartupTimeline:
+    """
+    Milestones of a cold start, measured from process start.
+
+    Only the first occurrence of each milestone is kept, so marks can be
+    placed on paths that run again after a reconnect. The system uptime at
+    process start is reported as well, which makes boot-to-first-pixel
+    visible on frames that power up for a single image.
+    """
+
+    def __init__(self):
+        age = process_age()
+        self._origin = time.monotonic() - (age or 0.0)
+        uptime = system_uptime()
+        self.uptime_at_start = uptime - age if uptime is not None and age is not None else None
+        self._marks = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name: str) -> bool:
+        """
+        Record a milestone.
+
+        Returns:
+            bool: True if this was the first time ``name`` was reached
+        """
+        with self._lock:
+            if name in self._marks:
+                return False
+            self._marks[name] = time.monotonic() - self._origin
+            return True
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            marks = {name: round(seconds, 3) for name, seconds in self._marks.items()}
+        return {
+            'uptime_at_start': round(self.uptime_at_start, 3) if self.uptime_at_start is not None else None,
+            'marks': marks
+        }
+
+
+class PipelineMetrics:
+    """
+    Structured timing spans of the frame pipeline.
+
+    Every span feeds a per-stage latency histogram; snapshots add the
+    process memory high-water mark and CPU time and are published
+    periodically as compact JSON.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, publish_interval: float = DEFAULT_METRICS_INTERVAL):
+        """
+        Args:
+            window (int): Number of recent samples per stage used for percentiles
+            publish_interval (float): Seconds between metrics publishes
+        """
+        self.window = window
+        self.publish_interval = publish_interval
+        self._histograms = {}
+        self._started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._publish = None
+
+    @contextmanager
+    def span(self, stage: str):
+        """Time the block as one sample of ``stage``; failed blocks are recorded as well."""
+        start = time.monotonic()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(stage, time.monotonic() - start, time.thread_time() - cpu_start)
+
+    def record(self, stage: str, seconds: float, cpu_seconds: float = 0.0) -> None:
+        """Add a sample measured elsewhere, e.g. a queue wait."""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram(self.window)
+            histogram.add(max(0.0, seconds), max(0.0, cpu_seconds))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Stage histograms in pipeline order plus process resource usage."""
+        with self._lock:
+            order = {stage: index for index, stage in enumerate(PIPELINE_STAGES)}
+            stages = {stage: self._histograms[stage].summary()
+                      for stage in sorted(self._histograms, key=lambda name: (order.get(name, len(order)), name))}
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return {
+            'stages': stages,
+            'resources': {
+                # ru_maxrss is reported in kilobytes on Linux
+                'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),
+                'cpu_user_seconds': round(usage.ru_utime, 2),
+                'cpu_system_seconds': round(usage.ru_stime, 2),
+                'uptime_seconds': round(time.monotonic() - self._started_at)
+            }
+        }
+
+    def payload(self) -> str:
+        return json.dumps(self.snapshot(), separators=(',', ':'))
+
+    def start(self, publish: Callable[[str], None]) -> None:
+        """Publish snapshots every ``publish_interval`` seconds in the background."""
+        self._publish = publish
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.publish_interval):
+            self._emit(self._publish)
+
+    def _emit(self, publish: Optional[Callable[[str], None]]) -> None:
+        if not publish:
+            return
+        try:
+            publish(self.payload())
+        except Exception as e:
+            logger.warning(f"Failed to publish metrics: {e}")
@@ -1,8 +1,15 @@
+import json
 import logging
+import os
+import time
+from refresh_timing import REFRESH_SECONDS
 
 logger = logging.getLogger(__name__)
 
 class EPD:
+    # Waveforms the display calls take; the screen passes its choice as ``mode``
+    WAVEFORM_MODES = tuple(REFRESH_SECONDS)
+
     def __init__(self):
         self.width = 1600
         self.height = 1200
@@ -10,12 +17,153 @@ class EPD:
         
     def init(self):
         logger.info("Mocked EPD init")
+
+    def prepare(self):
+        logger.info("Mocked EPD prepare")
         
-    def display(self, image):
-        logger.info("Mocked EPD display")
+    def display(self, image, mode=None):
+        logger.info(f"Mocked EPD display ({mode or 'GC16'})")
+
+    def display_partial(self, image, region, mode=None):
+        logger.info(f"Mocked EPD partial display of {region} ({mode or 'GC16'})")
         
     def sleep(self):
         logger.info("Mocked EPD sleep")
         
+    def close(self):
+        logger.info("Mocked EPD close")
+        
     def Clear(self):
-        logger.info("Mocked EPD Clear")
\ No newline at end of file
+        logger.info("Mocked EPD Clear")
+
+
+class TimedEPD(EPD):
+    """
+    Mock EPD that models IT8951 timing for benchmarks.
+
+    SPI transfers take as long as sending 4bpp pixel data at ``spi_hz``.
+    Like the IT8951, a display call returns once the refresh is started and
+    the busy pin is held for the waveform's refresh time, which
+    ``wait_display_ready`` (or the next command) waits out. Waking the
+    controller costs the reset and VCOM programming time. With ``realtime``
+    disabled the time is only accounted, not slept.
+    """
+
+    WAKE_SECONDS = 0.25
+    SLEEP_SECONDS = 0.01
+    BUSY_POLL_SECONDS = 0.002
+    REFRESH_SECONDS = REFRESH_SECONDS
+    BITS_PER_PIXEL = 4
+
+    def __init__(self, width=1600, height=1200, spi_hz=24000000, mode='GC16', realtime=True):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.spi_hz = spi_hz
+        self.mode = mode
+        self.realtime = realtime
+        self.timings = []
+        self.totals = {}
+        self._busy_seconds = 0.0
+
+    def prepare(self):
+        self.wait_display_ready()
+        self._simulate('wake', self.WAKE_SECONDS)
+
+    def display(self, image, mode=None):
+        self._transfer_and_refresh(image.size[0] * image.size[1], mode)
+
+    def display_partial(self, image, region, mode=None):
+        self._transfer_and_refresh(image.size[0] * image.size[1], mode)
+
+    def sleep(self):
+        self.wait_display_ready()
+        self._simulate('sleep', self.SLEEP_SECONDS)
+
+    def close(self):
+        pass
+
+    def transfer_seconds(self, pixels):
+        """Time to clock ``pixels`` over SPI at the configured rate."""
+        return pixels * self.BITS_PER_PIXEL / self.spi_hz
+
+    def wait_display_ready(self):
+        """Wait until the busy pin of the last refresh is released."""
+        if self._busy_seconds:
+            busy_seconds, self._busy_seconds = self._busy_seconds, 0.0
+            self._simulate('refresh', busy_seconds)
+
+    def _transfer_and_refresh(self, pixels, mode=None):
+        self.wait_display_ready()
+        self._simulate('spi_transfer', self.transfer_seconds(pixels))
+        self._busy_seconds += self.REFRESH_SECONDS[mode or self.mode] + self.BUSY_POLL_SECONDS
+
+    def _simulate(self, stage, seconds):
+        if self.realtime:
+            time.sleep(seconds)
+        self.timings.append((stage, seconds))
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+
+
+class FileEPD(EPD):
+    """
+    Mock EPD that writes every update to files instead of a panel.
+
+    After each update the full panel contents are written as they would
+    appear on the glass, with partial updates composited onto the previous
+    contents: as PNG and/or as the panel-native 4bpp ``.g16`` buffer
+    (see PanelFrame.to_bytes). Every update is also appended to
+    ``updates.jsonl`` in the output directory.
+    """
+
+    FORMATS = ('png', 'g16')
+    UPDATE_LOG = 'updates.jsonl'
+
+    def __init__(self, output_dir, width=1600, height=1200, formats=FORMATS):
+        super().__init__()
+        unknown = set(formats) - set(self.FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown output format(s) {sorted(unknown)}, expected {self.FORMATS}")
+        self.output_dir = output_dir
+        self.width = width
+        self.height = height
+        self.formats = tuple(formats)
+        self.canvas = None
+        os.makedirs(output_dir, exist_ok=True)
+        self.updates = self._count_updates()
+
+    def display(self, image, mode=None):
+        self.canvas = image.convert('L')
+        self._write('full', None, mode)
+
+    def display_partial(self, image, region, mode=None):
+        from PIL import Image
+        if self.canvas is None:
+            self.canvas = Image.new('L', (self.width, self.height), 255)
+        self.canvas.paste(image.convert('L'), tuple(region[:2]))
+        self._write('partial', list(region), mode)
+
+    def _write(self, kind, region, mode=None):
+        from panel_frame import PanelFrame, FRAME_SUFFIX
+        self.updates += 1
+        name = f"frame_{self.updates:05d}"
+        files = []
+        if 'png' in self.formats:
+            files.append(f"{name}.png")
+            self.canvas.save(os.path.join(self.output_dir, files[-1]))
+        if 'g16' in self.formats:
+            files.append(f"{name}{FRAME_SUFFIX}")
+            with open(os.path.join(self.output_dir, files[-1]), 'wb') as f:
+                f.write(PanelFrame.from_image(self.canvas).to_bytes())
+        with open(os.path.join(self.output_dir, self.UPDATE_LOG), 'a') as f:
+            f.write(json.dumps({'update': self.updates, 'kind': kind, 'region': region, 'mode': mode or 'GC16',
+                                'files': files, 'time': time.time()}) + '\n')
+        logger.info(f"File EPD wrote {kind} update {self.updates} to {', '.join(files)}")
+
+    def _count_updates(self):
+        # Continue numbering after earlier runs instead of overwriting their frames
+        try:
+            with open(os.path.join(self.output_dir, self.UPDATE_LOG), 'r') as f:
+                return sum(1 for _ in f)
+        except OSError:
+            return 0
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import socket
+from typing import Any
+import paho.mqtt.client as mqtt
+
+# Constants
+MISC_INTERVAL = 1.0  # keepalive pings and timeouts are handled by loop_misc once a second
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncioMqttAdapter:
+    """
+    Drives a paho client from an asyncio event loop instead of loop() or loop_forever().
+
+    The client's socket is watched with ``add_reader`` and, while packets
+    are queued, ``add_writer``; a small task runs ``loop_misc`` for
+    keepalives. All client callbacks therefore run on the event loop thread.
+    Other threads may still publish: paho then asks for write readiness from
+    that thread, which is handed over to the loop.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, client: mqtt.Client):
+        """
+        Args:
+            loop (asyncio.AbstractEventLoop): Running loop that owns the client's socket
+            client (mqtt.Client): Client that is not started with loop_start() or loop_forever()
+        """
+        self.loop = loop
+        self.client = client
+        self._misc = None
+        client.on_socket_open = self._on_socket_open
+        client.on_socket_close = self._on_socket_close
+        client.on_socket_register_write = self._on_socket_register_write
+        client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    def detach(self) -> None:
+        """Stop watching the socket; the client has to be driven by loop() again afterwards."""
+        sock = self.client.socket()
+        if sock is not None and not self.loop.is_closed():
+            self._unwatch(sock.fileno())
+        if self._misc:
+            self._misc.cancel()
+            self._misc = None
+        self.client.on_socket_open = None
+        self.client.on_socket_close = None
+        self.client.on_socket_register_write = None
+        self.client.on_socket_unregister_write = None
+
+    def _call(self, callback, *args: Any) -> None:
+        # Socket callbacks fire on whichever thread touched the client
+        if self.loop.is_closed():
+            return
+        if self._on_loop_thread():
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def _on_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    # Descriptors are passed on instead of sockets: paho closes a socket right after its close callback,
+    # before a call handed over from another thread runs
+
+    def _on_socket_open(self, client: mqtt.Client, userdata: Any, sock: socket.socket) -> None:
+        self._call(self._watch, sock.fileno())
+
+    def _watch(self, fd: int) -> None:
+        self.loop.add_reader(fd, self.client.loop_read)
+        if self._misc is None or self._misc.done():
+            self._misc = self.loop.create_task(self._misc_loop())
+
+    def _on_socket_close(self, client: mqtt.Client, userdata: Any, sock: socket.socket) -> None:
+        self._call(self._unwatch, sock.fileno())
+
+    def _unwatch(self, fd: int) -> None:
+        self.loop.remove_reader(fd)
+        self.loop.remove_writer(fd)
+
+    def _on_socket_register_write(self, client: mqtt.Client, userdata: Any, sock: socket.socket) -> None:
+        self._call(self._watch_write, sock.fileno())
+
+    def _watch_write(self, fd: int) -> None:
+        # Skip requests for a socket that was closed in the meantime
+        sock = self.client.socket()
+        if sock is not None and sock.fileno() == fd:
+            self.loop.add_writer(fd, self.client.loop_write)
+
+    def _on_socket_unregister_write(self, client: mqtt.Client, userdata: Any, sock: socket.socket) -> None:
+        self._call(self.loop.remove_writer, sock.fileno())
+
+    async def _misc_loop(self) -> None:
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(MISC_INTERVAL)
@@ -0,0 +1,115 @@
+import struct
+from typing import TYPE_CHECKING, Optional, Union
+import numpy as np
+from PIL import Image
+
+if TYPE_CHECKING:
+    from frame_buffers import FrameBufferPool
+
+# Constants
+GRAY_LEVELS = 16
+LEVEL_SCALE = 255 // (GRAY_LEVELS - 1)
+QUANTIZE_LUT = [(value * (GRAY_LEVELS - 1) + 127) // 255 for value in range(256)]
+FRAME_HEADER = struct.Struct("<II")
+FRAME_SUFFIX = ".g16"
+
+
+class PanelFrame:
+    """A panel-native frame holding one 4-bit gray level (0-15) per pixel."""
+
+    def __init__(self, levels: np.ndarray, pool: Optional["FrameBufferPool"] = None):
+        """
+        Args:
+            levels (np.ndarray): 2D uint8 array of gray levels, shape (height, width)
+            pool (FrameBufferPool): Pool the levels buffer was taken from, returned to it by ``release``
+        """
+        self.levels = levels
+        self.pool = pool
+
+    def release(self) -> None:
+        """Return the levels buffer to its pool; the frame must not be used afterwards."""
+        if self.pool is None:
+            return
+        pool, self.pool = self.pool, None
+        # Frames of odd width are a view into a buffer padded to whole bytes
+        pool.release(self.levels if self.levels.base is None else self.levels.base)
+
+    @property
+    def width(self) -> int:
+        return self.levels.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.levels.shape[0]
+
+    @classmethod
+    def from_image(cls, image: Image.Image) -> "PanelFrame":
+        """Quantize a grayscale image to 16 gray levels."""
+        if image.mode != "L":
+            image = image.convert("L")
+        return cls(np.asarray(image.point(QUANTIZE_LUT)))
+
+    def to_image(self, out: Optional[np.ndarray] = None) -> Image.Image:
+        """
+        Expand the gray levels back to an 8-bit grayscale image.
+
+        Args:
+            out (np.ndarray): Reusable uint8 buffer of the frame's shape; the image shares
+                its memory and is only valid until the buffer is written again
+        """
+        if out is None:
+            return Image.fromarray(self.levels * np.uint8(LEVEL_SCALE), mode="L")
+        np.multiply(self.levels, np.uint8(LEVEL_SCALE), out=out)
+        return Image.fromarray(out, mode="L")
+
+    def pack(self) -> bytes:
+        """
+        Pack the frame as 4bpp, two pixels per byte, high nibble first.
+
+        Returns:
+            bytes: Packed frame data, rows padded to a whole byte
+        """
+        packed = np.empty((self.height, (self.width + 1) // 2), dtype=np.uint8)
+        self._pack_into(packed)
+        return packed.tobytes()
+
+    def _pack_into(self, packed: np.ndarray) -> None:
+        even, odd = self.levels[:, 0::2], self.levels[:, 1::2]
+        np.left_shift(even, 4, out=packed)
+        # An odd width leaves the low nibble of each row's last byte zero
+        np.bitwise_or(packed[:, :odd.shape[1]], odd, out=packed[:, :odd.shape[1]])
+
+    @classmethod
+    def unpack(cls, data: Union[bytes, bytearray, memoryview], width: int, height: int,
+               pool: Optional["FrameBufferPool"] = None) -> "PanelFrame":
+        """
+        Rebuild a frame from data produced by ``pack``.
+
+        Args:
+            data: Packed frame data; read in place, never copied
+            width (int): Width of the frame in pixels
+            height (int): Height of the frame in pixels
+            pool (FrameBufferPool): Take the levels buffer from this pool
+        """
+        packed = np.frombuffer(data, dtype=np.uint8, count=height * ((width + 1) // 2)).reshape(height, -1)
+        shape = (height, packed.shape[1] * 2)
+        levels = pool.acquire(shape) if pool else np.empty(shape, dtype=np.uint8)
+        np.right_shift(packed, 4, out=levels[:, 0::2])
+        np.bitwise_and(packed, 0x0F, out=levels[:, 1::2])
+        return cls(levels[:, :width] if width % 2 else levels, pool)
+
+    def to_bytes(self) -> bytearray:
+        """Serialize as a width/height header followed by the packed frame (the ``.g16`` format)."""
+        row_bytes = (self.width + 1) // 2
+        data = bytearray(FRAME_HEADER.size + self.height * row_bytes)
+        FRAME_HEADER.pack_into(data, 0, self.width, self.height)
+        # Pack straight into the output instead of concatenating a header and a packed copy
+        self._pack_into(np.frombuffer(data, dtype=np.uint8, offset=FRAME_HEADER.size).reshape(self.height, row_bytes))
+        return data
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview],
+                   pool: Optional["FrameBufferPool"] = None) -> "PanelFrame":
+        """Rebuild a frame from data produced by ``to_bytes`` without copying the packed part."""
+        width, height = FRAME_HEADER.unpack_from(data)
+        return cls.unpack(memoryview(data)[FRAME_HEADER.size:], width, height, pool)
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from chunked_transfer import CHUNKED_SEGMENT, RESUME_SEGMENT
+from image_decoder import ImageDecoder
+from playlist import PLAYLIST_SEGMENT
+from processed_message_tracker import ProcessedMessageTracker
+from render_queue import RenderQueue
+from spi_calibration import CALIBRATION_SEGMENT
+
+if TYPE_CHECKING:
+    from e_ink_screen import EInkScreen
+
+# Constants
+DEFAULT_PANEL_NAME = "main"
+DEFAULT_SPI_BUS = 0
+DEFAULT_SPI_DEVICE = 0
+# Top-level settings a panel entry may override; everything else is shared by all panels
+PANEL_SETTINGS = ("screen_width", "screen_height", "geometry", "tone_mapping", "partial_refresh",
+                  "refresh", "display_session", "file_epd")
+# Sub-topics of the display topic the client subscribes to itself
+RESERVED_SEGMENTS = (CHUNKED_SEGMENT, RESUME_SEGMENT, PLAYLIST_SEGMENT, CALIBRATION_SEGMENT)
+
+logger = logging.getLogger(__name__)
+
+
+def panel_configs(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Resolve the per-panel settings of a config.
+
+    Without a ``panels`` list the config describes a single panel showing the
+    display topic. Each entry of ``panels`` needs a unique ``name``; its topic
+    defaults to ``<display topic>/<name>`` and may be set with
+    ``topic_image_display`` (``{device_id}`` is replaced). Entries override
+    the top-level screen, geometry, tone, refresh and session settings, and
+    ``driver`` holds the IT8951 wiring (spi_bus, spi_device, reset_pin,
+    busy_pin, vcom).
+
+    Raises:
+        ValueError: If panel names or topics are missing, not unique or
+            collide with the client's own sub-topics
+    """
+    entries = config.get("panels") or []
+    if not entries:
+        return [{
+            **{key: config[key] for key in PANEL_SETTINGS if key in config},
+            "name": DEFAULT_PANEL_NAME,
+            "topic": config["topic_image_display"],
+            "driver": config.get("driver", {})
+        }]
+
+    panels = []
+    for entry in entries:
+        name = entry.get("name")
+        if not name:
+            raise ValueError(f"Panel entry without a name: {entry}")
+        topic = entry.get("topic_image_display")
+        if topic:
+            topic = topic.replace("{device_id}", entry.get("device_id", config["device_id"]))
+        else:
+            topic = f'{config["topic_image_display"]}/{name}'
+        if _reserved_segment(config["topic_image_display"], topic):
+            raise ValueError(f"Panel '{name}' uses the reserved topic {topic}, "
+                             f"panel topics must not start with one of {RESERVED_SEGMENTS}")
+        panel = {key: config[key] for key in PANEL_SETTINGS if key in config}
+        panel.update({key: entry[key] for key in PANEL_SETTINGS if key in entry})
+        panel.update({"name": name, "topic": topic, "driver": entry.get("driver", {})})
+        panels.append(panel)
+
+    for key in ("name", "topic"):
+        values = [panel[key] for panel in panels]
+        duplicates = sorted({value for value in values if values.count(value) > 1})
+        if duplicates:
+            raise ValueError(f"Panel {key}s must be unique, duplicated: {duplicates}")
+    return panels
+
+
+def _reserved_segment(display_topic: str, topic: str) -> bool:
+    """Whether ``topic`` is, or lies below, one of the client's sub-topics of ``display_topic``."""
+    if not topic.startswith(f"{display_topic}/"):
+        return False
+    return topic[len(display_topic) + 1:].split("/")[0] in RESERVED_SEGMENTS
+
+
+class Panel:
+    """
+    One display driven by the client.
+
+    Bundles everything that is per panel: the MQTT topic it shows, its own
+    render queue and render task, processed-message history, decoder
+    bounds and, once the renderer is set up, its EInkScreen with its own
+    display session.
+    """
+
+    def __init__(self, config: Dict[str, Any], render_queue: RenderQueue,
+                 processed_message_tracker: ProcessedMessageTracker, image_decoder: ImageDecoder):
+        """
+        Args:
+            config (dict): Resolved panel settings from ``panel_configs``
+            render_queue (RenderQueue): Jobs waiting for this panel
+            processed_message_tracker (ProcessedMessageTracker): Duplicate detection for this panel
+            image_decoder (ImageDecoder): Decoder bounded by this panel's resolution
+        """
+        self.config = config
+        self.name = config["name"]
+        self.topic = config["topic"]
+        self.width = config["screen_width"]
+        self.height = config["screen_height"]
+        self.spi_bus = config.get("driver", {}).get("spi_bus", DEFAULT_SPI_BUS)
+        self.spi_device = config.get("driver", {}).get("spi_device", DEFAULT_SPI_DEVICE)
+        self.render_queue = render_queue
+        self.processed_message_tracker = processed_message_tracker
+        self.image_decoder = image_decoder
+        self.lock = threading.Lock()
+        self.screen: Optional["EInkScreen"] = None
+        # Render loop task and the job it is working on, owned by the client's event loop
+        self.worker: Optional[asyncio.Task] = None
+        self.wakeup = asyncio.Event()
+        self.current_job = None
+        self.current_task: Optional[asyncio.Task] = None
+        self.displaying = False
+
+    def __repr__(self) -> str:
+        return f"Panel({self.name!r}, {self.width}x{self.height}, topic={self.topic!r}, spi_bus={self.spi_bus})"
+
+
+class SpiBusScheduler:
+    """
+    Serializes SPI access per bus.
+
+    Panels on the same bus (different chip selects) take turns for wake,
+    transfer and sleep, while panels on different buses transfer in
+    parallel. Refresh waits only watch each panel's busy pin and run outside
+    the bus lock, so all panels refresh concurrently.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def lock(self, bus: int) -> threading.Lock:
+        """The lock guarding ``bus``, created on first use."""
+        with self._lock:
+            if bus not in self._locks:
+                self._locks[bus] = threading.Lock()
+            return self._locks[bus]
+
+    @property
+    def buses(self) -> List[int]:
+        with self._lock:
+            return sorted(self._locks)
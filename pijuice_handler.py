@@ -1,14 +1,25 @@
 #!/usr/bin/python3
 # -*- coding:utf-8 -*-
-# Handler file to run pycasso when using pijuice
+# PiJuice helpers for the battery duty cycle: charge status, RTC wakeup and power off
 
 import os
-import sys
-import time
 import logging
+from datetime import timezone
 from enum import Enum
 
-from pijuice import PiJuice
+PIJUICE_NO_ERROR = 'NO_ERROR'
+DEFAULT_POWER_OFF_DELAY = 20  # seconds; the Pi needs well over 5s to halt cleanly
+
+
+class PiJuiceConst(Enum):
+    STATUS_ROOT = 'data'
+    STATUS_POWER = 'powerInput'
+    STATUS_ERROR = 'error'
+    PRESENT = 'PRESENT'
+    NOT_PRESENT = 'NOT_PRESENT'
+    WEAK = 'WEAK'
+    BAD = 'BAD'
+
 
 class BatteryConst(Enum):
     ERROR = -1
@@ -23,50 +34,60 @@ class BatteryConst(Enum):
 
 class PiJuiceHandler:
     """
-    A class used to provide image operations for pycasso.
+    A class used to drive PiJuice power management for the frame.
 
     Attributes
     ----------
 
     Methods
     -------
-    safe_pijuice_shutdown(pijuice)
+    safe_pijuice_shutdown(pijuice, delay)
         Uses PiJuice to attempt to shut down safely and completely using pijuice object 'pijuice'.
+        Returns True once the shutdown was started; the caller exits on its own.
 
     system_shutdown()
-        Uses linux system command to shut down.
+        Uses linux system command to shut down. Returns True once the shutdown was started.
 
     pijuice_led_disable(pijuice)
         Uses PiJuice to disable LEDs on board with pijuice object 'pijuice'.
 
     get_charge_status(power_status, charge_level)
-        Returns valid charge level or constant to be passed to pycasso for battery display. Uses valid pijuice
+        Returns valid charge level or a BatteryConst value for the battery display. Uses valid pijuice
         power_status and charge_level
 
-    def run(self):
-        Attempts to run pycasso based on configuration and pijuice settings.
+    clear_wakeup_alarm(pijuice)
+        Acknowledges the RTC alarm that woke the system so it can fire again.
+
+    schedule_wakeup(pijuice, wake_at)
+        Programs the RTC alarm for 'wake_at' and enables wakeup on alarm.
+
+    read_power(pijuice)
+        Returns the power in watts that PiJuice currently supplies to the Raspberry Pi.
     """
     def __init__(self):
         pass
 
     @staticmethod
-    def safe_pijuice_shutdown(pijuice):
+    def safe_pijuice_shutdown(pijuice, delay=DEFAULT_POWER_OFF_DELAY):
         try:
             pijuice.power.SetSystemPowerSwitch(0)
-            pijuice.power.SetPowerOff(5)
+            pijuice.power.SetPowerOff(delay)
             pijuice.rtcAlarm.SetWakeupEnabled(True)
-            os.system("sudo shutdown -h 0")
-            sys.exit()
+            return PiJuiceHandler.system_shutdown()
         except Exception as e:
             logging.error(f"Failed to shutdown PiJuice safely: {e}")
+            return False
 
     @staticmethod
     def system_shutdown():
         try:
-            os.system("shutdown /s /t 1")
-            sys.exit()
+            status = os.system("sudo shutdown -h 0")
+            if status:
+                raise RuntimeError(f"shutdown exited with status {status}")
+            return True
         except Exception as e:
             logging.error(f"Failed to shutdown system: {e}")
+            return False
 
     @staticmethod
     def pijuice_led_disable(pijuice):
@@ -92,62 +113,53 @@ class PiJuiceHandler:
 
         return charge_level
 
-    def run(self):
+    @staticmethod
+    def clear_wakeup_alarm(pijuice):
         try:
-            instance = Pycasso()
+            PiJuiceHandler._check(pijuice.rtcAlarm.ClearAlarmFlag(), "clear RTC alarm flag")
         except Exception as e:
-            logging.error(e)
-            logging.error("Cannot create Pycasso object. Exiting process.")
-            sys.exit()
-
-        # Set config variables based on config that pycasso loaded
-        sleep_time = instance.config.wait_to_run
-        shutdown = instance.config.shutdown_on_battery
-        shutdown_ex = instance.config.shutdown_on_exception
+            logging.error(f"Failed to clear PiJuice RTC alarm: {e}")
 
-        power_status = None
-        charge_level = BatteryConst.ERROR.value
-
-        # sleep for a bit as I can't figure out a better solution to stop pijuice from failing to start
-        time.sleep(sleep_time)
+    @staticmethod
+    def schedule_wakeup(pijuice, wake_at):
+        """
+        Program the RTC alarm. The PiJuice RTC runs on UTC, so 'wake_at' is converted first.
+
+        Returns True if the alarm was set and wakeup on alarm is enabled.
+        """
+        wake_at = wake_at.astimezone(timezone.utc) if wake_at.tzinfo else wake_at.replace(tzinfo=timezone.utc)
+        alarm = {
+            'second': wake_at.second,
+            'minute': wake_at.minute,
+            'hour': wake_at.hour,
+            'day': wake_at.day
+        }
         try:
-            pijuice = PiJuice(1, 0x14)
-            power_status = pijuice.status.GetStatus()[PiJuiceConst.STATUS_ROOT.value][PiJuiceConst.STATUS_POWER.value]
-            charge_level = pijuice.status.GetChargeLevel()['data']
-            instance.charge_level = PiJuiceHandler.get_charge_status(power_status, charge_level)
-
+            PiJuiceHandler._check(pijuice.rtcAlarm.ClearAlarmFlag(), "clear RTC alarm flag")
+            PiJuiceHandler._check(pijuice.rtcAlarm.SetAlarm(alarm), "set RTC alarm")
+            PiJuiceHandler._check(pijuice.rtcAlarm.SetWakeupEnabled(True), "enable wakeup on alarm")
+            logging.info(f"RTC wakeup scheduled for {wake_at.isoformat()}")
+            return True
         except Exception as e:
-            logging.error(e)
-            logging.error("Cannot create pijuice object. Running pycasso once with error display and exiting process.")
-            # run pycasso with error symbol, then exit
-            instance.add_exception_icon()
-            instance.run()
-
-            if shutdown_ex:
-                logging.info(f"Shutting down if possible. Waiting {sleep_time} seconds before sending signal")
-                time.sleep(sleep_time)
-                self.system_shutdown()
-                sys.exit()
-
-        logging.info(f"Power status is \'{power_status}\'")
-        logging.info(f"Battery level is \'{charge_level}\'')
+            logging.error(f"Failed to schedule PiJuice RTC wakeup: {e}")
+            return False
 
+    @staticmethod
+    def read_power(pijuice):
+        """Power drawn by the Raspberry Pi from the PiJuice IO rail in watts, or None."""
         try:
-            instance.run()
-
-            if power_status == PiJuiceConst.NOT_PRESENT.value:
-                # shutdown if we've configured pycasso to do so
-                if shutdown:
-                    self.safe_pijuice_shutdown(pijuice)
-
+            voltage = pijuice.status.GetIoVoltage()
+            current = pijuice.status.GetIoCurrent()
+            PiJuiceHandler._check(voltage, "read IO voltage")
+            PiJuiceHandler._check(current, "read IO current")
+            return abs(voltage[PiJuiceConst.STATUS_ROOT.value] * current[PiJuiceConst.STATUS_ROOT.value]) / 1e6
         except Exception as e:
-            logging.error(e)
+            logging.warning(f"Failed to read PiJuice power: {e}")
+            return None
 
-            # shutdown if we've configured pycasso to do so
-            if shutdown_ex:
-                logging.info(f"Shutting down if possible. Waiting {sleep_time} seconds before sending signal")
-                time.sleep(sleep_time)
-                self.safe_pijuice_shutdown(pijuice)
-            sys.exit()
-
-        return
+    @staticmethod
+    def _check(result, action):
+        error = result.get(PiJuiceConst.STATUS_ERROR.value, PIJUICE_NO_ERROR) if isinstance(result, dict) else None
+        if error != PIJUICE_NO_ERROR:
+            raise RuntimeError(f"PiJuice failed to {action}: {error}")
+        return result
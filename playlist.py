@@ -0,0 +1,444 @@
+import bisect
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
+
+# NumPy comes with PanelFrame and is only needed once frames are read or written
+if TYPE_CHECKING:
+    from frame_buffers import FrameBufferPool
+    from panel_frame import PanelFrame
+
+# Constants
+PLAYLIST_SEGMENT = "playlist"
+IMAGES_SEGMENT = "images"
+MISSING_SEGMENT = "missing"
+PLAYLIST_PROPERTY = "playlist"
+DEFAULT_STORE_DIR = "cache/playlist"
+DEFAULT_PREFETCH_HORIZON = 24 * 3600
+IMAGES_DIR = "images"
+FRAMES_DIR = "frames"
+PLAYLIST_FILE = "playlist.json"
+SHA256_HEX_LENGTH = 64
+SIGNATURE_DIGEST_SIZE = 10
+PLAYER_POLL_INTERVAL = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+def parse_time(value: Any) -> float:
+    """Epoch seconds from a number or an ISO 8601 string; naive times are UTC."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    moment = datetime.fromisoformat(str(value))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def is_sha256(value: str) -> bool:
+    return len(value) == SHA256_HEX_LENGTH and all(c in "0123456789abcdef" for c in value)
+
+
+@dataclass(frozen=True)
+class PlaylistItem:
+    """One scheduled image: shown on ``panel`` from ``start`` until the panel's next item."""
+    image: str
+    start: float
+    panel: str
+    options: Tuple[Tuple[str, str], ...] = ()
+
+    @property
+    def option_dict(self) -> Dict[str, str]:
+        return dict(self.options)
+
+
+@dataclass
+class Playlist:
+    """
+    Schedule pushed by the server.
+
+    The JSON form is ``{"id": ..., "loop": seconds, "items": [{"image":
+    <sha256 of the payload>, "start": <epoch or ISO 8601>, "panel": <name>,
+    "options": {...}}]}``. Items without a panel go to the first panel.
+    With ``loop`` the schedule repeats every ``loop`` seconds from its first
+    start.
+    """
+    playlist_id: str
+    items: List[PlaylistItem]
+    loop: Optional[float] = None
+    _starts: Dict[str, List[float]] = field(default_factory=dict, repr=False)
+    _by_panel: Dict[str, List[PlaylistItem]] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        self.items = sorted(self.items, key=lambda item: item.start)
+        for item in self.items:
+            self._by_panel.setdefault(item.panel, []).append(item)
+        self._starts = {panel: [item.start for item in items] for panel, items in self._by_panel.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], default_panel: str) -> "Playlist":
+        """
+        Raises:
+            ValueError: If an item has no valid image hash or start time, or the loop is too short
+        """
+        items = []
+        for entry in data.get("items", []):
+            image = str(entry.get("image", "")).lower()
+            if not is_sha256(image):
+                raise ValueError(f"Playlist item needs the sha256 of its image, got '{image}'")
+            options = tuple(sorted((str(key), str(value)) for key, value in entry.get("options", {}).items()))
+            items.append(PlaylistItem(image, parse_time(entry["start"]), entry.get("panel") or default_panel, options))
+        loop = data.get("loop")
+        if loop is not None:
+            loop = float(loop)
+            if items and loop <= max(item.start for item in items) - min(item.start for item in items):
+                raise ValueError(f"Playlist loop of {loop}s is shorter than its schedule")
+        return cls(str(data.get("id", "")), items, loop)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.playlist_id,
+            "loop": self.loop,
+            "items": [{"image": item.image, "start": item.start, "panel": item.panel,
+                       "options": item.option_dict} for item in self.items]
+        }
+
+    @property
+    def images(self) -> Set[str]:
+        return {item.image for item in self.items}
+
+    @property
+    def panels(self) -> List[str]:
+        return list(self._by_panel)
+
+    def current(self, panel: str, now: float) -> Tuple[Optional[PlaylistItem], Optional[float]]:
+        """
+        The item a panel should show at ``now``.
+
+        Returns:
+            tuple: The item and the start of its current occurrence, or (None, None) before the schedule
+        """
+        items = self._by_panel.get(panel)
+        if not items or not self.items:
+            return None, None
+        origin = self.items[0].start
+        offset = 0.0
+        if self.loop and now >= origin:
+            offset = (now - origin) // self.loop * self.loop
+        index = bisect.bisect_right(self._starts[panel], now - offset) - 1
+        if index >= 0:
+            return items[index], items[index].start + offset
+        if offset:
+            # Before the panel's first item of this cycle its last item of the previous one still shows
+            return items[-1], items[-1].start + offset - self.loop
+        return None, None
+
+    def occurrences(self, now: float, horizon: float) -> List[Tuple[float, PlaylistItem]]:
+        """Starts of all items within ``now`` and ``now + horizon``, in order."""
+        if not self.items:
+            return []
+        origin = self.items[0].start
+        offset = 0.0
+        if self.loop and now >= origin:
+            offset = (now - origin) // self.loop * self.loop
+        upcoming = []
+        while True:
+            upcoming.extend((item.start + offset, item) for item in self.items
+                            if now < item.start + offset <= now + horizon)
+            if not self.loop or origin + offset + self.loop > now + horizon:
+                break
+            offset += self.loop
+        return sorted(upcoming, key=lambda occurrence: occurrence[0])
+
+    def next_change(self, now: float) -> Optional[float]:
+        """Seconds until the next item starts on any panel, None if nothing follows."""
+        horizon = self.loop if self.loop else max(0.0, self.items[-1].start - now) if self.items else 0.0
+        upcoming = self.occurrences(now, horizon)
+        return upcoming[0][0] - now if upcoming else None
+
+
+class PlaylistStore:
+    """
+    Content-addressed local store of playlist images and pre-rendered frames.
+
+    Images are stored under their SHA-256 and verified on the way in;
+    frames are keyed by the image hash plus a digest of the render
+    signature, so a panel with different settings gets its own frame. The
+    current playlist is persisted next to them and content that no
+    playlist references any more is pruned.
+    """
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR):
+        """
+        Args:
+            store_dir (str): Directory holding the images, frames and the playlist
+        """
+        self.store_dir = store_dir
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(store_dir, IMAGES_DIR), exist_ok=True)
+        os.makedirs(os.path.join(store_dir, FRAMES_DIR), exist_ok=True)
+
+    def image_path(self, image: str) -> str:
+        return os.path.join(self.store_dir, IMAGES_DIR, image)
+
+    def has_image(self, image: str) -> bool:
+        return os.path.exists(self.image_path(image))
+
+    def missing_images(self, images: Set[str]) -> List[str]:
+        return sorted(image for image in images if not self.has_image(image))
+
+    def put_image(self, image: str, payload: bytes) -> bool:
+        """Store an image payload if it matches its hash; returns False otherwise."""
+        if hashlib.sha256(payload).hexdigest() != image:
+            logger.error(f"Checksum mismatch for playlist image {image}, discarding")
+            return False
+        path = self.image_path(image)
+        try:
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(payload)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.warning(f"Failed to store playlist image {image}: {e}")
+            return False
+        return True
+
+    def adopt_image(self, image: str, path: str) -> bool:
+        """Move an already verified file, e.g. a completed chunked transfer, into the store."""
+        try:
+            shutil.move(path, self.image_path(image))
+        except OSError as e:
+            logger.warning(f"Failed to store playlist image {image}: {e}")
+            return False
+        return True
+
+    def has_frame(self, image: str, signature: str) -> bool:
+        return os.path.exists(self._frame_path(image, signature))
+
+    def get_frame(self, image: str, signature: str,
+                  buffer_pool: Optional["FrameBufferPool"] = None) -> Optional["PanelFrame"]:
+        from panel_frame import PanelFrame
+        path = self._frame_path(image, signature)
+        try:
+            with open(path, "rb") as f:
+                return PanelFrame.from_bytes(f.read(), buffer_pool)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable playlist frame {path}: {e}")
+            self._remove_file(path)
+            return None
+
+    def put_frame(self, image: str, signature: str, frame: "PanelFrame") -> None:
+        path = self._frame_path(image, signature)
+        try:
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(frame.to_bytes())
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.warning(f"Failed to store playlist frame {path}: {e}")
+
+    def load_playlist(self, default_panel: str) -> Optional[Playlist]:
+        path = os.path.join(self.store_dir, PLAYLIST_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                return Playlist.from_dict(json.load(f), default_panel)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Failed to load stored playlist: {e}")
+            return None
+
+    def save_playlist(self, playlist: Playlist) -> None:
+        path = os.path.join(self.store_dir, PLAYLIST_FILE)
+        try:
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(playlist.as_dict(), f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.warning(f"Failed to persist playlist: {e}")
+
+    def prune(self, keep: Set[str]) -> int:
+        """Remove images and frames of every image not in ``keep``; returns the number of files removed."""
+        removed = 0
+        with self._lock:
+            for directory in (IMAGES_DIR, FRAMES_DIR):
+                for name in os.listdir(os.path.join(self.store_dir, directory)):
+                    if name.split(".", 1)[0] not in keep:
+                        self._remove_file(os.path.join(self.store_dir, directory, name))
+                        removed += 1
+        if removed:
+            logger.info(f"Pruned {removed} file(s) from the playlist store")
+        return removed
+
+    def _frame_path(self, image: str, signature: str) -> str:
+        from panel_frame import FRAME_SUFFIX
+        digest = hashlib.blake2b(signature.encode(), digest_size=SIGNATURE_DIGEST_SIZE).hexdigest()
+        return os.path.join(self.store_dir, FRAMES_DIR, f"{image}.{digest}{FRAME_SUFFIX}")
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class PlaylistPlayer:
+    """
+    Flips panels through the playlist on schedule from the local store.
+
+    Every panel is sent the item due at the current time; a background
+    thread sleeps until the next item starts. When ``can_prefetch`` allows
+    it (render queues idle, on external power) upcoming items are rendered
+    ahead into the store, one per wakeup, so a flip only loads a frame from
+    disk. Nothing here waits for the network.
+    """
+
+    def __init__(self, store: PlaylistStore, default_panel: str,
+                 show: Callable[[PlaylistItem, float], bool],
+                 prefetch: Callable[[PlaylistItem], bool],
+                 can_prefetch: Callable[[], bool],
+                 prefetch_horizon: float = DEFAULT_PREFETCH_HORIZON):
+        """
+        Args:
+            store (PlaylistStore): Images and frames of the playlist
+            default_panel (str): Panel of items that do not name one
+            show (Callable): Queues an item for display given its occurrence start;
+                returns False if it could not be queued
+            prefetch (Callable): Renders an item into the store; returns True if work was done
+            can_prefetch (Callable): Whether the frame is idle and may spend power on prefetching
+            prefetch_horizon (float): Seconds ahead for which items are rendered in advance
+        """
+        self.store = store
+        self.default_panel = default_panel
+        self.show = show
+        self.prefetch = prefetch
+        self.can_prefetch = can_prefetch
+        self.prefetch_horizon = prefetch_horizon
+        self.playlist = store.load_playlist(default_panel)
+        self.flips = 0
+        self.prefetched = 0
+        self._shown = {}
+        self._ready = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        if self.playlist:
+            logger.info(f"Loaded stored playlist '{self.playlist.playlist_id}' with {len(self.playlist.items)} item(s)")
+
+    def update(self, data: Dict[str, Any]) -> Playlist:
+        """
+        Replace the playlist, persist it and prune content it no longer uses.
+
+        The playlist topic is retained, so every reconnect delivers the same
+        playlist again; an unchanged playlist keeps the schedule state and
+        does not flip the panels back to the due item.
+
+        Raises:
+            ValueError: If the playlist is malformed
+        """
+        playlist = Playlist.from_dict(data, self.default_panel)
+        with self._lock:
+            previous, self.playlist = self.playlist, playlist
+            changed = previous is None or (previous.playlist_id, previous.items, previous.loop) != \
+                (playlist.playlist_id, playlist.items, playlist.loop)
+            if changed:
+                self._shown.clear()
+                self._ready.clear()
+        self.store.save_playlist(playlist)
+        if not changed:
+            logger.debug(f"Playlist '{playlist.playlist_id}' is unchanged")
+            return playlist
+        self.store.prune(playlist.images)
+        logger.info(f"Playlist '{playlist.playlist_id}' with {len(playlist.items)} item(s), "
+                    f"{len(self.missing_images())} image(s) missing")
+        self._wake.set()
+        return playlist
+
+    def image_added(self) -> None:
+        """Re-check the schedule, e.g. the due item's image just arrived."""
+        self._wake.set()
+
+    def missing_images(self) -> List[str]:
+        with self._lock:
+            playlist = self.playlist
+        return self.store.missing_images(playlist.images) if playlist else []
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="playlist", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            playlist = self.playlist
+        return {
+            'playlist_id': playlist.playlist_id if playlist else None,
+            'items': len(playlist.items) if playlist else 0,
+            'missing_images': len(self.missing_images()),
+            'flips': self.flips,
+            'prefetched': self.prefetched
+        }
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            timeout = self._tick(time.time())
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _tick(self, now: float) -> float:
+        """Show due items and prefetch one upcoming item; returns the seconds to sleep."""
+        with self._lock:
+            playlist = self.playlist
+        if not playlist:
+            return PLAYER_POLL_INTERVAL
+        for panel in playlist.panels:
+            item, started = playlist.current(panel, now)
+            if item is None or self._shown.get(panel) == (item, started) or not self.store.has_image(item.image):
+                continue
+            if self.show(item, started):
+                self._shown[panel] = (item, started)
+                self.flips += 1
+
+        timeout = playlist.next_change(now)
+        timeout = PLAYER_POLL_INTERVAL if timeout is None else min(timeout, PLAYER_POLL_INTERVAL)
+        if self._prefetch_next(playlist, now):
+            # More may be waiting; come back right away unless an item is due first
+            timeout = 0
+        return timeout
+
+    def _prefetch_next(self, playlist: Playlist, now: float) -> bool:
+        candidates = [item for item in (playlist.current(panel, now)[0] for panel in playlist.panels) if item]
+        candidates += [item for _, item in playlist.occurrences(now, self.prefetch_horizon)]
+        for item in candidates:
+            if item in self._ready or not self.store.has_image(item.image):
+                continue
+            if not self.can_prefetch():
+                return False
+            try:
+                rendered = self.prefetch(item)
+            except Exception as e:
+                logger.error(f"Failed to prefetch playlist image {item.image}: {e}")
+                rendered = False
+            self._ready.add(item)
+            if rendered:
+                self.prefetched += 1
+                return True
+        return False
@@ -1,37 +1,156 @@
+import hashlib
+import json
+import logging
+import os
+import threading
 import time
+from collections import OrderedDict
+from typing import BinaryIO, Optional, Union
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_SAVE_INTERVAL = 10  # seconds between writes of the persisted index while messages keep arriving
+HASH_READ_SIZE = 256 * 1024
+ID_PREFIX = "id:"
+HASH_PREFIX = "hash:"
+
+logger = logging.getLogger(__name__)
+
 
 class ProcessedMessageTracker:
-    def __init__(self, max_message_age=300):
-        self.processed_messages = {}
+    """
+    Bounded, time-ordered index of recently processed messages.
+
+    Messages are keyed on the publisher-supplied message id or, failing that,
+    a hash of the payload, so redeliveries after a reconnect are recognized.
+    A content hash only counts as processed while it is the latest entry, so
+    slideshows may show the same image again after another one. Entries are
+    kept in processing order, so expired message ids are popped from the
+    front. Message ids expire after ``max_message_age``; the latest entry,
+    the image on the panel, is kept regardless of its age.
+    The index can be persisted to a small JSON file so a retained image is
+    not replayed after a restart, however long the frame was off. Writes are
+    spaced ``save_interval`` seconds apart; ``flush`` writes pending changes
+    on shutdown.
+    """
+
+    def __init__(self, max_message_age=300, max_entries=DEFAULT_MAX_ENTRIES, persist_path=None,
+                 save_interval=DEFAULT_SAVE_INTERVAL):
+        self.processed_messages = OrderedDict()
         self.MAX_MESSAGE_AGE = max_message_age
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = None
+        self._save_timer = None
+        self._load()
 
-    def should_process_message(self, message_id, timestamp):
-        return not self.is_message_processed(message_id) and not self.is_message_expired(timestamp)
+    @staticmethod
+    def message_key(payload: Union[bytes, BinaryIO], message_id: Optional[str] = None) -> str:
+        """Key a message on its publisher id, or on its content if it has none."""
+        if message_id:
+            return f"{ID_PREFIX}{message_id}"
+        digest = hashlib.blake2b(digest_size=16)
+        if isinstance(payload, (bytes, bytearray)):
+            digest.update(payload)
+        else:
+            for block in iter(lambda: payload.read(HASH_READ_SIZE), b""):
+                digest.update(block)
+            payload.seek(0)
+        return f"{HASH_PREFIX}{digest.hexdigest()}"
 
-    def is_message_processed(self, message_id):
-        if message_id not in self.processed_messages:
-            return False
-        current_time = int(time.time())
-        timestamp, _ = self.processed_messages[message_id]
-        processed = current_time - timestamp <= self.MAX_MESSAGE_AGE
+    def is_message_processed(self, message_key):
+        with self._lock:
+            self._expire(int(time.time()))
+            if message_key.startswith(HASH_PREFIX):
+                processed = bool(self.processed_messages) and next(reversed(self.processed_messages)) == message_key
+            else:
+                processed = message_key in self.processed_messages
         if processed:
-            print("Ignoring message - already processed")
+            logger.info("Ignoring message - already processed")
         return processed
 
-    def mark_message_as_processed(self, message_id, timestamp):
-        self.processed_messages[message_id] = (timestamp, True)
+    def mark_message_as_processed(self, message_key, timestamp):
+        with self._lock:
+            # Only the latest content hash is ever matched, so a hash is dropped once superseded
+            latest = next(reversed(self.processed_messages), None)
+            if latest is not None and latest.startswith(HASH_PREFIX):
+                del self.processed_messages[latest]
+            self.processed_messages.pop(message_key, None)
+            self.processed_messages[message_key] = timestamp
+            while len(self.processed_messages) > self.max_entries:
+                self.processed_messages.popitem(last=False)
+            self._expire(int(time.time()))
+            self._dirty = True
+            self._schedule_save()
 
     def cleanup_processed_messages(self):
-        current_time = int(time.time())
-        expired_ids = [message_id for message_id, (timestamp, _) in self.processed_messages.items() if
-                       current_time - timestamp > self.MAX_MESSAGE_AGE]
-
-        for message_id in expired_ids:
-            del self.processed_messages[message_id]
-
-    def is_message_expired(self, timestamp):
-        current_time = int(time.time())
-        expired = current_time - timestamp > self.MAX_MESSAGE_AGE
-        if expired:
-            print("Ignoring message - too old")
-        return expired
+        with self._lock:
+            self._expire(int(time.time()))
+            self._save()
+
+    def flush(self):
+        """Write pending changes of the persisted index now, e.g. on shutdown."""
+        with self._lock:
+            if self._save_timer:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self._dirty:
+                self._save()
+
+    def _expire(self, current_time):
+        # Entries are in processing order, so the expired ones are at the front; the latest always stays
+        while len(self.processed_messages) > 1:
+            message_key, timestamp = next(iter(self.processed_messages.items()))
+            if current_time - timestamp <= self.MAX_MESSAGE_AGE:
+                break
+            self.processed_messages.popitem(last=False)
+
+    def _schedule_save(self):
+        if not self.persist_path or self._save_timer:
+            return
+        wait = 0 if self._saved_at is None else self._saved_at + self.save_interval - time.monotonic()
+        if wait <= 0:
+            self._save()
+            return
+        self._save_timer = threading.Timer(wait, self._save_pending)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def _save_pending(self):
+        with self._lock:
+            self._save_timer = None
+            if self._dirty:
+                self._save()
+
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r") as f:
+                entries = json.load(f)
+            entries = sorted(entries.items(), key=lambda item: item[1])
+            for index, (message_key, timestamp) in enumerate(entries):
+                if index == len(entries) - 1 or not message_key.startswith(HASH_PREFIX):
+                    self.processed_messages[message_key] = int(timestamp)
+            self._expire(int(time.time()))
+            logger.info(f"Loaded {len(self.processed_messages)} processed message(s)")
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Failed to load processed messages: {e}")
+
+    def _save(self):
+        if not self.persist_path:
+            return
+        tmp_path = f"{self.persist_path}.tmp"
+        try:
+            directory = os.path.dirname(self.persist_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(self.processed_messages, f)
+            os.replace(tmp_path, self.persist_path)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        except OSError as e:
+            logger.warning(f"Failed to persist processed messages: {e}")
@@ -0,0 +1,101 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Constants
+DEFAULT_INITIAL_DELAY = 1.0
+DEFAULT_MAX_DELAY = 300.0
+DEFAULT_MULTIPLIER = 2.0
+DEFAULT_JITTER = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+class ReconnectPolicy:
+    """
+    Exponential backoff with jitter for broker reconnects.
+
+    Each failed attempt multiplies the base delay up to ``max_delay``; the
+    actual delay is randomly shortened by up to ``jitter`` of the base so a
+    fleet of frames does not reconnect in lockstep after an outage. The
+    policy also keeps connection-quality counters.
+    """
+
+    def __init__(self, initial_delay: float = DEFAULT_INITIAL_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY,
+                 multiplier: float = DEFAULT_MULTIPLIER,
+                 jitter: float = DEFAULT_JITTER,
+                 rng: Optional[random.Random] = None):
+        """
+        Args:
+            initial_delay (float): Base delay before the first reconnect attempt
+            max_delay (float): Upper bound of the base delay
+            multiplier (float): Growth factor of the base delay per attempt
+            jitter (float): Fraction (0-1) of the base delay that is randomized away
+            rng (random.Random): Random source, mainly for reproducible runs
+        """
+        if not 0 <= jitter <= 1:
+            raise ValueError(f"jitter must be between 0 and 1, got {jitter}")
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self.attempts = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.failed_attempts = 0
+        self.last_delay = 0.0
+        self.last_disconnect_rc = None
+        self._connected_since = None
+        self._connected_seconds = 0.0
+        self._started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def next_delay(self) -> float:
+        """Delay before the next reconnect attempt; advances the backoff."""
+        with self._lock:
+            base = min(self.max_delay, self.initial_delay * self.multiplier ** self.attempts)
+            self.attempts += 1
+            self.last_delay = base * (1 - self.jitter * self.rng.random())
+            return self.last_delay
+
+    def record_connected(self) -> None:
+        """A connection was acknowledged by the broker; reset the backoff."""
+        with self._lock:
+            self.attempts = 0
+            self.connects += 1
+            self._connected_since = time.monotonic()
+
+    def record_disconnected(self, rc: int) -> None:
+        with self._lock:
+            self.disconnects += 1
+            self.last_disconnect_rc = rc
+            if self._connected_since is not None:
+                self._connected_seconds += time.monotonic() - self._connected_since
+                self._connected_since = None
+
+    def record_failure(self, error: Exception) -> None:
+        with self._lock:
+            self.failed_attempts += 1
+        logger.warning(f"Reconnect attempt failed: {error}")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Connection-quality counters for status reporting."""
+        with self._lock:
+            now = time.monotonic()
+            connected_seconds = self._connected_seconds
+            if self._connected_since is not None:
+                connected_seconds += now - self._connected_since
+            elapsed = now - self._started_at
+            return {
+                'connects': self.connects,
+                'disconnects': self.disconnects,
+                'failed_attempts': self.failed_attempts,
+                'backoff_attempts': self.attempts,
+                'last_delay': round(self.last_delay, 2),
+                'last_disconnect_rc': self.last_disconnect_rc,
+                'uptime_ratio': round(connected_seconds / elapsed, 4) if elapsed > 0 else 0.0
+            }
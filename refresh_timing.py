@@ -0,0 +1,56 @@
+import threading
+from typing import Dict, Mapping, Optional
+
+# Constants
+# Busy time of a refresh per IT8951 waveform mode at room temperature, from the controller's waveform tables
+REFRESH_SECONDS = {
+    'INIT': 1.6,
+    'GC16': 0.45,
+    'GL16': 0.45,
+    'DU': 0.26,
+    'A2': 0.12
+}
+DEFAULT_MODE = 'GC16'
+SMOOTHING = 0.2  # weight of a new busy-pin measurement in the running estimate
+
+
+class RefreshTimeModel:
+    """
+    Expected refresh time per waveform mode.
+
+    Starts from the nominal waveform durations and follows the refresh
+    times measured on the busy pin, which drift with panel temperature and
+    size. Drivers without a busy pin (the mock EPD) wait out the estimate
+    instead, so a frame is only reported complete once the panel would be
+    idle.
+    """
+
+    def __init__(self, defaults: Optional[Mapping[str, float]] = None, smoothing: float = SMOOTHING):
+        """
+        Args:
+            defaults (Mapping[str, float]): Seconds per mode before any measurement
+            smoothing (float): Weight of a new measurement in the running estimate
+        """
+        self.smoothing = smoothing
+        self._estimates = dict(defaults or REFRESH_SECONDS)
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def expected(self, mode: str) -> float:
+        """Estimated seconds until the panel is idle after a refresh in ``mode`` was started."""
+        with self._lock:
+            return self._estimates.get(mode, self._estimates.get(DEFAULT_MODE, REFRESH_SECONDS[DEFAULT_MODE]))
+
+    def record(self, mode: str, seconds: float) -> None:
+        """Calibrate the estimate of a mode with a refresh time measured on the busy pin."""
+        with self._lock:
+            samples = self._samples.get(mode, 0)
+            if samples:
+                seconds = (1 - self.smoothing) * self._estimates[mode] + self.smoothing * seconds
+            self._estimates[mode] = seconds
+            self._samples[mode] = samples + 1
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {mode: {'seconds': round(seconds, 3), 'samples': self._samples.get(mode, 0)}
+                    for mode, seconds in self._estimates.items()}
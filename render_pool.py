@@ -0,0 +1,262 @@
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import resource
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, Optional, Tuple, Union
+import numpy as np
+from frame_buffers import FrameBufferPool
+from geometry import GeometryProcessor, GeometrySettings
+from gray16_processor import Gray16Processor, ToneSettings
+from image_decoder import ImageDecoder
+from panel_frame import PanelFrame
+
+# Constants
+DEFAULT_WORKERS = 0  # one worker per core
+DEFAULT_MEMORY_LIMIT = 512 * 1024 * 1024  # address space of a worker in bytes; 0 disables the limit
+DEFAULT_TIMEOUT = 60  # seconds a render may take before its worker is killed; 0 waits forever
+RETRIES_AFTER_CRASH = 1  # renders lost with a crashed worker are retried once on fresh workers
+# Worker processes are started from a clean server process rather than forked
+# from the client, which runs MQTT, timer and render threads
+START_METHOD = "forkserver"
+
+logger = logging.getLogger(__name__)
+
+_worker_buffers = None  # reused render buffers of a worker process
+
+
+class RenderWorkerError(RuntimeError):
+    """A worker process crashed or hung while rendering; the pool was restarted."""
+
+
+@dataclass(frozen=True)
+class RenderRequest:
+    """Everything a worker process needs to turn a payload into a frame for one panel."""
+    width: int
+    height: int
+    max_image_pixels: int
+    max_payload_bytes: int
+    geometry: GeometrySettings
+    tone: ToneSettings
+
+
+def render_payload(payload: Union[bytes, str], request: RenderRequest,
+                   buffer_pool: Optional[FrameBufferPool] = None) -> Tuple[PanelFrame, Dict[str, Tuple[float, float]]]:
+    """
+    Decode and render a payload in a worker process.
+
+    Runs the same steps as ImageDecoder.decode followed by
+    EInkScreen.render_frame.
+
+    Args:
+        payload (bytes | str): Encoded image data or the path of a spooled payload
+        request (RenderRequest): Panel size, decoder limits and resolved render settings
+        buffer_pool (FrameBufferPool): Source of the frame's level buffer
+
+    Returns:
+        tuple: The frame and the (wall, CPU) seconds of the decode and render stages
+    """
+    decoder = ImageDecoder(request.width, request.height,
+                           max_image_pixels=request.max_image_pixels,
+                           max_payload_bytes=request.max_payload_bytes)
+    timings = {}
+    start, cpu_start = time.monotonic(), time.process_time()
+    if isinstance(payload, str):
+        with open(payload, "rb") as f:
+            image = decoder.decode(f, request.geometry)
+    else:
+        image = decoder.decode(payload, request.geometry)
+    timings["decode"] = (time.monotonic() - start, time.process_time() - cpu_start)
+
+    start, cpu_start = time.monotonic(), time.process_time()
+    image = GeometryProcessor(request.width, request.height, request.geometry).process(image)
+    frame = Gray16Processor(request.tone, buffer_pool).process(image)
+    timings["render"] = (time.monotonic() - start, time.process_time() - cpu_start)
+    return frame, timings
+
+
+def _init_worker(memory_limit: int) -> None:
+    global _worker_buffers
+    if memory_limit:
+        # An oversized or malicious image then fails with MemoryError instead of swapping the Pi to death
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    _worker_buffers = FrameBufferPool()
+
+
+def render_to_shared_memory(payload: Union[bytes, str], request: RenderRequest,
+                            block_name: str) -> Tuple[Tuple[int, int], Dict[str, Tuple[float, float]]]:
+    """
+    Render a payload and write the frame's gray levels into a shared memory block.
+
+    Returns:
+        tuple: Shape of the levels written and the stage timings of ``render_payload``
+    """
+    frame, timings = render_payload(payload, request, _worker_buffers)
+    block = SharedMemory(name=block_name)
+    try:
+        if frame.levels.nbytes > block.size:
+            raise ValueError(f"Frame of {frame.levels.nbytes} bytes does not fit the {block.size} byte block")
+        view = np.ndarray(frame.levels.shape, dtype=np.uint8, buffer=block.buf)
+        np.copyto(view, frame.levels)
+        del view
+        return frame.levels.shape, timings
+    finally:
+        block.close()
+        frame.release()
+
+
+class SharedFrameBuffers:
+    """
+    Shared memory blocks the workers write rendered frames into.
+
+    A frame then crosses the process boundary as one copy instead of being
+    pickled through the pool's pipe. Blocks are reused across renders and
+    unlinked by ``close``.
+    """
+
+    def __init__(self):
+        self._blocks = []
+        self._free = []
+        self._lock = threading.Lock()
+
+    def acquire(self, size: int) -> SharedMemory:
+        with self._lock:
+            for block in self._free:
+                if block.size >= size:
+                    self._free.remove(block)
+                    return block
+        block = SharedMemory(create=True, size=size)
+        with self._lock:
+            self._blocks.append(block)
+        return block
+
+    def release(self, block: SharedMemory) -> None:
+        with self._lock:
+            self._free.append(block)
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(block.size for block in self._blocks)
+
+    def close(self) -> None:
+        with self._lock:
+            blocks, self._blocks, self._free = self._blocks, [], []
+        for block in blocks:
+            try:
+                block.close()
+                block.unlink()
+            except (OSError, BufferError) as e:
+                logger.debug(f"Failed to release shared memory block {block.name}: {e}")
+
+
+class RenderPool:
+    """
+    Supervised worker processes shared by all panels for decoding and rendering.
+
+    Decoding and dithering are CPU bound and hold the GIL for much of their
+    time, which would starve the MQTT keepalives and serialize several
+    panels on one core. The pool runs them in separate processes, one per
+    core by default, with their address space limited. Rendered frames
+    come back through shared memory.
+
+    A worker that crashes on a malformed image or hangs past the timeout
+    takes only its render down: the pool is restarted, renders lost with it
+    are retried once and the failing one raises RenderWorkerError.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, memory_limit: int = DEFAULT_MEMORY_LIMIT,
+                 timeout: float = DEFAULT_TIMEOUT, buffer_pool: Optional[FrameBufferPool] = None):
+        """
+        Args:
+            workers (int): Number of worker processes; 0 uses one per core
+            memory_limit (int): Address space limit of a worker in bytes; 0 disables it
+            timeout (float): Seconds a render may take before its worker is killed; 0 waits forever
+            buffer_pool (FrameBufferPool): Source of the level buffers of returned frames
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.memory_limit = memory_limit
+        self.timeout = timeout
+        self.buffer_pool = buffer_pool or FrameBufferPool()
+        self.crashes = 0
+        self.timeouts = 0
+        self._blocks = SharedFrameBuffers()
+        self._lock = threading.Lock()
+        self._executor = self._start_executor()
+        logger.info(f"Render pool started with {self.workers} worker process(es)")
+
+    def render(self, payload: Union[bytes, str], request: RenderRequest) -> Tuple[PanelFrame, Dict[str, Tuple[float, float]]]:
+        """
+        Render a payload on the pool and wait for the frame; see ``render_payload``.
+
+        Raises:
+            RenderWorkerError: If the worker crashed on the payload or exceeded the timeout
+        """
+        block = self._blocks.acquire(request.width * request.height)
+        try:
+            for attempt in range(RETRIES_AFTER_CRASH + 1):
+                executor = self._executor
+                try:
+                    # A worker that died while the pool was idle breaks the executor before the submit
+                    future = executor.submit(render_to_shared_memory, payload, request, block.name)
+                    shape, timings = future.result(timeout=self.timeout or None)
+                    break
+                except BrokenProcessPool:
+                    self._restart(executor, hung=False)
+                    if attempt == RETRIES_AFTER_CRASH:
+                        raise RenderWorkerError("Render worker crashed on the payload")
+                    logger.warning("Render worker crashed, retrying on a fresh worker")
+                except concurrent.futures.TimeoutError:
+                    self._restart(executor, hung=True)
+                    raise RenderWorkerError(f"Rendering took longer than {self.timeout}s")
+            levels = self.buffer_pool.acquire(shape)
+            np.copyto(levels, np.ndarray(shape, dtype=np.uint8, buffer=block.buf))
+            return PanelFrame(levels, self.buffer_pool), timings
+        finally:
+            self._blocks.release(block)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'crashes': self.crashes,
+            'timeouts': self.timeouts,
+            'memory_limit': self.memory_limit,
+            'shared_bytes': self._blocks.total_bytes
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            executor = self._executor
+        executor.shutdown(wait=False, cancel_futures=True)
+        self._blocks.close()
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(max_workers=self.workers,
+                                       mp_context=multiprocessing.get_context(START_METHOD),
+                                       initializer=_init_worker, initargs=(self.memory_limit,))
+        # Start a worker now so the first frame does not wait for its imports
+        executor.submit(os.getpid)
+        return executor
+
+    def _restart(self, executor: ProcessPoolExecutor, hung: bool) -> None:
+        """Replace a broken or hung executor; renders that saw the same failure find it replaced already."""
+        with self._lock:
+            if executor is not self._executor:
+                return
+            if hung:
+                self.timeouts += 1
+            else:
+                self.crashes += 1
+            self._executor = self._start_executor()
+        logger.warning(f"Render worker {'hung' if hung else 'crashed'}, restarted the render pool")
+        # Shutting down does not stop a worker stuck in a render, so its processes are killed;
+        # renders of other panels on them fail as crashed and are retried
+        for process in list((getattr(executor, '_processes', None) or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
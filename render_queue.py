@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+# Constants
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+DEFAULT_MAX_DEPTH = 4
+DEFAULT_DROP_POLICY = DROP_OLDEST
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RenderJob:
+    """A single image payload waiting to be rendered."""
+    topic: str
+    payload: bytes
+    received_at: int
+    options: Dict[str, str] = field(default_factory=dict)
+    payload_path: Optional[str] = None
+    message_key: Optional[str] = None
+    # SHA-256 of a payload kept in the playlist store: its file stays and its pre-rendered frames are reused
+    content_id: Optional[str] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class RenderQueue:
+    """
+    Bounded, coalescing queue feeding a panel's render worker.
+
+    Only the newest job per topic is kept ("latest wins"), so a burst of
+    retained or queued messages never holds more than one payload per topic
+    in memory. When more distinct topics are pending than ``max_depth``,
+    the drop policy decides whether the oldest pending job or the incoming
+    one is discarded.
+    """
+
+    def __init__(self, max_depth: int = DEFAULT_MAX_DEPTH, drop_policy: str = DEFAULT_DROP_POLICY,
+                 on_drop: Optional[Callable[[RenderJob], None]] = None,
+                 on_put: Optional[Callable[[RenderJob], None]] = None):
+        """
+        Args:
+            max_depth (int): Maximum number of pending jobs (distinct topics)
+            drop_policy (str): Either ``drop_oldest`` or ``drop_newest``
+            on_drop (Callable): Called with every job that is coalesced away or dropped
+            on_put (Callable): Called with every accepted job, from the thread that queued it
+        """
+        if max_depth < 1:
+            raise ValueError(f"max_depth must be at least 1, got {max_depth}")
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy '{drop_policy}', expected one of {DROP_POLICIES}")
+        self.max_depth = max_depth
+        self.drop_policy = drop_policy
+        self.on_drop = on_drop
+        self.on_put = on_put
+        self._pending = OrderedDict()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._unfinished = 0
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def put(self, job: RenderJob) -> bool:
+        """
+        Queue a job, replacing any pending job for the same topic.
+
+        Returns:
+            bool: False if the job was rejected by the drop policy or the queue is closed
+        """
+        discarded = None
+        accepted = True
+        with self._condition:
+            if self._closed:
+                discarded, accepted = job, False
+            elif job.topic in self._pending:
+                discarded = self._pending.pop(job.topic)
+                self._unfinished -= 1
+                self.coalesced += 1
+                logger.debug(f"Coalesced pending job for topic {job.topic}")
+            elif len(self._pending) >= self.max_depth:
+                self.dropped += 1
+                if self.drop_policy == DROP_NEWEST:
+                    logger.warning(f"Render queue full, dropping incoming job for topic {job.topic}")
+                    discarded, accepted = job, False
+                else:
+                    _, discarded = self._pending.popitem(last=False)
+                    self._unfinished -= 1
+                    logger.warning(f"Render queue full, dropping oldest job for topic {discarded.topic}")
+            if accepted:
+                self._pending[job.topic] = job
+                self._unfinished += 1
+                self.enqueued += 1
+                self._condition.notify()
+        if discarded is not None and self.on_drop:
+            self.on_drop(discarded)
+        if accepted and self.on_put:
+            self.on_put(job)
+        return accepted
+
+    def get(self, timeout: Optional[float] = None) -> Optional[RenderJob]:
+        """
+        Wait for the next job in arrival order; a timeout of 0 never blocks.
+
+        Returns:
+            Optional[RenderJob]: The job, or None on timeout or once the queue is closed
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._pending or self._closed, timeout):
+                return None
+            if not self._pending:
+                return None
+            _, job = self._pending.popitem(last=False)
+            return job
+
+    def task_done(self) -> None:
+        """Mark a job returned by get() as fully processed."""
+        with self._condition:
+            self._unfinished = max(0, self._unfinished - 1)
+            self._condition.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued job has been processed.
+
+        Returns:
+            bool: True if nothing is pending or in progress
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._unfinished == 0, timeout)
+
+    def close(self) -> None:
+        """Discard pending jobs and wake up any waiting worker."""
+        with self._condition:
+            self._closed = True
+            discarded = list(self._pending.values())
+            self._pending.clear()
+            self._unfinished = 0
+            self._condition.notify_all()
+        if self.on_drop:
+            for job in discarded:
+                self.on_drop(job)
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._pending)
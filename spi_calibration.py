@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, Optional, Sequence
+
+# Constants
+# Candidate clocks, fastest first; the IT8951 accepts up to 24MHz on short wiring
+SPI_CLOCKS_HZ = (24000000, 20000000, 16000000, 12000000, 8000000, 4000000, 2000000)
+FALLBACK_SPI_HZ = 2000000  # the omni-epd.ini default, reliable on long cables
+DEFAULT_ROUNDS = 64  # register write/readback pairs a clock has to pass
+DEFAULT_STORE_PATH = "cache/spi_calibration.json"
+CALIBRATION_SEGMENT = "calibrate_spi"
+RESULT_SEGMENT = "result"
+# IT8951 LISAR (load image start address) register; it is rewritten before every image load
+PROBE_REGISTER = 0x0208
+SPIDEV_BUFSIZ_PATH = "/sys/module/spidev/parameters/bufsiz"
+SPIDEV_DEFAULT_BUFSIZ = 4096
+COMMUNICATION_ERROR_TEXT = "communication with device failed"
+
+logger = logging.getLogger(__name__)
+
+
+class SpiProbeError(RuntimeError):
+    """A value read back from the controller differs from the one written."""
+
+
+def is_communication_error(error: BaseException) -> bool:
+    """Whether an exception from the driver points at unreliable SPI communication."""
+    if isinstance(error, (SpiProbeError, TimeoutError, OSError)):
+        return True
+    return isinstance(error, RuntimeError) and COMMUNICATION_ERROR_TEXT in str(error)
+
+
+def slower_clock(spi_hz: int, clocks: Sequence[int] = SPI_CLOCKS_HZ) -> Optional[int]:
+    """The next candidate clock below ``spi_hz``, or None if it is already the slowest."""
+    slower = [clock for clock in clocks if clock < spi_hz]
+    return max(slower) if slower else None
+
+
+def spidev_chunk_bytes() -> Optional[int]:
+    """Largest single SPI transfer of the spidev driver, which splits every frame transfer into chunks."""
+    try:
+        with open(SPIDEV_BUFSIZ_PATH, "r") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def probe_controller(epd, rounds: int = DEFAULT_ROUNDS) -> Optional[float]:
+    """
+    Check SPI integrity by writing random values to a controller register and reading them back.
+
+    The register's value is restored afterwards. Drivers without register
+    access (mocks, the file backend) cannot be probed.
+
+    Args:
+        epd: Prepared display driver
+        rounds (int): Write/readback pairs to run
+
+    Returns:
+        float: Seconds per write/readback pair, or None if the driver cannot be probed
+
+    Raises:
+        SpiProbeError: If a value read back differs from the one written
+    """
+    controller = getattr(getattr(epd, '_device', None), 'epd', None)
+    if not (hasattr(controller, 'read_register') and hasattr(controller, 'write_register')):
+        return None
+    original = controller.read_register(PROBE_REGISTER)
+    start = time.monotonic()
+    try:
+        for _ in range(rounds):
+            value = random.getrandbits(16)
+            controller.write_register(PROBE_REGISTER, value)
+            readback = controller.read_register(PROBE_REGISTER)
+            if readback != value:
+                raise SpiProbeError(f"Wrote 0x{value:04x} but read back 0x{readback:04x}")
+    finally:
+        controller.write_register(PROBE_REGISTER, original)
+    return (time.monotonic() - start) / rounds
+
+
+@dataclass
+class CalibrationResult:
+    """Outcome of one calibration run of a panel."""
+    spi_hz: int
+    verified: bool
+    calibrated_at: int = field(default_factory=lambda: int(time.time()))
+    chunk_bytes: Optional[int] = None
+    clocks: Dict[str, str] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def calibrate(probe_at: Callable[[int], Optional[float]], clocks: Sequence[int] = SPI_CLOCKS_HZ,
+              fallback_hz: int = FALLBACK_SPI_HZ) -> CalibrationResult:
+    """
+    Find the fastest SPI clock that passes the readback probe.
+
+    Clocks are tried from the fastest down and the first one whose probe
+    passes wins. If the driver cannot be probed the calibration stops at
+    the first clock and reports it unverified.
+
+    Args:
+        probe_at (Callable): Switches the driver to a clock and runs ``probe_controller``
+        clocks (Sequence[int]): Candidate clocks
+        fallback_hz (int): Clock used when no candidate passes
+
+    Returns:
+        CalibrationResult: Chosen clock and the outcome per tried clock
+    """
+    result = CalibrationResult(spi_hz=fallback_hz, verified=False, chunk_bytes=spidev_chunk_bytes())
+    for spi_hz in sorted(clocks, reverse=True):
+        try:
+            seconds = probe_at(spi_hz)
+        except Exception as e:
+            logger.info(f"SPI clock {spi_hz} Hz failed the probe: {e}")
+            result.clocks[str(spi_hz)] = f"failed: {e}"
+            continue
+        if seconds is None:
+            logger.info("Display driver has no register readback, SPI clock left unverified")
+            result.clocks[str(spi_hz)] = "unverified"
+            result.spi_hz = spi_hz
+            return result
+        result.clocks[str(spi_hz)] = f"ok, {seconds * 1e6:.0f} us per readback"
+        result.spi_hz = spi_hz
+        result.verified = True
+        break
+    else:
+        logger.warning(f"No SPI clock passed the probe, falling back to {fallback_hz} Hz")
+    if result.chunk_bytes == SPIDEV_DEFAULT_BUFSIZ:
+        logger.info("spidev transfers are split into 4 KiB chunks; spidev.bufsiz=65536 on the kernel "
+                    "command line cuts the per-chunk overhead of frame transfers")
+    return result
+
+
+class SpiClockStore:
+    """
+    Calibrated SPI clocks per panel, persisted across restarts.
+
+    Entries are keyed by panel name and wiring (bus and chip select), so
+    rewiring a panel calibrates it again. Clocks lowered after communication
+    failures are stored too and survive a reboot.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        """
+        Args:
+            path (str): JSON file holding the calibration results
+        """
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def key(name: str, spi_bus: int, spi_device: int) -> str:
+        return f"{name}@{spi_bus}.{spi_device}"
+
+    def spi_hz(self, key: str) -> Optional[int]:
+        """The stored clock of a panel, None if it was never calibrated."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry["spi_hz"] if entry else None
+
+    def put(self, key: str, result: CalibrationResult) -> None:
+        with self._lock:
+            self._entries[key] = {**result.as_dict(), "fallbacks": 0}
+            self._save()
+
+    def record_fallback(self, key: str, spi_hz: int, error: str) -> None:
+        """Store a clock lowered after a communication failure."""
+        with self._lock:
+            entry = self._entries.setdefault(key, {})
+            entry.update({
+                "spi_hz": spi_hz,
+                "verified": False,
+                "fallbacks": entry.get("fallbacks", 0) + 1,
+                "last_fallback": {"at": int(time.time()), "error": error}
+            })
+            self._save()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {key: {"spi_hz": entry["spi_hz"], "verified": entry.get("verified", False),
+                          "fallbacks": entry.get("fallbacks", 0)}
+                    for key, entry in self._entries.items()}
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+            self._entries = {key: entry for key, entry in entries.items() if int(entry["spi_hz"]) > 0}
+            logger.info(f"Loaded SPI calibration of {len(self._entries)} panel(s)")
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"Failed to load SPI calibration: {e}")
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to persist SPI calibration: {e}")
@@ -0,0 +1,210 @@
+import json
+import logging
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Constants
+STATUS_ROOT = "data"
+STATUS_POWER = "powerInput"
+POWER_PRESENT = "PRESENT"
+DEFAULT_IP = '127.0.0.1'
+IP_CHECK_ADDRESS = ('10.254.254.254', 1)
+DEFAULT_BATTERY_INTERVAL = 60
+DEFAULT_PUBLISH_INTERVAL = 300
+DEFAULT_IP_TTL = 300
+DELTA_FIELDS = ('wired', 'battery')
+
+logger = logging.getLogger(__name__)
+
+
+class CachedValue:
+    """A value that is recomputed by its loader once its TTL has passed."""
+
+    def __init__(self, loader: Callable[[], Any], ttl: Optional[float]):
+        """
+        Args:
+            loader (Callable): Produces a fresh value
+            ttl (float): Seconds a value stays valid, None to keep it forever
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self._value = None
+        self._expires_at = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        with self._lock:
+            now = time.monotonic()
+            if self._expires_at is None or (self.ttl is not None and now >= self._expires_at):
+                self._value = self.loader()
+                self._expires_at = now + (self.ttl or 0)
+            return self._value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._expires_at = None
+
+
+class TelemetrySampler:
+    """
+    Samples device status in the background and serves it from a cache.
+
+    Battery state is read from the shared PiJuice handle on a fixed schedule
+    instead of on every publish, hostname and IP address are cached with
+    TTLs, and status payloads are built from the cache without touching the
+    I2C bus. A full payload is published periodically; changes of the
+    battery fields in between are published as delta-only updates.
+    """
+
+    def __init__(self, device_id: str, pijuice=None,
+                 battery_interval: float = DEFAULT_BATTERY_INTERVAL,
+                 publish_interval: float = DEFAULT_PUBLISH_INTERVAL,
+                 ip_ttl: float = DEFAULT_IP_TTL):
+        """
+        Args:
+            device_id (str): Device identifier reported as 'mac'
+            pijuice: Initialized PiJuice handle, or None if unavailable
+            battery_interval (float): Seconds between battery samples
+            publish_interval (float): Seconds between periodic full status publishes
+            ip_ttl (float): Seconds the IP address is cached
+        """
+        self.device_id = device_id
+        self.pijuice = pijuice
+        self.battery_interval = battery_interval
+        self.publish_interval = publish_interval
+        self.hostname = CachedValue(socket.gethostname, None)
+        self.ip_address = CachedValue(self._get_ip, ip_ttl)
+        self._power_status = None
+        self._charge_level = None
+        self._status = 'online'
+        self._last_published = {}
+        self._publish = None
+        self._publish_delta = None
+        self._sources = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, publish: Callable[[str], None], publish_delta: Callable[[str], None]) -> None:
+        """
+        Start background sampling.
+
+        Args:
+            publish (Callable): Publishes a full status payload
+            publish_delta (Callable): Publishes a payload with only the changed fields
+        """
+        self._publish = publish
+        self._publish_delta = publish_delta
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def register_source(self, name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+        """
+        Add a section to the full status payload.
+
+        Args:
+            name (str): Key of the section
+            provider (Callable): Returns the section; must be cheap and non-blocking
+        """
+        self._sources[name] = provider
+
+    def status(self, status: str) -> Dict[str, Any]:
+        """Current status from the cache; never blocks on hardware."""
+        with self._lock:
+            power_status, charge_level = self._power_status, self._charge_level
+        payload = {
+            "hostname": self.hostname.get(),
+            "ip_address": self.ip_address.get(),
+            "mac": self.device_id,
+            'status': status,
+            'wired': power_status == POWER_PRESENT,
+            'battery': charge_level,
+        }
+        for name, provider in self._sources.items():
+            try:
+                payload[name] = provider()
+            except Exception as e:
+                logger.warning(f"Failed to collect telemetry section {name}: {e}")
+        return payload
+
+    def status_payload(self, status: str) -> str:
+        """Full status payload, remembered as the last published state."""
+        with self._lock:
+            self._status = status
+        payload = self.status(status)
+        self._last_published = payload
+        return json.dumps(payload, separators=(',', ':'))
+
+    def is_wired(self) -> Optional[bool]:
+        """Whether external power is present, None if unknown."""
+        with self._lock:
+            if self._power_status is None:
+                return None
+            return self._power_status == POWER_PRESENT
+
+    def sample_battery(self) -> Tuple[Optional[str], Optional[int]]:
+        """Read power input and charge level from the PiJuice once."""
+        if not self.pijuice:
+            return None, None
+        try:
+            power_status = self.pijuice.status.GetStatus()[STATUS_ROOT][STATUS_POWER]
+            charge_level = self.pijuice.status.GetChargeLevel()['data']
+            logger.debug(f'Status: {power_status}, Level: {charge_level}')
+        except Exception as e:
+            logger.error(f'Error reading PiJuice status: {e}')
+            return None, None
+        with self._lock:
+            self._power_status, self._charge_level = power_status, charge_level
+        return power_status, charge_level
+
+    def _run(self) -> None:
+        next_publish = time.monotonic() + self.publish_interval
+        while not self._stop_event.is_set():
+            self.sample_battery()
+            now = time.monotonic()
+            if now >= next_publish:
+                self._emit(self._publish, self.status_payload(self._status))
+                next_publish = now + self.publish_interval
+            else:
+                self._publish_changes()
+            self._stop_event.wait(min(self.battery_interval, max(0.0, next_publish - now)))
+
+    def _publish_changes(self) -> None:
+        if not self._last_published:
+            return
+        current = self.status(self._status)
+        delta = {key: current[key] for key in DELTA_FIELDS if current[key] != self._last_published.get(key)}
+        if delta:
+            self._last_published = {**self._last_published, **delta}
+            self._emit(self._publish_delta, json.dumps(delta, separators=(',', ':')))
+
+    @staticmethod
+    def _emit(publish: Optional[Callable[[str], None]], payload: str) -> None:
+        if not publish:
+            return
+        try:
+            publish(payload)
+        except Exception as e:
+            logger.warning(f"Failed to publish telemetry: {e}")
+
+    @staticmethod
+    def _get_ip() -> str:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.settimeout(0)
+            try:
+                s.connect(IP_CHECK_ADDRESS)
+                return s.getsockname()[0]
+            except Exception as e:
+                logger.warning(f"Failed to get IP: {e}")
+                return DEFAULT_IP
@@ -0,0 +1,64 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from benchmark import offline_client
+from chunked_transfer import ChunkAssembler
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
+PAYLOAD = bytes(range(256)) * 40
+CHUNK_SIZE = 4096
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = offline_client(CONFIG_PATH, chunked_transfer={"enabled": True, "spool_dir": str(tmp_path / "spool")})
+    yield client
+    client._close_display()
+
+
+def chunk_messages(client, transfer_id="t1"):
+    prefix = client.config["topic_image_chunks"] + transfer_id
+    manifest = {"size": len(PAYLOAD), "chunk_size": CHUNK_SIZE, "chunks": -(-len(PAYLOAD) // CHUNK_SIZE),
+                "sha256": hashlib.sha256(PAYLOAD).hexdigest()}
+    messages = [SimpleNamespace(topic=f"{prefix}/manifest", payload=json.dumps(manifest).encode())]
+    for index in range(manifest["chunks"]):
+        messages.append(SimpleNamespace(topic=f"{prefix}/{index}",
+                                        payload=PAYLOAD[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]))
+    return messages
+
+
+def test_completed_transfer_is_verified_off_the_loop(client, monkeypatch):
+    hashed_on = []
+    file_sha256 = ChunkAssembler._file_sha256
+    monkeypatch.setattr(ChunkAssembler, "_file_sha256",
+                        staticmethod(lambda path: hashed_on.append(threading.current_thread()) or file_sha256(path)))
+    panel = client.panels[0]
+    queued = []
+
+    async def deliver():
+        client._loop = asyncio.get_running_loop()
+        client._chunk_executor = ThreadPoolExecutor(max_workers=1)
+        panel.render_queue.on_put = lambda job: client._call_in_loop(queued.append, job)
+        try:
+            for msg in chunk_messages(client):
+                client._handle_chunk_message(msg)
+            while not queued:
+                await asyncio.sleep(0.01)
+        finally:
+            client._chunk_executor.shutdown()
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(asyncio.wait_for(deliver(), timeout=10))
+
+    assert hashed_on and loop_thread not in hashed_on
+    job = queued[0]
+    assert job.topic == panel.topic
+    with open(job.payload_path, "rb") as f:
+        assert f.read() == PAYLOAD
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import time
+
+import pytest
+
+from chunked_transfer import ChunkAssembler
+
+PAYLOAD = bytes(range(256)) * 10 + b"tail"
+CHUNK_SIZE = 1024
+CHUNKS = -(-len(PAYLOAD) // CHUNK_SIZE)
+
+
+def manifest(payload=PAYLOAD):
+    return {"size": len(payload), "chunk_size": CHUNK_SIZE, "chunks": CHUNKS,
+            "sha256": hashlib.sha256(payload).hexdigest(), "options": {"panel": "left"}}
+
+
+def chunk(index, payload=PAYLOAD):
+    return payload[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+
+
+def test_chunks_in_any_order_complete_a_verified_transfer(tmp_path):
+    assembler = ChunkAssembler(str(tmp_path))
+    assembler.start("t1", manifest())
+
+    results = [assembler.add_chunk("t1", index, chunk(index)) for index in reversed(range(CHUNKS))]
+
+    transfer = results[-1]
+    assert results[:-1] == [None] * (CHUNKS - 1)
+    assert transfer.options == {"panel": "left"}
+    with open(transfer.path, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert assembler.pending_transfers() == []
+
+
+def test_transfer_resumes_after_a_restart(tmp_path):
+    assembler = ChunkAssembler(str(tmp_path))
+    assembler.start("t1", manifest())
+    assembler.add_chunk("t1", 1, chunk(1))
+
+    restarted = ChunkAssembler(str(tmp_path))
+    [pending] = restarted.pending_transfers()
+
+    assert pending.missing_ranges() == [(0, 0), (2, CHUNKS - 1)]
+    assert json.loads(ChunkAssembler.resume_request(pending)) == {
+        "transfer_id": "t1", "missing": [[0, 0], [2, CHUNKS - 1]]}
+    # The same manifest again keeps the chunks received so far
+    restarted.start("t1", manifest())
+    for index in (0, 2):
+        transfer = restarted.add_chunk("t1", index, chunk(index))
+    with open(transfer.path, "rb") as f:
+        assert f.read() == PAYLOAD
+
+
+def test_checksum_mismatch_discards_the_transfer(tmp_path):
+    assembler = ChunkAssembler(str(tmp_path))
+    assembler.start("t1", manifest())
+    corrupted = bytearray(PAYLOAD)
+    corrupted[0] ^= 0xFF
+
+    results = [assembler.add_chunk("t1", index, chunk(index, bytes(corrupted))) for index in range(CHUNKS)]
+
+    assert results == [None] * CHUNKS
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_chunks_of_the_wrong_size_or_index_are_ignored(tmp_path):
+    assembler = ChunkAssembler(str(tmp_path))
+    assembler.start("t1", manifest())
+
+    assert assembler.add_chunk("t1", 0, b"short") is None
+    assert assembler.add_chunk("t1", CHUNKS, chunk(0)) is None
+    assert assembler.add_chunk("unknown", 0, chunk(0)) is None
+    [pending] = assembler.pending_transfers()
+    assert pending.received == set()
+
+
+def test_invalid_manifests_are_rejected(tmp_path):
+    assembler = ChunkAssembler(str(tmp_path), max_size=100)
+
+    with pytest.raises(ValueError):
+        assembler.start("t1", manifest())
+    with pytest.raises(ValueError):
+        assembler.start("../t1", {**manifest(), "size": 10, "chunks": 1})
+    with pytest.raises(ValueError):
+        assembler.start("t2", {**manifest(), "size": 10})
+
+
+def test_stale_transfers_expire(tmp_path, monkeypatch):
+    assembler = ChunkAssembler(str(tmp_path), max_age=60)
+    assembler.start("t1", manifest())
+
+    later = time.time() + 61
+    monkeypatch.setattr("chunked_transfer.time.time", lambda: later)
+
+    assert assembler.pending_transfers() == []
+    assert list(tmp_path.iterdir()) == []
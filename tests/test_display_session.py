@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from display_session import DisplaySession
+
+
+class RecordingEPD:
+    def __init__(self):
+        self.calls = []
+        self.slept = threading.Event()
+
+    def prepare(self):
+        self.calls.append("prepare")
+
+    def sleep(self):
+        self.calls.append("sleep")
+        self.slept.set()
+
+    def close(self):
+        self.calls.append("close")
+
+
+def test_back_to_back_frames_reuse_the_warm_session():
+    epd = RecordingEPD()
+    session = DisplaySession(epd, idle_timeout=60)
+
+    for _ in range(3):
+        with session.active():
+            pass
+    session.close()
+
+    assert epd.calls == ["prepare", "sleep", "close"]
+    assert (session.metrics()['wakeups'], session.metrics()['reuses']) == (1, 2)
+
+
+def test_controller_sleeps_after_the_idle_timeout():
+    epd = RecordingEPD()
+    session = DisplaySession(epd, idle_timeout=0.05)
+
+    with session.active():
+        pass
+
+    assert epd.slept.wait(2)
+    assert not session.is_open
+
+
+def test_zero_timeout_sleeps_after_every_frame():
+    epd = RecordingEPD()
+    session = DisplaySession(epd, idle_timeout=0)
+
+    for _ in range(2):
+        with session.active():
+            pass
+
+    assert epd.calls == ["prepare", "sleep", "close"] * 2
+
+
+def test_failure_inside_the_session_closes_the_controller():
+    epd = RecordingEPD()
+    session = DisplaySession(epd, idle_timeout=60)
+
+    with pytest.raises(RuntimeError):
+        with session.active():
+            raise RuntimeError("communication with device failed")
+
+    assert epd.calls == ["prepare", "sleep", "close"]
+    with session.active():
+        pass
+    session.close()
+    assert session.metrics()['wakeups'] == 2
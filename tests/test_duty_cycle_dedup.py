@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import processed_message_tracker
+from app import EInkFrameClient, DEFAULT_TRACKER_PATH
+from processed_message_tracker import ProcessedMessageTracker
+
+
+def tracker_settings(config):
+    return EInkFrameClient._tracker_settings(SimpleNamespace(config=config))
+
+
+def test_message_age_is_raised_to_the_wake_interval():
+    config = {"message_tracker": {"max_message_age": 300, "persist_path": "cache/seen.json"},
+              "duty_cycle": {"enabled": True, "wake_interval": 1800}}
+
+    assert tracker_settings(config) == (1800, "cache/seen.json")
+
+
+def test_duty_cycle_always_persists_the_index():
+    config = {"message_tracker": {}, "duty_cycle": {"enabled": True}}
+
+    assert tracker_settings(config)[1] == DEFAULT_TRACKER_PATH
+
+
+def test_continuous_mode_keeps_the_configured_settings():
+    config = {"message_tracker": {"max_message_age": 300}, "duty_cycle": {"enabled": False}}
+
+    assert tracker_settings(config) == (300, None)
+
+
+def test_retained_image_is_skipped_on_the_next_wake(tmp_path, monkeypatch):
+    now = [1_000_000]
+    monkeypatch.setattr(processed_message_tracker.time, "time", lambda: now[0])
+    config = {"message_tracker": {"max_message_age": 300, "persist_path": str(tmp_path / "seen.json")},
+              "duty_cycle": {"enabled": True, "wake_interval": 1800}}
+    max_message_age, persist_path = tracker_settings(config)
+    key = ProcessedMessageTracker.message_key(b"retained image")
+    ProcessedMessageTracker(max_message_age, persist_path=persist_path).mark_message_as_processed(key, now[0])
+
+    now[0] += 1800
+    woken = ProcessedMessageTracker(max_message_age, persist_path=persist_path)
+
+    assert woken.is_message_processed(key)
@@ -0,0 +1,53 @@
+import numpy as np
+
+from frame_buffers import FrameBufferPool
+from panel_frame import PanelFrame
+
+
+def test_released_buffers_are_reused_per_shape_and_type():
+    pool = FrameBufferPool()
+    buffer = pool.acquire((4, 6))
+    pool.release(buffer)
+
+    assert pool.acquire((4, 6)) is buffer
+    assert pool.acquire((4, 6)) is not buffer
+    assert pool.acquire((4, 6), np.uint16).dtype == np.uint16
+    assert pool.stats()['allocations'] == 3
+    assert pool.stats()['reuses'] == 1
+
+
+def test_free_list_is_bounded_and_ignores_double_releases():
+    pool = FrameBufferPool(max_free=2)
+    buffers = [pool.acquire((4, 6)) for _ in range(3)]
+    pool.release(buffers[0])
+    pool.release(buffers[0])
+    for buffer in buffers[1:]:
+        pool.release(buffer)
+
+    stats = pool.stats()
+
+    assert stats['free_buffers'] == 2
+    assert stats['free_bytes'] == 2 * 4 * 6
+
+
+def test_frames_return_their_buffer_once():
+    pool = FrameBufferPool()
+    frame = PanelFrame(pool.acquire((4, 6)), pool)
+    buffer = frame.levels
+
+    frame.release()
+    frame.release()
+
+    assert pool.stats()['free_buffers'] == 1
+    assert pool.acquire((4, 6)) is buffer
+
+
+def test_odd_width_frames_return_their_padded_buffer():
+    pool = FrameBufferPool()
+    frame = PanelFrame(np.zeros((2, 5), dtype=np.uint8))
+
+    unpacked = PanelFrame.unpack(frame.pack(), 5, 2, pool)
+    padded = unpacked.levels.base
+    unpacked.release()
+
+    assert pool.acquire((2, 6)) is padded
@@ -0,0 +1,66 @@
+import io
+import os
+
+import numpy as np
+
+from frame_buffers import FrameBufferPool
+from frame_cache import FrameCache
+from panel_frame import PanelFrame
+
+WIDTH, HEIGHT = 16, 8
+
+
+def frame(level):
+    return PanelFrame(np.full((HEIGHT, WIDTH), level, dtype=np.uint8))
+
+
+def test_make_key_covers_payload_and_signature():
+    payload = b"image bytes"
+    key = FrameCache.make_key(payload, "gray16")
+    file_payload = io.BytesIO(payload)
+
+    assert FrameCache.make_key(file_payload, "gray16") == key
+    assert file_payload.tell() == 0
+    assert FrameCache.make_key(payload, "gray16 rotate=90") != key
+    assert FrameCache.make_key(b"other bytes", "gray16") != key
+
+
+def test_frames_round_trip_into_pooled_buffers(tmp_path):
+    pool = FrameBufferPool()
+    cache = FrameCache(str(tmp_path), buffer_pool=pool)
+    cache.put("a", frame(5))
+
+    cached = cache.get("a")
+
+    np.testing.assert_array_equal(cached.levels, frame(5).levels)
+    assert cached.pool is pool
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_frames_are_evicted(tmp_path):
+    size = len(frame(0).to_bytes())
+    cache = FrameCache(str(tmp_path), max_bytes=2 * size)
+    cache.put("a", frame(1))
+    cache.put("b", frame(2))
+    cache.get("a")
+
+    cache.put("c", frame(3))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_cache_survives_a_restart_and_drops_unreadable_frames(tmp_path):
+    cache = FrameCache(str(tmp_path))
+    cache.put("a", frame(7))
+    cache.put("b", frame(8))
+    with open(cache._path("b"), "r+b") as f:
+        f.truncate(3)
+
+    restarted = FrameCache(str(tmp_path))
+
+    np.testing.assert_array_equal(restarted.get("a").levels, frame(7).levels)
+    assert restarted.get("b") is None
+    assert not os.path.exists(restarted._path("b"))
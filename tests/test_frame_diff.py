@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from e_ink_screen import EInkScreen
+from frame_diff import dirty_regions, region_area
+from mocked_epd import TimedEPD
+from panel_frame import PanelFrame
+
+WIDTH, HEIGHT = 64, 48
+
+
+class RecordingEPD(TimedEPD):
+    def __init__(self):
+        super().__init__(WIDTH, HEIGHT, realtime=False)
+        self.updates = []
+
+    def display(self, image, mode=None):
+        self.updates.append(("full", None))
+        super().display(image, mode)
+
+    def display_partial(self, image, region, mode=None):
+        self.updates.append(("partial", tuple(region)))
+        super().display_partial(image, region, mode)
+
+
+def blank():
+    return np.full((HEIGHT, WIDTH), 15, dtype=np.uint8)
+
+
+def test_identical_frames_have_no_regions():
+    assert dirty_regions(blank(), blank()) == []
+
+
+def test_region_is_aligned_to_four_pixels():
+    current = blank()
+    current[10:12, 5:7] = 0
+
+    assert dirty_regions(blank(), current) == [(4, 10, 8, 12)]
+
+
+def test_nearby_rows_merge_and_distant_rows_split():
+    current = blank()
+    current[0, 0] = 0
+    current[4, 0] = 0
+    current[40, 60] = 0
+
+    assert dirty_regions(blank(), current, merge_gap=8) == [(0, 0, 4, 5), (60, 40, 64, 41)]
+
+
+def test_too_many_bands_collapse_into_one_box():
+    current = blank()
+    current[::10, 8] = 0
+
+    assert dirty_regions(blank(), current, merge_gap=2, max_regions=2) == [(8, 0, 12, 41)]
+
+
+def test_region_area():
+    assert region_area([(0, 0, 4, 5), (60, 40, 64, 41)]) == 24
+
+
+@pytest.fixture
+def screen():
+    screen = EInkScreen(WIDTH, HEIGHT, epd=RecordingEPD(), partial_refresh_max_ratio=0.35)
+    yield screen
+    screen.close()
+
+
+def test_screen_skips_unchanged_frames_and_refreshes_small_changes_partially(screen):
+    changed = blank()
+    changed[20:22, 30:34] = 0
+
+    screen.display_frame(PanelFrame(blank()))
+    screen.display_frame(PanelFrame(blank()))
+    screen.display_frame(PanelFrame(changed))
+
+    assert screen.epd.updates == [("full", None), ("partial", (28, 20, 36, 22))]
+
+
+def test_screen_refreshes_large_changes_fully(screen):
+    screen.display_frame(PanelFrame(blank()))
+    screen.display_frame(PanelFrame(np.zeros((HEIGHT, WIDTH), dtype=np.uint8)))
+
+    assert screen.epd.updates == [("full", None), ("full", None)]
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from geometry import GeometryProcessor, GeometrySettings
+
+WIDTH, HEIGHT = 100, 100
+
+
+def gradient(width, height):
+    levels = np.add.outer(np.arange(height), np.arange(width)) % 256
+    return Image.fromarray(levels.astype(np.uint8), "L")
+
+
+def assert_same(actual, expected):
+    assert actual.size == expected.size
+    np.testing.assert_array_equal(np.asarray(actual), np.asarray(expected))
+
+
+@pytest.mark.parametrize("focus_x, left", [(0.0, 0), (0.5, 50), (1.0, 100)])
+def test_fill_crops_around_the_focal_point(focus_x, left):
+    image = gradient(200, 100)
+    settings = GeometrySettings(focus_x=focus_x)
+
+    result = GeometryProcessor(WIDTH, HEIGHT).process(image, settings)
+
+    assert_same(result, image.crop((left, 0, left + 100, 100)))
+
+
+def test_fit_letterboxes_on_the_background():
+    settings = GeometrySettings(fit="fit", background=7)
+
+    result = np.asarray(GeometryProcessor(WIDTH, HEIGHT).process(gradient(200, 100), settings))
+
+    assert (result[:25] == 7).all() and (result[75:] == 7).all()
+    assert not (result[25:75] == 7).all()
+
+
+def test_rotation_is_an_exact_transpose():
+    image = gradient(100, 50)
+    settings = GeometrySettings(rotate=90, fit="stretch")
+
+    result = GeometryProcessor(50, 100).process(image, settings)
+
+    assert_same(result, image.transpose(Image.Transpose.ROTATE_90))
+
+
+def test_exif_orientation_is_applied_unless_disabled():
+    image = gradient(100, 50)
+    image.info["orientation"] = 6
+    processor = GeometryProcessor(50, 100)
+
+    assert_same(processor.process(image, GeometrySettings(fit="stretch")),
+                image.transpose(Image.Transpose.ROTATE_270))
+    assert processor.process(image, GeometrySettings(exif=False)).size == (50, 100)
+    assert GeometrySettings().swaps_axes(6)
+    assert not GeometrySettings(exif=False).swaps_axes(6)
+
+
+def test_settings_coerce_overrides_and_validate():
+    settings = GeometrySettings.from_dict({"rotate": "-90", "exif": "false", "fit": "cover", "unknown": 1})
+
+    assert (settings.rotate, settings.exif, settings.fit) == (270, False, "fill")
+    for overrides in ({"rotate": 45}, {"fit": "zoom"}, {"resample": "cubic"}, {"focus_x": 1.5}):
+        with pytest.raises(ValueError):
+            settings.merged(overrides)
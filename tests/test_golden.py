@@ -0,0 +1,75 @@
+import os
+
+import pytest
+from PIL import Image
+
+import golden
+from benchmark import offline_client
+from processed_message_tracker import ProcessedMessageTracker
+from render_queue import RenderJob
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    directory = tmp_path / "corpus"
+    directory.mkdir()
+    gradient = Image.linear_gradient("L")
+    for name, image in (("a_gradient.png", gradient.resize((800, 600))),
+                        ("b_flipped.png", gradient.rotate(90).resize((1200, 900)))):
+        image.save(directory / name)
+    return directory
+
+
+def show_on_file_epd(corpus, output_dir):
+    """Show the corpus in order on a client whose panel is the file EPD backend."""
+    client = offline_client(CONFIG_PATH, file_epd={"enabled": True, "output_dir": str(output_dir), "formats": ["g16"]})
+    try:
+        for index, name in enumerate(sorted(os.listdir(corpus))):
+            client._process_image_message(RenderJob(
+                topic=client.config["topic_image_display"],
+                payload=(corpus / name).read_bytes(),
+                received_at=0,
+                message_key=ProcessedMessageTracker.message_key(b"", f"golden-{index}")
+            ))
+    finally:
+        client._close_display()
+
+
+def compare(*argv):
+    with pytest.raises(SystemExit) as exit_info:
+        golden.main(["compare", *argv])
+    return exit_info.value.code
+
+
+def test_recorded_frames_match_file_epd_output(corpus, tmp_path, capsys):
+    golden_dir, actual_dir = tmp_path / "golden", tmp_path / "actual"
+    with pytest.raises(SystemExit):
+        golden.main(["record", "--corpus", str(corpus), "--golden", str(golden_dir), "--config", CONFIG_PATH])
+    show_on_file_epd(corpus, actual_dir)
+
+    assert compare("--golden", str(golden_dir), "--actual", str(actual_dir)) == 0
+    assert "2/2 frame(s) match" in capsys.readouterr().out
+
+
+def test_latest_file_epd_run_is_compared(corpus, tmp_path):
+    golden_dir, actual_dir = tmp_path / "golden", tmp_path / "actual"
+    with pytest.raises(SystemExit):
+        golden.main(["record", "--corpus", str(corpus), "--golden", str(golden_dir), "--config", CONFIG_PATH])
+    # A blank first update, e.g. from an earlier run into the same directory
+    Image.new("L", (1600, 1200), 255).save(corpus / "0_blank.png")
+    show_on_file_epd(corpus, actual_dir)
+    os.remove(corpus / "0_blank.png")
+
+    assert compare("--golden", str(golden_dir), "--actual", str(actual_dir)) == 0
+
+
+def test_swapped_frames_fail(corpus, tmp_path):
+    golden_dir, actual_dir = tmp_path / "golden", tmp_path / "actual"
+    with pytest.raises(SystemExit):
+        golden.main(["record", "--corpus", str(corpus), "--golden", str(golden_dir), "--config", CONFIG_PATH])
+    os.rename(corpus / "a_gradient.png", corpus / "c_gradient.png")
+    show_on_file_epd(corpus, actual_dir)
+
+    assert compare("--golden", str(golden_dir), "--actual", str(actual_dir)) == 1
@@ -0,0 +1,36 @@
+import numpy as np
+from PIL import Image
+
+from frame_buffers import FrameBufferPool
+from gray16_processor import GRAY16_PALETTE, GRAY_LEVELS, Gray16Processor, ToneSettings
+
+SIZE = (320, 240)
+
+
+def gradient():
+    return Image.linear_gradient("L").resize(SIZE)
+
+
+def reference_floyd_steinberg(image):
+    palette = Image.new("P", (1, 1))
+    palette.putpalette(GRAY16_PALETTE)
+    quantized = image.convert("RGB").quantize(palette=palette, dither=Image.Dither.FLOYDSTEINBERG)
+    return np.minimum(np.asarray(quantized), GRAY_LEVELS - 1)
+
+
+def test_floyd_steinberg_matches_pillow_on_rgb():
+    frame = Gray16Processor(ToneSettings(dither="floyd_steinberg")).process(gradient())
+
+    assert np.array_equal(frame.levels, reference_floyd_steinberg(gradient()))
+
+
+def test_floyd_steinberg_reuses_its_buffers():
+    pool = FrameBufferPool()
+    processor = Gray16Processor(ToneSettings(dither="floyd_steinberg"), pool)
+    processor.process(gradient()).release()
+    allocations = pool.allocations
+
+    for _ in range(3):
+        processor.process(gradient()).release()
+
+    assert pool.allocations == allocations
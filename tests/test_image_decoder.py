@@ -0,0 +1,54 @@
+import io
+
+import pytest
+from PIL import Image
+
+from geometry import GeometrySettings
+from image_decoder import ImageDecoder
+
+WIDTH, HEIGHT = 200, 100
+
+
+def encode(size, format="JPEG", mode="RGB"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, 128).save(buffer, format)
+    return buffer.getvalue()
+
+
+def test_jpeg_is_scaled_while_decoding_but_never_below_the_panel():
+    image = ImageDecoder(WIDTH, HEIGHT).decode(encode((1600, 800)))
+
+    assert image.mode == "L"
+    assert image.size == (WIDTH, HEIGHT)
+
+
+def test_other_formats_are_reduced_by_an_integer_factor():
+    image = ImageDecoder(WIDTH, HEIGHT).decode(encode((500, 320), "PNG"))
+
+    assert image.size == (250, 160)
+
+
+def test_quarter_turn_swaps_the_bounds():
+    payload = encode((1600, 800))
+
+    image = ImageDecoder(WIDTH, HEIGHT).decode(payload, GeometrySettings(rotate=90))
+
+    assert image.size[1] >= WIDTH
+    assert image.info["orientation"] == 1
+
+
+def test_file_payloads_are_decoded(tmp_path):
+    path = tmp_path / "frame.png"
+    path.write_bytes(encode((WIDTH, HEIGHT), "PNG", "L"))
+
+    with open(path, "rb") as f:
+        assert ImageDecoder(WIDTH, HEIGHT).decode(f).size == (WIDTH, HEIGHT)
+
+
+def test_oversized_payloads_and_images_are_rejected():
+    payload = encode((1000, 1000), "PNG")
+
+    with pytest.raises(ValueError, match="bytes"):
+        ImageDecoder(WIDTH, HEIGHT, max_payload_bytes=len(payload) - 1).decode(payload)
+    with pytest.raises(ValueError, match="pixels"):
+        ImageDecoder(WIDTH, HEIGHT, max_image_pixels=999_999).decode(payload)
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from metrics import LatencyHistogram, PipelineMetrics, StartupTimeline
+
+
+def test_histogram_percentiles_use_the_recent_window():
+    histogram = LatencyHistogram(window=4)
+    for seconds in (10.0, 0.001, 0.002, 0.003, 0.004):
+        histogram.add(seconds)
+
+    summary = histogram.summary()
+
+    assert (summary['count'], summary['max_ms']) == (5, 10000.0)
+    assert (summary['p50_ms'], summary['p95_ms']) == (3.0, 4.0)
+
+
+def test_spans_record_failed_blocks_and_stages_follow_the_pipeline():
+    metrics = PipelineMetrics()
+    metrics.record('refresh', 0.5)
+    metrics.record('custom', 0.1)
+    with pytest.raises(ValueError):
+        with metrics.span('decode'):
+            raise ValueError("corrupt image")
+    metrics.record('queue_wait', -1)
+
+    snapshot = json.loads(metrics.payload())
+
+    assert list(snapshot['stages']) == ['queue_wait', 'decode', 'refresh', 'custom']
+    assert snapshot['stages']['decode']['count'] == 1
+    assert snapshot['stages']['queue_wait']['max_ms'] == 0.0
+    assert snapshot['resources']['peak_rss_mb'] > 0
+
+
+def test_startup_timeline_keeps_the_first_mark():
+    timeline = StartupTimeline()
+
+    assert timeline.mark('mqtt_connected')
+    first = timeline.as_dict()['marks']['mqtt_connected']
+    assert not timeline.mark('mqtt_connected')
+
+    assert timeline.as_dict()['marks'] == {'mqtt_connected': first}
+    assert first >= 0
@@ -0,0 +1,26 @@
+import pytest
+
+from panels import panel_configs
+
+DISPLAY_TOPIC = "device/frame/image/display"
+
+
+def config(*panels):
+    return {"device_id": "frame", "topic_image_display": DISPLAY_TOPIC, "panels": list(panels)}
+
+
+@pytest.mark.parametrize("name", ["chunked", "resume", "playlist", "calibrate_spi"])
+def test_reserved_panel_names_are_rejected(name):
+    with pytest.raises(ValueError, match="reserved"):
+        panel_configs(config({"name": "left"}, {"name": name}))
+
+
+def test_explicit_topic_below_a_reserved_sub_topic_is_rejected():
+    with pytest.raises(ValueError, match="reserved"):
+        panel_configs(config({"name": "left", "topic_image_display": f"{DISPLAY_TOPIC}/playlist/left"}))
+
+
+def test_panel_topics_default_to_the_display_topic_and_name():
+    panels = panel_configs(config({"name": "left"}, {"name": "playlists"}))
+
+    assert [panel["topic"] for panel in panels] == [f"{DISPLAY_TOPIC}/left", f"{DISPLAY_TOPIC}/playlists"]
@@ -0,0 +1,20 @@
+from unittest.mock import MagicMock
+
+import pijuice_handler
+from pijuice_handler import PiJuiceHandler
+
+
+def test_shutdown_returns_instead_of_exiting(monkeypatch):
+    commands = []
+    monkeypatch.setattr(pijuice_handler.os, "system", lambda command: commands.append(command) or 0)
+    pijuice = MagicMock()
+
+    assert PiJuiceHandler.safe_pijuice_shutdown(pijuice, 20) is True
+    pijuice.power.SetPowerOff.assert_called_once_with(20)
+    assert commands == ["sudo shutdown -h 0"]
+
+
+def test_failed_shutdown_is_reported(monkeypatch):
+    monkeypatch.setattr(pijuice_handler.os, "system", lambda command: 256)
+
+    assert PiJuiceHandler.safe_pijuice_shutdown(MagicMock()) is False
@@ -0,0 +1,57 @@
+import hashlib
+
+from playlist import PlaylistPlayer, PlaylistStore
+
+IMAGE = b"playlist image"
+IMAGE_HASH = hashlib.sha256(IMAGE).hexdigest()
+START = 1_000_000.0
+
+
+def make_player(tmp_path):
+    store = PlaylistStore(str(tmp_path / "playlist"))
+    assert store.put_image(IMAGE_HASH, IMAGE)
+    shown = []
+    player = PlaylistPlayer(store, "main",
+                            show=lambda item, started: shown.append((item.image, started)) or True,
+                            prefetch=lambda item: False,
+                            can_prefetch=lambda: False)
+    return player, shown
+
+
+def playlist(playlist_id="lobby", start=START):
+    return {"id": playlist_id, "items": [{"image": IMAGE_HASH, "start": start}]}
+
+
+def test_unchanged_playlist_keeps_the_schedule_state(tmp_path):
+    player, shown = make_player(tmp_path)
+    player.update(playlist())
+    player._tick(START + 10)
+
+    # A reconnect redelivers the retained playlist while a live image is on the panel
+    player.update(playlist())
+    player._tick(START + 20)
+
+    assert shown == [(IMAGE_HASH, START)]
+    assert player.flips == 1
+
+
+def test_changed_playlist_resets_the_schedule(tmp_path):
+    player, shown = make_player(tmp_path)
+    player.update(playlist())
+    player._tick(START + 10)
+
+    player.update(playlist(playlist_id="lobby-v2"))
+    player._tick(START + 20)
+
+    assert shown == [(IMAGE_HASH, START), (IMAGE_HASH, START)]
+
+
+def test_unchanged_playlist_is_still_persisted(tmp_path):
+    player, _ = make_player(tmp_path)
+    player.update(playlist())
+    player.update(playlist())
+
+    stored = player.store.load_playlist("main")
+
+    assert stored.playlist_id == "lobby"
+    assert [item.image for item in stored.items] == [IMAGE_HASH]
@@ -0,0 +1,114 @@
+import json
+import time
+
+import processed_message_tracker
+from processed_message_tracker import ProcessedMessageTracker
+
+MAX_AGE = 300
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_tracker(path, clock, monkeypatch, max_entries=256, save_interval=10):
+    monkeypatch.setattr(processed_message_tracker.time, "time", clock)
+    return ProcessedMessageTracker(max_message_age=MAX_AGE, max_entries=max_entries, persist_path=str(path),
+                                   save_interval=save_interval)
+
+
+def test_latest_image_survives_a_long_restart(tmp_path, monkeypatch):
+    clock = FakeClock()
+    path = tmp_path / "processed.json"
+    tracker = make_tracker(path, clock, monkeypatch)
+    key = ProcessedMessageTracker.message_key(b"retained image")
+    tracker.mark_message_as_processed(key, clock.now)
+
+    clock.now += 1800  # one duty-cycle wake interval later
+    restarted = make_tracker(path, clock, monkeypatch)
+
+    assert restarted.is_message_processed(key)
+
+
+def test_latest_message_id_survives_a_long_restart(tmp_path, monkeypatch):
+    clock = FakeClock()
+    path = tmp_path / "processed.json"
+    tracker = make_tracker(path, clock, monkeypatch)
+    tracker.mark_message_as_processed(ProcessedMessageTracker.message_key(b"", "older"), clock.now)
+    tracker.mark_message_as_processed(ProcessedMessageTracker.message_key(b"", "latest"), clock.now)
+    tracker.flush()
+
+    clock.now += 7 * 24 * 3600
+    restarted = make_tracker(path, clock, monkeypatch)
+
+    assert restarted.is_message_processed(ProcessedMessageTracker.message_key(b"", "latest"))
+    assert not restarted.is_message_processed(ProcessedMessageTracker.message_key(b"", "older"))
+
+
+def test_message_ids_expire_by_age(tmp_path, monkeypatch):
+    clock = FakeClock()
+    tracker = make_tracker(tmp_path / "processed.json", clock, monkeypatch)
+    old_id = ProcessedMessageTracker.message_key(b"", "old")
+    tracker.mark_message_as_processed(old_id, clock.now)
+    clock.now += MAX_AGE - 1
+    tracker.mark_message_as_processed(ProcessedMessageTracker.message_key(b"", "new"), clock.now)
+
+    assert tracker.is_message_processed(old_id)
+    clock.now += 2
+    assert not tracker.is_message_processed(old_id)
+
+
+def test_only_the_latest_content_hash_counts(tmp_path, monkeypatch):
+    clock = FakeClock()
+    tracker = make_tracker(tmp_path / "processed.json", clock, monkeypatch)
+    first = ProcessedMessageTracker.message_key(b"first")
+    second = ProcessedMessageTracker.message_key(b"second")
+    tracker.mark_message_as_processed(first, clock.now)
+    tracker.mark_message_as_processed(second, clock.now)
+
+    assert not tracker.is_message_processed(first)
+    assert tracker.is_message_processed(second)
+    assert first not in tracker.processed_messages
+
+
+def test_index_is_bounded(tmp_path, monkeypatch):
+    clock = FakeClock()
+    path = tmp_path / "processed.json"
+    tracker = make_tracker(path, clock, monkeypatch, max_entries=3)
+    for index in range(5):
+        tracker.mark_message_as_processed(ProcessedMessageTracker.message_key(b"", str(index)), clock.now)
+    tracker.flush()
+
+    restarted = make_tracker(path, clock, monkeypatch, max_entries=3)
+
+    assert list(restarted.processed_messages) == [f"id:{index}" for index in (2, 3, 4)]
+
+
+def test_writes_are_spaced_and_flushed(tmp_path, monkeypatch):
+    clock = FakeClock()
+    path = tmp_path / "processed.json"
+    tracker = make_tracker(path, clock, monkeypatch)
+    tracker.mark_message_as_processed(ProcessedMessageTracker.message_key(b"", "first"), clock.now)
+    tracker.mark_message_as_processed(ProcessedMessageTracker.message_key(b"", "second"), clock.now)
+
+    assert list(json.loads(path.read_text())) == ["id:first"]
+    tracker.flush()
+    assert list(json.loads(path.read_text())) == ["id:first", "id:second"]
+
+
+def test_pending_write_follows_after_the_interval(tmp_path, monkeypatch):
+    clock = FakeClock()
+    path = tmp_path / "processed.json"
+    tracker = make_tracker(path, clock, monkeypatch, save_interval=0.05)
+    tracker.mark_message_as_processed(ProcessedMessageTracker.message_key(b"", "first"), clock.now)
+    tracker.mark_message_as_processed(ProcessedMessageTracker.message_key(b"", "second"), clock.now)
+
+    deadline = time.monotonic() + 5
+    while "id:second" not in json.loads(path.read_text()) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert list(json.loads(path.read_text())) == ["id:first", "id:second"]
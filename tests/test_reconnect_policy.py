@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from reconnect_policy import ReconnectPolicy
+
+
+def test_backoff_grows_up_to_the_max_delay():
+    policy = ReconnectPolicy(initial_delay=1, max_delay=10, multiplier=2, jitter=0)
+
+    assert [policy.next_delay() for _ in range(6)] == [1, 2, 4, 8, 10, 10]
+
+
+def test_jitter_only_shortens_the_delay():
+    policy = ReconnectPolicy(initial_delay=8, max_delay=8, jitter=0.5, rng=random.Random(1))
+
+    delays = [policy.next_delay() for _ in range(200)]
+
+    assert all(4 <= delay <= 8 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_connect_resets_the_backoff():
+    policy = ReconnectPolicy(initial_delay=1, max_delay=100, jitter=0)
+    for _ in range(4):
+        policy.next_delay()
+
+    policy.record_connected()
+
+    assert policy.next_delay() == 1
+
+
+def test_metrics_count_connection_events():
+    policy = ReconnectPolicy(jitter=0)
+    policy.record_connected()
+    policy.record_disconnected(7)
+    policy.record_failure(OSError("refused"))
+    policy.next_delay()
+
+    metrics = policy.metrics()
+
+    assert (metrics['connects'], metrics['disconnects'], metrics['failed_attempts']) == (1, 1, 1)
+    assert metrics['backoff_attempts'] == 1
+    assert metrics['last_disconnect_rc'] == 7
+    assert 0 <= metrics['uptime_ratio'] <= 1
+
+
+def test_jitter_outside_the_unit_range_is_rejected():
+    with pytest.raises(ValueError):
+        ReconnectPolicy(jitter=1.5)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import e_ink_screen
+from e_ink_screen import EInkScreen
+from mocked_epd import EPD, TimedEPD
+from panel_frame import PanelFrame
+from refresh_timing import REFRESH_SECONDS, RefreshTimeModel
+
+WIDTH, HEIGHT = 32, 16
+
+
+def frame():
+    return PanelFrame(np.full((HEIGHT, WIDTH), 15, dtype=np.uint8))
+
+
+def test_estimates_start_nominal_and_follow_measurements():
+    model = RefreshTimeModel(smoothing=0.25)
+
+    assert model.expected('DU') == REFRESH_SECONDS['DU']
+    assert model.expected('UNKNOWN') == REFRESH_SECONDS['GC16']
+    model.record('GC16', 1.0)
+    model.record('GC16', 2.0)
+
+    assert model.expected('GC16') == pytest.approx(1.25)
+    assert model.as_dict()['GC16'] == {'seconds': 1.25, 'samples': 2}
+
+
+def test_busy_pin_measurements_calibrate_the_model():
+    model = RefreshTimeModel()
+    screen = EInkScreen(WIDTH, HEIGHT, epd=TimedEPD(WIDTH, HEIGHT, realtime=False), refresh_model=model)
+    try:
+        screen.display_frame(frame())
+    finally:
+        screen.close()
+
+    assert sum(entry['samples'] for entry in model.as_dict().values()) == 1
+
+
+def test_drivers_without_a_busy_pin_wait_out_the_estimate(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(e_ink_screen.time, "sleep", sleeps.append)
+    model = RefreshTimeModel(defaults={mode: 3.0 for mode in REFRESH_SECONDS})
+    screen = EInkScreen(WIDTH, HEIGHT, epd=EPD(), refresh_model=model)
+    try:
+        screen.display_frame(frame())
+    finally:
+        screen.close()
+
+    assert len(sleeps) == 1
+    assert 2.5 < sleeps[0] <= 3.0
+    assert all(entry['samples'] == 0 for entry in model.as_dict().values())
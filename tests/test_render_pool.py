@@ -0,0 +1,80 @@
+import errno
+import io
+import os
+import signal
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from geometry import GeometrySettings
+from gray16_processor import ToneSettings
+from render_pool import RenderPool, RenderRequest
+
+WIDTH, HEIGHT = 320, 240
+REQUEST = RenderRequest(WIDTH, HEIGHT, 50_000_000, 20 * 1024 * 1024, GeometrySettings(), ToneSettings())
+
+
+def jpeg() -> bytes:
+    buffer = io.BytesIO()
+    Image.linear_gradient("L").resize((640, 480)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def pool():
+    pool = RenderPool(workers=1, memory_limit=0, timeout=30)
+    yield pool
+    pool.close()
+
+
+def kill_worker(pool: RenderPool) -> None:
+    pid = pool._executor.submit(os.getpid).result()
+    os.kill(pid, signal.SIGKILL)
+
+
+def write_fifo(path: str, payload: bytes, timeout: float = 30) -> None:
+    """Write to a FIFO once a worker opens it for reading."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+            break
+        except OSError as e:
+            if e.errno != errno.ENXIO or time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
+    os.set_blocking(fd, True)
+    with os.fdopen(fd, "wb") as f:
+        f.write(payload)
+
+
+def test_render_is_retried_after_its_worker_was_killed(pool, tmp_path):
+    # The worker blocks reading the FIFO, so the render is still running when it is killed
+    path = str(tmp_path / "payload")
+    os.mkfifo(path)
+    pid = pool._executor.submit(os.getpid).result()
+    results = []
+    render = threading.Thread(target=lambda: results.append(pool.render(path, REQUEST)))
+    render.start()
+    time.sleep(0.2)
+    os.kill(pid, signal.SIGKILL)
+
+    write_fifo(path, jpeg())
+    render.join(timeout=30)
+
+    frame, timings = results[0]
+    assert frame.levels.shape == (HEIGHT, WIDTH)
+    assert set(timings) == {"decode", "render"}
+    assert pool.crashes == 1
+
+
+def test_worker_killed_while_idle_is_replaced(pool):
+    kill_worker(pool)
+    time.sleep(0.5)
+
+    frame, _ = pool.render(jpeg(), REQUEST)
+
+    assert frame.levels.shape == (HEIGHT, WIDTH)
+    assert pool.crashes == 1
@@ -0,0 +1,71 @@
+import pytest
+
+from render_queue import RenderJob, RenderQueue
+
+
+def job(topic, payload=b""):
+    return RenderJob(topic=topic, payload=payload, received_at=0)
+
+
+def test_newest_job_per_topic_wins():
+    dropped = []
+    queue = RenderQueue(on_drop=dropped.append)
+    first, second = job("a", b"1"), job("a", b"2")
+
+    assert queue.put(first) and queue.put(second)
+
+    assert len(queue) == 1
+    assert queue.get(timeout=0) is second
+    assert dropped == [first]
+    assert queue.coalesced == 1
+
+
+def test_drop_oldest_makes_room_for_the_incoming_job():
+    dropped = []
+    queue = RenderQueue(max_depth=2, drop_policy="drop_oldest", on_drop=dropped.append)
+    jobs = [job(topic) for topic in "abc"]
+
+    assert all(queue.put(item) for item in jobs)
+
+    assert dropped == [jobs[0]]
+    assert [queue.get(timeout=0), queue.get(timeout=0)] == jobs[1:]
+
+
+def test_drop_newest_rejects_the_incoming_job():
+    dropped = []
+    queue = RenderQueue(max_depth=2, drop_policy="drop_newest", on_drop=dropped.append)
+    jobs = [job(topic) for topic in "abc"]
+
+    assert [queue.put(item) for item in jobs] == [True, True, False]
+
+    assert dropped == [jobs[2]]
+    assert [queue.get(timeout=0), queue.get(timeout=0)] == jobs[:2]
+
+
+def test_idle_once_every_job_is_done():
+    queue = RenderQueue()
+    queue.put(job("a"))
+    queue.get(timeout=0)
+
+    assert not queue.wait_idle(0)
+    queue.task_done()
+    assert queue.wait_idle(0)
+
+
+def test_closed_queue_discards_pending_and_rejects_new_jobs():
+    dropped = []
+    queue = RenderQueue(on_drop=dropped.append)
+    pending = job("a")
+    queue.put(pending)
+
+    queue.close()
+
+    assert dropped == [pending]
+    assert not queue.put(job("b"))
+    assert queue.get(timeout=0) is None
+
+
+@pytest.mark.parametrize("kwargs", [{"max_depth": 0}, {"drop_policy": "drop_random"}])
+def test_invalid_settings_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        RenderQueue(**kwargs)
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmark import offline_client
+from render_queue import RenderJob
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
+
+
+class Frame:
+    def __init__(self, name):
+        self.name = name
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+
+@pytest.fixture
+def client():
+    client = offline_client(CONFIG_PATH)
+    yield client
+    client._close_display()
+
+
+def test_newer_image_cancels_the_render_in_flight(client):
+    panel = client.panels[0]
+    started, gate = threading.Event(), threading.Event()
+    frames, shown = {}, []
+
+    def prepare_frame(panel, job):
+        if job.payload == b"old":
+            started.set()
+            gate.wait(5)
+        frames[job.payload] = Frame(job.payload)
+        return frames[job.payload], job.payload.decode()
+
+    client._prepare_frame = prepare_frame
+    client._show_frame = lambda panel, job, frame, message_key: shown.append(frame.name)
+
+    async def run():
+        client._loop = asyncio.get_running_loop()
+        client._shutdown = asyncio.Event()
+        client._executor = ThreadPoolExecutor(max_workers=2)
+        client._start_render_workers()
+        try:
+            panel.render_queue.put(RenderJob(panel.topic, b"old", int(time.time())))
+            await client._loop.run_in_executor(None, started.wait, 5)
+            panel.render_queue.put(RenderJob(panel.topic, b"new", int(time.time())))
+            while not shown:
+                await asyncio.sleep(0.01)
+            gate.set()
+            while b"old" not in frames or not frames[b"old"].released:
+                await asyncio.sleep(0.01)
+        finally:
+            gate.set()
+            client._shutdown.set()
+            await client._stop_render_tasks()
+            client._executor.shutdown()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=10))
+
+    assert shown == [b"new"]
+    assert frames[b"old"].released
@@ -0,0 +1,99 @@
+import pytest
+
+import spi_calibration
+from spi_calibration import (CalibrationResult, SpiClockStore, SpiProbeError, calibrate, is_communication_error,
+                             probe_controller, slower_clock)
+
+CLOCKS = (16000000, 8000000, 4000000)
+
+
+class Controller:
+    """Controller register file; with ``corrupt`` set every readback has a flipped bit."""
+
+    def __init__(self, corrupt=False):
+        self.registers = {spi_calibration.PROBE_REGISTER: 0x1234}
+        self.corrupt = corrupt
+
+    def read_register(self, register):
+        return self.registers[register] ^ (1 if self.corrupt else 0)
+
+    def write_register(self, register, value):
+        self.registers[register] = value
+
+
+class Driver:
+    def __init__(self, controller):
+        self._device = type("Device", (), {"epd": controller})()
+
+
+@pytest.fixture(autouse=True)
+def no_spidev(monkeypatch):
+    monkeypatch.setattr(spi_calibration, "spidev_chunk_bytes", lambda: None)
+
+
+def test_fastest_passing_clock_wins():
+    def probe_at(spi_hz):
+        if spi_hz > 8000000:
+            raise SpiProbeError("readback mismatch")
+        return 0.0001
+
+    result = calibrate(probe_at, CLOCKS)
+
+    assert (result.spi_hz, result.verified) == (8000000, True)
+    assert result.clocks["16000000"].startswith("failed")
+    assert "4000000" not in result.clocks
+
+
+def test_no_passing_clock_falls_back():
+    def probe_at(spi_hz):
+        raise SpiProbeError("readback mismatch")
+
+    result = calibrate(probe_at, CLOCKS, fallback_hz=2000000)
+
+    assert (result.spi_hz, result.verified) == (2000000, False)
+    assert len(result.clocks) == len(CLOCKS)
+
+
+def test_driver_without_readback_stays_unverified():
+    result = calibrate(lambda spi_hz: None, CLOCKS)
+
+    assert (result.spi_hz, result.verified) == (16000000, False)
+
+
+def test_probe_restores_the_register():
+    controller = Controller()
+    assert probe_controller(Driver(controller), rounds=8) is not None
+    assert controller.registers[spi_calibration.PROBE_REGISTER] == 0x1234
+
+    with pytest.raises(SpiProbeError):
+        probe_controller(Driver(Controller(corrupt=True)), rounds=8)
+    assert probe_controller(object()) is None
+
+
+def test_slower_clock_and_error_classification():
+    assert slower_clock(16000000, CLOCKS) == 8000000
+    assert slower_clock(4000000, CLOCKS) is None
+    assert is_communication_error(RuntimeError("EPD communication with device failed"))
+    assert is_communication_error(TimeoutError())
+    assert not is_communication_error(RuntimeError("unrelated"))
+
+
+def test_store_persists_calibration_and_fallbacks(tmp_path):
+    path = str(tmp_path / "spi.json")
+    key = SpiClockStore.key("left", 0, 1)
+    store = SpiClockStore(path)
+    store.put(key, CalibrationResult(spi_hz=16000000, verified=True))
+    store.record_fallback(key, 8000000, "communication with device failed")
+
+    restarted = SpiClockStore(path)
+
+    assert restarted.spi_hz(key) == 8000000
+    assert restarted.spi_hz(SpiClockStore.key("left", 0, 0)) is None
+    assert restarted.metrics() == {key: {"spi_hz": 8000000, "verified": False, "fallbacks": 1}}
+
+
+def test_corrupt_store_is_ignored(tmp_path):
+    path = tmp_path / "spi.json"
+    path.write_text("{not json")
+
+    assert SpiClockStore(str(path)).metrics() == {}
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmark import offline_client
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(REPO_ROOT, "config.json")
+
+
+def test_importing_the_client_leaves_the_render_stack_unloaded():
+    script = "import sys, app; print(sorted(m for m in ('numpy', 'PIL', 'omni_epd') if m in sys.modules))"
+
+    result = subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+@pytest.fixture
+def client():
+    client = offline_client(CONFIG_PATH, startup={"network_first": True})
+    yield client
+    client._close_display()
+
+
+def test_network_first_sets_up_the_display_in_the_background(client):
+    panel = client.panels[0]
+    assert panel.screen is None and not client._renderer_ready.is_set()
+
+    client._start_renderer_setup()
+    client._join_renderer_setup()
+
+    assert client._renderer_ready.is_set()
+    assert panel.screen is not None
+    assert "renderer_ready" in client.timeline.as_dict()['marks']
+
+
+def test_failed_display_setup_stops_the_client(client, monkeypatch):
+    error = RuntimeError("no display")
+
+    def fail():
+        raise error
+
+    monkeypatch.setattr(client, "_setup_hardware", fail)
+    client._start_renderer_setup()
+    client._join_renderer_setup()
+
+    assert client._renderer_error is error
+    assert client._shutdown_event.is_set()
+    assert not client._renderer_ready.is_set()
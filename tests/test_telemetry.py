@@ -0,0 +1,76 @@
+import json
+import threading
+
+import telemetry
+from telemetry import CachedValue, TelemetrySampler
+
+
+class FakeStatus:
+    def __init__(self):
+        self.power = "NOT_PRESENT"
+        self.level = 80
+        self.reads = 0
+
+    def GetStatus(self):
+        self.reads += 1
+        return {"data": {"powerInput": self.power}}
+
+    def GetChargeLevel(self):
+        return {"data": self.level}
+
+
+class FakePiJuice:
+    def __init__(self):
+        self.status = FakeStatus()
+
+
+def test_cached_value_reloads_after_its_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(telemetry.time, "monotonic", lambda: now[0])
+    loads = []
+    value = CachedValue(lambda: loads.append(1) or len(loads), ttl=10)
+
+    assert (value.get(), value.get()) == (1, 1)
+    now[0] += 10
+    assert value.get() == 2
+    value.invalidate()
+    assert value.get() == 3
+
+
+def test_status_is_served_from_the_cache():
+    pijuice = FakePiJuice()
+    sampler = TelemetrySampler("aa:bb", pijuice)
+    sampler.register_source("queue", lambda: {"depth": 0})
+    sampler.register_source("broken", lambda: 1 / 0)
+
+    assert sampler.is_wired() is None
+    sampler.sample_battery()
+    status = json.loads(sampler.status_payload("online"))
+
+    assert pijuice.status.reads == 1
+    assert (status["mac"], status["wired"], status["battery"]) == ("aa:bb", False, 80)
+    assert status["queue"] == {"depth": 0}
+    assert "broken" not in status
+
+
+def test_battery_changes_are_published_as_deltas():
+    pijuice = FakePiJuice()
+    sampler = TelemetrySampler("aa:bb", pijuice, battery_interval=0.01, publish_interval=60)
+    sampler.sample_battery()
+    sampler.status_payload("online")
+    deltas = []
+    published = threading.Event()
+
+    def publish_delta(payload):
+        deltas.append(json.loads(payload))
+        published.set()
+
+    pijuice.status.power = "PRESENT"
+    sampler.start(publish=lambda payload: None, publish_delta=publish_delta)
+    try:
+        assert published.wait(2)
+    finally:
+        sampler.stop()
+
+    assert deltas[0] == {"wired": True}
+    assert sampler.is_wired() is True
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+import waveform
+from panel_frame import PanelFrame
+from waveform import RefreshSettings, WaveformSelector
+
+SHAPE = (16, 32)
+REGION = [(0, 0, 8, 8)]
+
+
+def frame(levels):
+    return PanelFrame(np.asarray(levels, dtype=np.uint8))
+
+
+def black_and_white():
+    levels = np.full(SHAPE, 15, dtype=np.uint8)
+    levels[:, ::2] = 0
+    return frame(levels)
+
+
+def gray():
+    return frame(np.full(SHAPE, 7, dtype=np.uint8))
+
+
+def test_first_frame_is_a_full_refresh():
+    assert WaveformSelector().select(None, gray(), REGION) == ("GC16", None)
+
+
+def test_black_and_white_over_black_and_white_uses_a2():
+    assert WaveformSelector().select(black_and_white(), black_and_white(), REGION) == ("A2", REGION)
+
+
+def test_black_and_white_over_gray_uses_du():
+    assert WaveformSelector().select(gray(), black_and_white(), REGION) == ("DU", REGION)
+
+
+def test_gray_uses_gl16_partially_and_gc16_fully():
+    selector = WaveformSelector()
+
+    assert selector.select(gray(), gray(), REGION) == ("GL16", REGION)
+    assert selector.select(gray(), gray(), None) == ("GC16", None)
+
+
+def test_explicit_waveform_wins():
+    selector = WaveformSelector()
+
+    assert selector.select(gray(), gray(), REGION, RefreshSettings(waveform="du")) == ("DU", REGION)
+    assert selector.select(gray(), gray(), REGION, RefreshSettings(waveform="full")) == ("GC16", None)
+
+
+def test_full_refresh_after_the_fast_update_limit():
+    selector = WaveformSelector(RefreshSettings(full_refresh_every=2, full_refresh_interval=0))
+    for _ in range(2):
+        selector.record("A2", REGION)
+
+    assert selector.select(black_and_white(), black_and_white(), REGION) == ("GC16", None)
+    selector.record("GC16", None)
+    assert selector.select(black_and_white(), black_and_white(), REGION) == ("A2", REGION)
+
+
+def test_full_refresh_after_the_interval(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(waveform.time, "monotonic", lambda: now[0])
+    selector = WaveformSelector(RefreshSettings(full_refresh_every=0, full_refresh_interval=60))
+    selector.record("A2", REGION)
+
+    now[0] += 61
+    assert selector.select(black_and_white(), black_and_white(), REGION) == ("GC16", None)
+
+
+def test_settings_are_coerced_and_validated():
+    assert RefreshSettings.from_dict({"waveform": "A2", "full_refresh_every": "5"}) == \
+        RefreshSettings(waveform="a2", full_refresh_every=5)
+    with pytest.raises(ValueError):
+        RefreshSettings.from_dict({"waveform": "sparkle"})
+    with pytest.raises(ValueError):
+        RefreshSettings.from_dict({"full_refresh_every": -1})
@@ -0,0 +1,80 @@
+import io
+
+import numpy as np
+import pytest
+
+import wire_frame
+from panel_frame import PanelFrame
+
+WIDTH, HEIGHT = 10, 6
+COMPRESSIONS = [wire_frame.COMPRESSION_NONE, wire_frame.COMPRESSION_RLE, wire_frame.COMPRESSION_DEFLATE]
+
+
+def random_frame(width=WIDTH, height=HEIGHT, seed=0):
+    levels = np.random.default_rng(seed).integers(0, 16, size=(height, width), dtype=np.uint8)
+    return PanelFrame(levels)
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_round_trip(compression):
+    frame = random_frame()
+
+    payload = wire_frame.encode(frame, (WIDTH, HEIGHT), compression)
+
+    assert wire_frame.is_wire_frame(payload)
+    np.testing.assert_array_equal(wire_frame.decode(payload, WIDTH, HEIGHT).levels, frame.levels)
+
+
+def test_run_length_splits_long_runs():
+    packed = bytes([7]) * 600 + bytes([1])
+
+    data = wire_frame.compress(packed, wire_frame.COMPRESSION_RLE)
+
+    assert data == bytes([255, 7, 255, 7, 90, 7, 1, 1])
+    assert bytes(wire_frame.decompress(memoryview(data), wire_frame.COMPRESSION_RLE, len(packed))) == packed
+
+
+def test_rotation_is_applied_on_decode():
+    frame = random_frame(HEIGHT, WIDTH)
+
+    payload = wire_frame.encode(frame, (WIDTH, HEIGHT), rotation=90)
+
+    np.testing.assert_array_equal(wire_frame.decode(payload, WIDTH, HEIGHT).levels, np.rot90(frame.levels))
+
+
+def test_partial_frame_is_drawn_over_the_base():
+    base = PanelFrame(np.zeros((HEIGHT, WIDTH), dtype=np.uint8))
+    patch = PanelFrame(np.full((2, 3), 15, dtype=np.uint8))
+    payload = wire_frame.encode(patch, (WIDTH, HEIGHT), origin=(4, 1))
+
+    with pytest.raises(ValueError):
+        wire_frame.decode(payload, WIDTH, HEIGHT)
+    levels = wire_frame.decode(payload, WIDTH, HEIGHT, base=base).levels
+
+    expected = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+    expected[1:3, 4:7] = 15
+    np.testing.assert_array_equal(levels, expected)
+    assert not base.levels.any()
+
+
+def test_file_payloads_are_rewound_by_the_sniff():
+    payload = io.BytesIO(wire_frame.encode(random_frame(), (WIDTH, HEIGHT)))
+
+    assert wire_frame.is_wire_frame(payload)
+    assert payload.tell() == 0
+    assert not wire_frame.is_wire_frame(b"\x89PNG\r\n")
+
+
+def test_invalid_frames_are_rejected():
+    payload = wire_frame.encode(random_frame(), (WIDTH, HEIGHT), wire_frame.COMPRESSION_NONE)
+    corrupted = bytearray(payload)
+    corrupted[-1] ^= 0xFF
+
+    with pytest.raises(ValueError, match="checksum"):
+        wire_frame.decode(bytes(corrupted), WIDTH, HEIGHT)
+    with pytest.raises(ValueError, match="panel"):
+        wire_frame.decode(payload, WIDTH + 2, HEIGHT)
+    with pytest.raises(ValueError):
+        wire_frame.decode(payload[:-1], WIDTH, HEIGHT)
+    with pytest.raises(ValueError):
+        wire_frame.decode(payload[:wire_frame.WIRE_HEADER.size - 1], WIDTH, HEIGHT)
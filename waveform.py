@@ -0,0 +1,166 @@
+import logging
+import time
+from dataclasses import dataclass, asdict, replace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from frame_diff import Region
+from panel_frame import PanelFrame, GRAY_LEVELS
+
+# Constants
+WAVEFORM_AUTO = "auto"
+WAVEFORM_FULL = "full"  # full-panel GC16 refresh, clears ghosting
+# IT8951 waveform modes and their numbers in IT8951.constants.DisplayModes
+DISPLAY_MODES = {
+    'INIT': 0,
+    'DU': 1,
+    'GC16': 2,
+    'GL16': 3,
+    'A2': 6
+}
+WAVEFORMS = (WAVEFORM_AUTO, WAVEFORM_FULL, "a2", "du", "gl16", "gc16")
+BILEVEL = (0, GRAY_LEVELS - 1)
+HISTOGRAM_ROWS = 64  # rows counted at once, bounds the temporary index array
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RefreshSettings:
+    """Waveform choice per update and the full refresh that clears accumulated ghosting."""
+    waveform: str = WAVEFORM_AUTO
+    full_refresh_every: int = 20  # fast updates before a full GC16 refresh; 0 disables
+    full_refresh_interval: int = 86400  # seconds after which a fast update is turned into a full refresh; 0 disables
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "RefreshSettings":
+        """Build settings from a config section, ignoring unknown keys."""
+        return cls().merged(values)
+
+    def merged(self, overrides: Dict[str, Any]) -> "RefreshSettings":
+        """
+        Return a copy with the given overrides applied.
+
+        Values may be strings (e.g. MQTT user properties) and are coerced to
+        the field types.
+
+        Raises:
+            ValueError: If a value cannot be converted or the waveform is unknown
+        """
+        changes = {}
+        for key, value in overrides.items():
+            if key not in self.__dataclass_fields__:
+                continue
+            current = getattr(self, key)
+            changes[key] = int(float(value)) if isinstance(current, int) else type(current)(value)
+        settings = replace(self, **changes)
+        settings = replace(settings, waveform=settings.waveform.lower())
+        if settings.waveform not in WAVEFORMS:
+            raise ValueError(f"Unknown waveform '{settings.waveform}', expected one of {WAVEFORMS}")
+        if settings.full_refresh_every < 0 or settings.full_refresh_interval < 0:
+            raise ValueError("Full refresh limits must not be negative")
+        return settings
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def level_counts(levels: np.ndarray, regions: Optional[Sequence[Region]] = None) -> np.ndarray:
+    """
+    Histogram of the gray levels within the given regions.
+
+    Counted in bands of rows so the index array bincount widens the levels
+    into stays small.
+
+    Args:
+        levels (np.ndarray): Gray levels of a frame
+        regions: (left, top, right, bottom) boxes, the whole frame if omitted
+
+    Returns:
+        np.ndarray: Pixel count per gray level
+    """
+    counts = np.zeros(GRAY_LEVELS, dtype=np.int64)
+    for left, top, right, bottom in regions or [(0, 0, levels.shape[1], levels.shape[0])]:
+        for row in range(top, bottom, HISTOGRAM_ROWS):
+            band = levels[row:min(row + HISTOGRAM_ROWS, bottom), left:right]
+            counts += np.bincount(band.ravel(), minlength=GRAY_LEVELS)[:GRAY_LEVELS]
+    return counts
+
+
+def is_bilevel(counts: np.ndarray) -> bool:
+    """Whether a histogram holds nothing but black and white."""
+    return not np.count_nonzero(np.delete(counts, BILEVEL))
+
+
+class WaveformSelector:
+    """
+    Chooses the IT8951 waveform of every update.
+
+    Black and white content goes out with the fast A2 waveform when the
+    area was black and white before as well, and with DU otherwise.
+    Grayscale content uses the non-flashing GL16 for partial updates and
+    the flashing GC16 for full ones. Fast waveforms leave ghosting behind,
+    so after ``full_refresh_every`` of them, or ``full_refresh_interval``
+    seconds, the next update becomes a full GC16 refresh. The first frame
+    after startup is always a full GC16 refresh, since the panel's content
+    is unknown. An explicit waveform always wins.
+    """
+
+    def __init__(self, settings: Optional[RefreshSettings] = None):
+        """
+        Args:
+            settings (RefreshSettings): Defaults used when an update has no overrides
+        """
+        self.settings = settings or RefreshSettings()
+        self.fast_updates = 0
+        self.last_full_refresh = time.monotonic()
+        self.modes = {}
+
+    def select(self, previous: Optional[PanelFrame], frame: PanelFrame, regions: Optional[List[Region]],
+               settings: Optional[RefreshSettings] = None) -> Tuple[str, Optional[List[Region]]]:
+        """
+        Choose the waveform of an update.
+
+        Args:
+            previous (PanelFrame): Frame on the panel, None if unknown
+            frame (PanelFrame): Frame about to be displayed
+            regions: Boxes of a partial update, None for a full refresh
+            settings (RefreshSettings): Per-update settings, defaults to the selector settings
+
+        Returns:
+            tuple: Waveform mode and the regions to update, None for the whole panel
+        """
+        settings = settings or self.settings
+        if settings.waveform == WAVEFORM_FULL:
+            return 'GC16', None
+        if settings.waveform != WAVEFORM_AUTO:
+            return settings.waveform.upper(), regions
+        if previous is None:
+            return 'GC16', None
+        if self._full_refresh_due(settings):
+            logger.info(f"Full refresh after {self.fast_updates} fast update(s) to clear ghosting")
+            return 'GC16', None
+        counts = level_counts(frame.levels, regions)
+        logger.debug(f"Update holds {np.count_nonzero(counts)} gray level(s)")
+        if is_bilevel(counts):
+            return ('A2' if is_bilevel(level_counts(previous.levels, regions)) else 'DU'), regions
+        return ('GL16' if regions else 'GC16'), regions
+
+    def record(self, mode: str, regions: Optional[List[Region]]) -> None:
+        """Count a displayed update towards the next full refresh."""
+        self.modes[mode] = self.modes.get(mode, 0) + 1
+        if mode == 'GC16' and not regions:
+            self.fast_updates = 0
+            self.last_full_refresh = time.monotonic()
+        elif mode != 'GC16':
+            self.fast_updates += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {'modes': dict(self.modes), 'fast_updates': self.fast_updates}
+
+    def _full_refresh_due(self, settings: RefreshSettings) -> bool:
+        if not self.fast_updates:
+            return False
+        if settings.full_refresh_every and self.fast_updates >= settings.full_refresh_every:
+            return True
+        return bool(settings.full_refresh_interval
+                    and time.monotonic() - self.last_full_refresh >= settings.full_refresh_interval)
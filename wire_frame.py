@@ -0,0 +1,182 @@
+import io
+import struct
+import zlib
+from typing import TYPE_CHECKING, BinaryIO, Optional, Tuple, Union
+import numpy as np
+from panel_frame import PanelFrame
+
+if TYPE_CHECKING:
+    from frame_buffers import FrameBufferPool
+
+# Constants
+WIRE_MAGIC = b"G16W"
+WIRE_VERSION = 1
+# magic, version, compression, rotation, reserved, panel width/height, rect x/y/width/height,
+# compressed data length, CRC-32 of the packed 4bpp data
+WIRE_HEADER = struct.Struct("<4sBBBBHHHHHHII")
+COMPRESSION_NONE = 0
+COMPRESSION_RLE = 1  # (count, byte) pairs over the packed data, counts 1-255
+COMPRESSION_DEFLATE = 2  # zlib stream
+COMPRESSION_ZSTD = 3  # zstd frame; needs the zstandard package
+QUARTER_TURN = 90
+MAX_RUN = 255
+
+
+def is_wire_frame(payload: Union[bytes, BinaryIO]) -> bool:
+    """Whether a payload is a panel-native wire frame rather than an image file; files are rewound."""
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        return bytes(payload[:len(WIRE_MAGIC)]) == WIRE_MAGIC
+    position = payload.tell()
+    try:
+        return payload.read(len(WIRE_MAGIC)) == WIRE_MAGIC
+    finally:
+        payload.seek(position)
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd compressed frames need the zstandard package")
+    return zstandard
+
+
+def compress(packed: bytes, compression: int) -> bytes:
+    if compression == COMPRESSION_NONE:
+        return bytes(packed)
+    if compression == COMPRESSION_DEFLATE:
+        return zlib.compress(packed)
+    if compression == COMPRESSION_ZSTD:
+        return _zstd().ZstdCompressor().compress(packed)
+    if compression == COMPRESSION_RLE:
+        data = np.frombuffer(packed, dtype=np.uint8)
+        if not data.size:
+            return b""
+        starts = np.flatnonzero(np.concatenate(([True], data[1:] != data[:-1])))
+        lengths = np.diff(np.append(starts, data.size))
+        # Runs longer than a count byte holds are split into full runs and a remainder
+        full_runs, remainder = np.divmod(lengths, MAX_RUN)
+        repeats = full_runs + (remainder > 0)
+        counts = np.full(int(repeats.sum()), MAX_RUN, dtype=np.uint8)
+        counts[np.cumsum(repeats)[remainder > 0] - 1] = remainder[remainder > 0]
+        values = np.repeat(data[starts], repeats)
+        return np.column_stack((counts, values)).tobytes()
+    raise ValueError(f"Unknown wire frame compression {compression}")
+
+
+def decompress(data: memoryview, compression: int, size: int) -> Union[bytes, memoryview]:
+    """Expand compressed frame data, which must hold exactly ``size`` bytes."""
+    if compression == COMPRESSION_NONE:
+        packed = data
+    elif compression == COMPRESSION_DEFLATE:
+        try:
+            # Bounded, so a corrupt or hostile stream cannot expand beyond the frame
+            packed = zlib.decompressobj().decompress(data, size + 1)
+        except zlib.error as e:
+            raise ValueError(f"Invalid deflate data: {e}")
+    elif compression == COMPRESSION_ZSTD:
+        zstandard = _zstd()
+        try:
+            # Read through a stream so a forged content size in the zstd header cannot force a large allocation
+            packed = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read(size + 1)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Invalid zstd data: {e}")
+    elif compression == COMPRESSION_RLE:
+        if len(data) % 2:
+            raise ValueError("Run-length data must consist of (count, byte) pairs")
+        pairs = np.frombuffer(data, dtype=np.uint8).reshape(-1, 2)
+        if int(pairs[:, 0].sum(dtype=np.int64)) != size or not pairs[:, 0].all():
+            raise ValueError(f"Run-length data does not expand to {size} bytes")
+        packed = np.repeat(pairs[:, 1], pairs[:, 0]).data
+    else:
+        raise ValueError(f"Unknown wire frame compression {compression}")
+    if len(packed) != size:
+        raise ValueError(f"Frame data holds {len(packed)} bytes, expected {size}")
+    return packed
+
+
+def encode(frame: PanelFrame, panel_size: Tuple[int, int], compression: int = COMPRESSION_DEFLATE,
+           rotation: int = 0, origin: Tuple[int, int] = (0, 0)) -> bytes:
+    """
+    Serialize a frame in the wire format, as a server would send it.
+
+    Args:
+        frame (PanelFrame): Frame in the sender's orientation
+        panel_size (tuple): Width and height of the target panel
+        compression (int): One of the COMPRESSION_* constants
+        rotation (int): Counter-clockwise rotation in degrees the client applies, like the rotate option
+        origin (tuple): Panel position of the rotated frame's top left corner; a frame smaller than
+            the panel only updates that rectangle
+
+    Returns:
+        bytes: Header followed by the compressed 4bpp data
+    """
+    turns = (rotation % 360) // QUARTER_TURN
+    width, height = (frame.height, frame.width) if turns % 2 else (frame.width, frame.height)
+    packed = frame.pack()
+    data = compress(packed, compression)
+    header = WIRE_HEADER.pack(WIRE_MAGIC, WIRE_VERSION, compression, turns, 0, panel_size[0], panel_size[1],
+                              origin[0], origin[1], width, height, len(data), zlib.crc32(packed))
+    return header + data
+
+
+def decode(payload: Union[bytes, BinaryIO], width: int, height: int, base: Optional[PanelFrame] = None,
+           pool: Optional["FrameBufferPool"] = None) -> PanelFrame:
+    """
+    Validate a wire frame and expand it into a full panel frame without an image decode.
+
+    The header names the panel size, the counter-clockwise quarter turns to
+    apply and the panel rectangle the data covers. A rectangle smaller than
+    the panel is drawn over ``base``, the frame currently on the panel, so
+    the screen's diff refreshes only that area.
+
+    Args:
+        payload (bytes | BinaryIO): Wire frame data or a binary file holding it
+        width (int): Width of the panel in pixels
+        height (int): Height of the panel in pixels
+        base (PanelFrame): Frame on the panel, needed for partial frames
+        pool (FrameBufferPool): Source of the frame's level buffers
+
+    Returns:
+        PanelFrame: Frame at panel resolution
+
+    Raises:
+        ValueError: If the header, size, checksum or compression is invalid
+    """
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        payload = payload.read()
+    data = memoryview(payload)
+    if len(data) < WIRE_HEADER.size:
+        raise ValueError("Wire frame is shorter than its header")
+    (magic, version, compression, turns, _, panel_width, panel_height,
+     x, y, rect_width, rect_height, length, crc) = WIRE_HEADER.unpack_from(data)
+    if magic != WIRE_MAGIC or version != WIRE_VERSION:
+        raise ValueError(f"Unsupported wire frame {bytes(magic)!r} version {version}")
+    if (panel_width, panel_height) != (width, height):
+        raise ValueError(f"Wire frame is for a {panel_width}x{panel_height} panel, this one is {width}x{height}")
+    if turns > 3:
+        raise ValueError(f"Invalid rotation of {turns} quarter turns")
+    if not rect_width or not rect_height or x + rect_width > width or y + rect_height > height:
+        raise ValueError(f"Rectangle {rect_width}x{rect_height}+{x}+{y} lies outside the panel")
+    if len(data) != WIRE_HEADER.size + length:
+        raise ValueError(f"Wire frame holds {len(data) - WIRE_HEADER.size} data bytes, header says {length}")
+
+    # The data is stored in the sender's orientation
+    data_width, data_height = (rect_height, rect_width) if turns % 2 else (rect_width, rect_height)
+    size = data_height * ((data_width + 1) // 2)
+    packed = decompress(data[WIRE_HEADER.size:], compression, size)
+    if zlib.crc32(packed) != crc:
+        raise ValueError("Wire frame checksum mismatch")
+    frame = PanelFrame.unpack(packed, data_width, data_height, pool)
+
+    full = (x, y, rect_width, rect_height) == (0, 0, width, height)
+    if full and not turns:
+        return frame
+    if not full and (base is None or base.levels.shape != (height, width)):
+        raise ValueError("A partial wire frame needs the full frame on the panel first")
+    levels = pool.acquire((height, width)) if pool else np.empty((height, width), dtype=np.uint8)
+    if not full:
+        np.copyto(levels, base.levels)
+    levels[y:y + rect_height, x:x + rect_width] = np.rot90(frame.levels, turns)
+    frame.release()
+    return PanelFrame(levels, pool)